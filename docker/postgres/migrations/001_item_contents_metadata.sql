@@ -0,0 +1,7 @@
+-- Add `metadata` to `item_contents` tables created by an older `init.sql`
+-- psql -h localhost -U postgres -d aiagent -f docker/postgres/migrations/001_item_contents_metadata.sql
+ALTER TABLE item_contents ADD COLUMN IF NOT EXISTS metadata JSONB NOT NULL DEFAULT '{}';
+ALTER TABLE item_contents_large ADD COLUMN IF NOT EXISTS metadata JSONB NOT NULL DEFAULT '{}';
+
+CREATE INDEX IF NOT EXISTS item_contents_metadata_idx ON item_contents USING gin (metadata jsonb_path_ops);
+CREATE INDEX IF NOT EXISTS item_contents_large_metadata_idx ON item_contents_large USING gin (metadata jsonb_path_ops);
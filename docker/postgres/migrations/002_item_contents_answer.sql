@@ -0,0 +1,9 @@
+-- Add cached answers of the semantic response cache to `item_contents` tables created by an older `init.sql`
+-- psql -h localhost -U postgres -d aiagent -f docker/postgres/migrations/002_item_contents_answer.sql
+ALTER TABLE item_contents ADD COLUMN IF NOT EXISTS answer TEXT;
+ALTER TABLE item_contents ADD COLUMN IF NOT EXISTS answered_at TIMESTAMPTZ;
+ALTER TABLE item_contents_large ADD COLUMN IF NOT EXISTS answer TEXT;
+ALTER TABLE item_contents_large ADD COLUMN IF NOT EXISTS answered_at TIMESTAMPTZ;
+
+CREATE INDEX IF NOT EXISTS item_contents_answered_at_idx ON item_contents (answered_at) WHERE answer IS NOT NULL;
+CREATE INDEX IF NOT EXISTS item_contents_large_answered_at_idx ON item_contents_large (answered_at) WHERE answer IS NOT NULL;
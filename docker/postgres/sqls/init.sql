@@ -9,7 +9,10 @@ CREATE TABLE embeddings (
 CREATE TABLE item_contents (
     id SERIAL PRIMARY KEY,
     content TEXT,
-    embedding VECTOR(768)
+    embedding VECTOR(768),
+    metadata JSONB NOT NULL DEFAULT '{}',
+    answer TEXT,
+    answered_at TIMESTAMPTZ
 );
 
 -- Vector dimensionality: 1536
@@ -21,5 +24,23 @@ CREATE TABLE embeddings_large (
 CREATE TABLE item_contents_large (
     id SERIAL PRIMARY KEY,
     content TEXT,
-    embedding VECTOR(1536)
+    embedding VECTOR(1536),
+    metadata JSONB NOT NULL DEFAULT '{}',
+    answer TEXT,
+    answered_at TIMESTAMPTZ
 );
+
+-- ANN index for similarity search by cosine distance `<=>`
+-- Index names must be `<table>_embedding_idx` to be managed by `vector-index` command
+CREATE INDEX embeddings_embedding_idx ON embeddings USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64);
+CREATE INDEX item_contents_embedding_idx ON item_contents USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64);
+CREATE INDEX embeddings_large_embedding_idx ON embeddings_large USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64);
+CREATE INDEX item_contents_large_embedding_idx ON item_contents_large USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64);
+
+-- Metadata filter of similarity search by containment `@>`
+CREATE INDEX item_contents_metadata_idx ON item_contents USING gin (metadata jsonb_path_ops);
+CREATE INDEX item_contents_large_metadata_idx ON item_contents_large USING gin (metadata jsonb_path_ops);
+
+-- Expiration of cached answers of the semantic response cache
+CREATE INDEX item_contents_answered_at_idx ON item_contents (answered_at) WHERE answer IS NOT NULL;
+CREATE INDEX item_contents_large_answered_at_idx ON item_contents_large (answered_at) WHERE answer IS NOT NULL;
@@ -19,6 +19,7 @@ from llama_index.llms.ollama import Ollama
 from loguru import logger
 
 from env.env import EnvSettings
+from infrastructure.vector_stores.qdrant_store import DEFAULT_LOCATION, QdrantConfig, QdrantQuantization
 from registry.registry import DependencyRegistry
 from use_cases.any_question import AnyQuestionAgent
 from use_cases.multi_agent import MultiAgent
@@ -207,27 +208,138 @@ async def _async_multi_agent(multi_agent: MultiAgent) -> None:
 
 
 @app.command()
-def git_docs_indexer(
+def git_docs_indexer(  # noqa: PLR0913, PLR0917
     tool: str = typer.Option("openai", "--tool", "-t", help="LLM tool name: openai, ollama, lmstudio"),
     model: str = typer.Option("gpt-4o", "--model", "-m", help="LLM model name"),
     embedding_model: str = typer.Option(
         "text-embedding-ada-002", "--embedding-model", "-e", help="LLM embedding model name"
     ),
-    db: str = typer.Option("", "--db", "-d", help="Vector DB: blank or 'qdrant'"),
+    embedding_dimension: int = typer.Option(
+        0, "--embedding-dimension", help="dimension of the embedding model. 0: known dimension of the model"
+    ),
+    db: str = typer.Option("", "--db", "-d", help="Vector DB: blank or 'qdrant' or 'faiss'"),
+    faiss_index: str = typer.Option("flat", "--faiss-index", help="FAISS index: flat, ivf_flat, hnsw, ivf_pq"),
+    full: bool = False,
+    directory: list[str] = typer.Option([], "--directory", help="update only files under the directory"),  # noqa: B008
+    qdrant_location: str = typer.Option(DEFAULT_LOCATION, "--qdrant-location", help="Qdrant URL or ':memory:'"),
+    async_ingest: bool = typer.Option(False, "--async-ingest", help="upload batches concurrently by async client"),  # noqa: FBT003
+    batch_size: int = typer.Option(64, "--batch-size", help="points per Qdrant upload"),
+    parallel: int = typer.Option(4, "--parallel", help="Qdrant uploads in flight with `--async-ingest`"),
+    hybrid: bool = typer.Option(False, "--hybrid", help="dense and sparse (BM25) vectors in Qdrant"),  # noqa: FBT003
+    hnsw_m: int = typer.Option(16, "--hnsw-m", help="neighbors of a HNSW node in Qdrant"),
+    hnsw_ef_construct: int = typer.Option(100, "--hnsw-ef-construct", help="HNSW candidates on build in Qdrant"),
+    quantization: str = typer.Option("none", "--quantization", help="Qdrant: none, scalar, product, binary"),
 ) -> None:
-    """Github docs Indexer."""
+    """Github docs Indexer. Only files changed since the last run are indexed unless `--full`.
+
+    Qdrant options take effect when the collection is created, i.e. on the first run or with `--full`.
+    """
     logger.debug("git_docs_indexer()")
 
     # Initialization
     registry = DependencyRegistry(tool, model)
-    github_index = registry.get_github_index_usecase(embedding_model, db)
+    qdrant_config = QdrantConfig(
+        location=qdrant_location,
+        async_ingest=async_ingest,
+        batch_size=batch_size,
+        parallel=parallel,
+        hybrid=hybrid,
+        hnsw_m=hnsw_m,
+        hnsw_ef_construct=hnsw_ef_construct,
+        quantization=QdrantQuantization.from_str(quantization),
+    )
+    github_index = registry.get_github_index_usecase(
+        embedding_model, db, faiss_index, qdrant_config, embedding_dimension
+    )
+
+    # Execute
+    github_index.store_index(full, directory)
+
+
+@app.command()
+def git_docs_fetch_benchmark(
+    directory: list[str] = typer.Option([], "--directory", help="fetch only files under the directory"),  # noqa: B008
+    base_url: str = typer.Option("", "--base-url", help="Github API URL, e.g. a local stub"),
+) -> None:
+    """Benchmark cold and warm fetches of Github docs."""
+    logger.debug("git_docs_fetch_benchmark()")
+
+    # Initialization
+    registry = DependencyRegistry("openai", "gpt-4o")
+    benchmark = registry.get_benchmark_github_fetch_usecase(base_url)
+
+    # Execute
+    benchmark.run(directory)
+
+
+@app.command()
+def faiss_benchmark(
+    index_type: list[str] = typer.Option([], "--index-type", help="flat, ivf_flat, hnsw, ivf_pq (all if omitted)"),  # noqa: B008
+    dimension: int = typer.Option(768, "--dimension", help="dimension of vectors"),
+    vectors: int = typer.Option(20_000, "--vectors", help="number of vectors"),
+    queries: int = typer.Option(200, "--queries", help="number of queries"),
+    top_k: int = typer.Option(10, "--top-k", help="number of neighbors"),
+) -> None:
+    """Benchmark build time, size and query latency of FAISS index types."""
+    logger.debug("faiss_benchmark()")
+
+    # Initialization
+    registry = DependencyRegistry("openai", "gpt-4o")
+    benchmark = registry.get_benchmark_faiss_usecase(dimension, vectors, queries, top_k)
+
+    # Execute
+    benchmark.run(index_type)
+
+
+@app.command()
+def vector_store_benchmark(
+    dimension: int = typer.Option(768, "--dimension", help="dimension of vectors"),
+    nodes: int = typer.Option(10_000, "--nodes", help="number of nodes"),
+    queries: int = typer.Option(20, "--queries", help="number of queries"),
+) -> None:
+    """Benchmark startup time of the JSON vector store and the npy vector store."""
+    logger.debug("vector_store_benchmark()")
+
+    # Initialization
+    registry = DependencyRegistry("openai", "gpt-4o")
+    benchmark = registry.get_benchmark_vector_store_usecase(dimension, nodes, queries)
+
+    # Execute
+    benchmark.run()
+
+
+@app.command()
+def qdrant_benchmark(  # noqa: PLR0913, PLR0917
+    location: str = typer.Option(":memory:", "--location", help="Qdrant URL or ':memory:'"),
+    dimension: int = typer.Option(768, "--dimension", help="dimension of vectors"),
+    points: int = typer.Option(10_000, "--points", help="number of points"),
+    queries: int = typer.Option(200, "--queries", help="number of queries"),
+    batch_size: int = typer.Option(64, "--batch-size", help="points per upload"),
+    parallel: int = typer.Option(4, "--parallel", help="uploads in flight of the async client"),
+    hybrid: bool = typer.Option(False, "--hybrid", help="dense and sparse (BM25) vectors, which need fastembed"),  # noqa: FBT003
+    quantization: str = typer.Option("none", "--quantization", help="none, scalar, product, binary"),
+) -> None:
+    """Benchmark ingestion throughput of the sync and async Qdrant clients and query latency."""
+    logger.debug("qdrant_benchmark()")
+
+    # Initialization
+    registry = DependencyRegistry("openai", "gpt-4o")
+    qdrant_config = QdrantConfig(
+        location=location,
+        collection_name="benchmark",
+        batch_size=batch_size,
+        parallel=parallel,
+        hybrid=hybrid,
+        quantization=QdrantQuantization.from_str(quantization),
+    )
+    benchmark = registry.get_benchmark_qdrant_usecase(qdrant_config, dimension, points, queries)
 
     # Execute
-    github_index.store_index()
+    benchmark.run()
 
 
 @app.command()
-def git_docs_search(
+def git_docs_search(  # noqa: PLR0913, PLR0917
     tool: str = typer.Option("openai", "--tool", "-t", help="LLM tool name: openai, ollama, lmstudio"),
     model: str = typer.Option("gpt-4o", "--model", "-m", help="LLM model name"),
     embedding_model: str = typer.Option(
@@ -235,13 +347,16 @@ def git_docs_search(
     ),
     db: str = typer.Option("", "--db", "-d", help="Vector DB: blank or 'qdrant' or 'faiss'"),
     question: str = typer.Option("What is AWS Lambda?", "--question", "-q", help="question to ask"),
+    qdrant_location: str = typer.Option(DEFAULT_LOCATION, "--qdrant-location", help="Qdrant URL"),
+    hybrid: bool = typer.Option(False, "--hybrid", help="search dense and sparse (BM25) vectors in Qdrant"),  # noqa: FBT003
 ) -> None:
-    """Github docs search."""
+    """Github docs search. `--hybrid` needs the collection indexed with `--hybrid`."""
     logger.debug("git_docs_search()")
 
     # Initialization
     registry = DependencyRegistry(tool, model)
-    github_index = registry.get_github_index_usecase(embedding_model, db)
+    qdrant_config = QdrantConfig(location=qdrant_location, hybrid=hybrid)
+    github_index = registry.get_github_index_usecase(embedding_model, db, qdrant_config=qdrant_config, search=True)
 
     # Execute
     github_index.search_index(question)
@@ -0,0 +1,164 @@
+"""Embedding cache module class."""
+
+import hashlib
+import sqlite3
+import threading
+import time
+import unicodedata
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+from loguru import logger
+
+
+def normalize_text(text: str) -> str:
+    """Normalize text so that trivially different inputs share a cache entry."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def cache_key(model: str, text: str) -> str:
+    """Content-addressed key of (model name, normalized text)."""
+    return hashlib.sha256(f"{model}\0{normalize_text(text)}".encode()).hexdigest()
+
+
+@dataclass
+class EmbeddingCacheStats:
+    """Statistics of EmbeddingCache."""
+
+    hits: int
+    misses: int
+    entries: int
+    size_bytes: int
+
+    @property
+    def hit_rate(self) -> float:
+        """Ratio of hits in lookups."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups > 0 else 0.0
+
+
+class EmbeddingCache:
+    """Persistent embedding cache on SQLite with LRU eviction.
+
+    Vectors are stored as float32 blobs. When `max_entries` or `max_bytes` is exceeded,
+    the least recently used entries are evicted.
+    """
+
+    def __init__(self, path: str, *, max_entries: int = 100_000, max_bytes: int = 1 << 30) -> None:
+        """Initialize EmbeddingCache."""
+        if max_entries <= 0 or max_bytes <= 0:
+            msg = "`max_entries` and `max_bytes` must be positive"
+            raise ValueError(msg)
+
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        # shared by threads, access is serialized by `_lock`
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, model TEXT NOT NULL, dim INTEGER NOT NULL, vector BLOB NOT NULL, "
+            "last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_access_idx ON embeddings (last_access)")
+        self._conn.commit()
+
+    @property
+    def hits(self) -> int:
+        """Number of cache hits."""
+        return self._hits
+
+    @property
+    def misses(self) -> int:
+        """Number of cache misses."""
+        return self._misses
+
+    def get_many(self, model: str, texts: list[str]) -> list[list[float] | None]:
+        """Look up embeddings of texts. Missing entries are None."""
+        keys = [cache_key(model, text) for text in texts]
+        with self._lock:
+            found: dict[str, bytes] = {}
+            # chunked to stay under SQLite's limit of host parameters
+            for start in range(0, len(keys), 500):
+                chunk = keys[start : start + 500]
+                placeholders = ", ".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",  # noqa: S608
+                    chunk,
+                ).fetchall()
+                found.update(rows)
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_access = ? WHERE key = ?", [(now, key) for key in found]
+                )
+                self._conn.commit()
+            hits = sum(1 for key in keys if key in found)
+            self._hits += hits
+            self._misses += len(keys) - hits
+
+        return [np.frombuffer(found[key], dtype=np.float32).tolist() if key in found else None for key in keys]
+
+    def put_many(self, model: str, texts: list[str], embeddings: list[list[float]]) -> None:
+        """Store embeddings of texts, and evict least recently used entries over the limits."""
+        if len(texts) != len(embeddings):
+            msg = "`texts` and `embeddings` must have the same length"
+            raise ValueError(msg)
+
+        now = time.time()
+        rows = [
+            (cache_key(model, text), model, len(embedding), np.asarray(embedding, dtype=np.float32).tobytes(), now)
+            for text, embedding in zip(texts, embeddings, strict=True)
+        ]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?, ?)", rows)
+            self._evict()
+            self._conn.commit()
+
+    def stats(self) -> EmbeddingCacheStats:
+        """Get hit/miss counters and size of the cache."""
+        with self._lock:
+            entries, size_bytes = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings"
+            ).fetchone()
+        return EmbeddingCacheStats(self._hits, self._misses, entries, size_bytes)
+
+    def clear(self) -> None:
+        """Remove all entries and reset counters."""
+        with self._lock:
+            self._conn.execute("DELETE FROM embeddings")
+            self._conn.commit()
+            self._hits = 0
+            self._misses = 0
+
+    def close(self) -> None:
+        """Close the database."""
+        with self._lock:
+            self._conn.close()
+
+    # --------------------------------------------------------------------------
+    # Private methods
+    # --------------------------------------------------------------------------
+
+    def _evict(self) -> None:
+        """Evict least recently used entries until both limits are satisfied."""
+        entries, size_bytes = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings"
+        ).fetchone()
+        if entries <= self._max_entries and size_bytes <= self._max_bytes:
+            return
+
+        # entries have a similar size per model, so estimate the number of rows to evict from the average
+        avg_bytes = size_bytes / entries
+        excess = max(entries - self._max_entries, int((size_bytes - self._max_bytes) / avg_bytes) + 1)
+        self._conn.execute(
+            "DELETE FROM embeddings WHERE key IN (SELECT key FROM embeddings ORDER BY last_access LIMIT ?)",
+            (excess,),
+        )
+        logger.debug(f"evicted embedding cache entries: {excess}")
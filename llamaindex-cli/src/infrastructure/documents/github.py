@@ -1,18 +1,30 @@
 """Create Github storage."""
 
+from collections.abc import Sequence
+
 from llama_index.core import Document
 from llama_index.readers.github import GithubClient, GithubRepositoryReader
 from llama_index.readers.github.repository.github_client import (
     BaseGithubClient,
 )
+from loguru import logger
+
+from infrastructure.documents.github_fetcher import GithubFetcher
+
+DEFAULT_BRANCH = "main"
+INDEXED_FILE_EXTENSIONS = (".md",)
 
 
 class GithubDocumentList:
     """Github Document list class."""
 
-    def __init__(self, token: str, owner: str, repo: str) -> None:
-        """Initialize the DocumentList with the mode."""
+    def __init__(self, token: str, owner: str, repo: str, fetcher: GithubFetcher) -> None:
+        """Initialize the DocumentList with the mode.
+
+        `fetcher` fetches trees and blobs of the incremental index concurrently with its cache.
+        """
         self._github_client = GithubClient(github_token=token, verbose=True)
+        self._fetcher = fetcher
         self._owner = owner
         self._repo = repo
         self._github_documents: None | list[Document] = None
@@ -38,3 +50,33 @@ class GithubDocumentList:
         if self._github_documents is None:
             self._github_documents = self.build_github_documents(self._github_client, self._owner, self._repo)
         return self._github_documents
+
+    def get_head(self, branch: str = DEFAULT_BRANCH) -> tuple[str, str]:
+        """Get SHAs of the head commit of the branch and its tree."""
+        return self._fetcher.get_head(branch)
+
+    def list_files(self, tree_sha: str, directories: Sequence[str] = ()) -> dict[str, str]:
+        """List blob SHAs of indexed files by path, walking the tree (only `directories` if given)."""
+        return self._fetcher.list_files(tree_sha, INDEXED_FILE_EXTENSIONS, directories)
+
+    def get_documents(self, files: dict[str, str]) -> list[Document]:
+        """Fetch the files of blob SHAs by path as documents. The path is the id of the document."""
+        self._fetcher.reset_stats()
+        contents = self._fetcher.get_blobs(files)
+        stats = self._fetcher.stats()
+        logger.info(
+            f"github fetch: files: {len(files)}, requests: {stats.requests}, cache hits: {stats.cache_hits}, "
+            f"downloaded: {stats.downloaded_bytes} bytes, elapsed: {stats.elapsed:.2f}s"
+        )
+        return [
+            Document(
+                text=content.decode("utf-8", errors="replace"),
+                doc_id=path,
+                metadata={
+                    "file_path": path,
+                    "file_name": path.split("/")[-1],
+                    "url": f"https://github.com/{self._owner}/{self._repo}/blob/{DEFAULT_BRANCH}/{path}",
+                },
+            )
+            for path, content in contents.items()
+        ]
@@ -0,0 +1,244 @@
+"""Github fetcher module with conditional requests and a local blob cache."""
+
+import asyncio
+import base64
+import json
+import shutil
+import time
+from collections.abc import Coroutine, Sequence
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import httpx
+from loguru import logger
+
+GITHUB_API_URL = "https://api.github.com"
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+def in_directories(path: str, directories: Sequence[str]) -> bool:
+    """Whether the path is under any of the directories. Empty directories mean the whole repository."""
+    return not directories or any(path == d or path.startswith(f"{d}/") for d in directories)
+
+
+def _walks_into(path: str, directories: Sequence[str]) -> bool:
+    """Whether the tree of the path contains or is under any of the directories."""
+    return in_directories(path, directories) or any(d.startswith(f"{path}/") for d in directories)
+
+
+@dataclass
+class GithubFetchStats:
+    """Statistics of GithubFetcher."""
+
+    requests: int = 0
+    not_modified: int = 0
+    cache_hits: int = 0
+    downloaded_bytes: int = 0
+    elapsed: float = 0.0
+
+
+class BlobCache:
+    """On-disk cache of git objects keyed by SHA.
+
+    Git objects are content-addressed, so an entry never goes stale and a hit needs no request.
+    """
+
+    def __init__(self, directory: str) -> None:
+        """Initialize BlobCache."""
+        self._directory = Path(directory)
+
+    def get(self, kind: str, sha: str) -> bytes | None:
+        """Get the object, or None if not cached."""
+        path = self._path(kind, sha)
+        return path.read_bytes() if path.exists() else None
+
+    def put(self, kind: str, sha: str, data: bytes) -> None:
+        """Store the object. It's written into a temporary file and renamed, so readers never see a partial file."""
+        path = self._path(kind, sha)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_bytes(data)
+        tmp_path.replace(path)
+
+    def clear(self) -> None:
+        """Remove all objects."""
+        shutil.rmtree(self._directory, ignore_errors=True)
+
+    def _path(self, kind: str, sha: str) -> Path:
+        return self._directory / kind / sha[:2] / sha
+
+
+class GithubFetcher:
+    """Github fetcher on the REST API.
+
+    - Requests run concurrently up to `max_concurrency`.
+    - Trees and blobs are cached by SHA in the blob cache.
+    - Responses of mutable resources such as branches are revalidated by If-None-Match with their ETags,
+      and `304 Not Modified` doesn't count against the rate limit.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        token: str,
+        owner: str,
+        repo: str,
+        *,
+        cache_dir: str,
+        base_url: str = GITHUB_API_URL,
+        max_concurrency: int = 8,
+        timeout: float = 30.0,
+        retries: int = 3,
+    ) -> None:
+        """Initialize GithubFetcher."""
+        if max_concurrency < 1:
+            msg = "`max_concurrency` must be positive"
+            raise ValueError(msg)
+        self._token = token
+        self._owner = owner
+        self._repo = repo
+        self._base_url = base_url.rstrip("/")
+        self._max_concurrency = max_concurrency
+        self._timeout = timeout
+        self._retries = retries
+        self._blob_cache = BlobCache(cache_dir)
+        self._etag_path = Path(cache_dir) / "etags.json"
+        self._etags: dict[str, dict[str, Any]] = (
+            json.loads(self._etag_path.read_text()) if self._etag_path.exists() else {}
+        )
+        self._stats = GithubFetchStats()
+        # created per run of the event loop
+        self._client: httpx.AsyncClient | None = None
+        self._semaphore: asyncio.Semaphore | None = None
+
+    def stats(self) -> GithubFetchStats:
+        """Get the statistics since the last reset."""
+        return GithubFetchStats(**vars(self._stats))
+
+    def reset_stats(self) -> None:
+        """Reset the statistics."""
+        self._stats = GithubFetchStats()
+
+    def clear_cache(self) -> None:
+        """Remove cached objects and ETags, so the next fetch is cold."""
+        self._blob_cache.clear()
+        self._etags = {}
+
+    def get_head(self, branch: str) -> tuple[str, str]:
+        """Get SHAs of the head commit of the branch and its tree."""
+        url = f"/repos/{self._owner}/{self._repo}/branches/{branch}"
+        commit = self._run(self._get_json(url, revalidate=True))["commit"]
+        return commit["sha"], commit["commit"]["tree"]["sha"]
+
+    def list_files(self, tree_sha: str, extensions: tuple[str, ...], directories: Sequence[str] = ()) -> dict[str, str]:
+        """List blob SHAs of the files with the extensions by path.
+
+        Only subtrees leading to `directories` are walked, and they are walked concurrently.
+        """
+        return self._run(self._list_files(tree_sha, "", extensions, directories))
+
+    def get_blobs(self, files: dict[str, str]) -> dict[str, bytes]:
+        """Get contents of the files of blob SHAs by path concurrently."""
+        return self._run(self._get_blobs(files))
+
+    # --------------------------------------------------------------------------
+    # Private methods
+    # --------------------------------------------------------------------------
+
+    def _run[T](self, coroutine: Coroutine[Any, Any, T]) -> T:
+        """Run the coroutine with a client, then log the statistics and save ETags."""
+        start = time.perf_counter()
+        result = asyncio.run(self._with_client(coroutine))
+        self._stats.elapsed += time.perf_counter() - start
+        self._etag_path.parent.mkdir(parents=True, exist_ok=True)
+        self._etag_path.write_text(json.dumps(self._etags))
+        logger.debug(f"github fetch: {self._stats}")
+        return result
+
+    async def _with_client[T](self, coroutine: Coroutine[Any, Any, T]) -> T:
+        headers = {"Accept": "application/vnd.github+json", "X-GitHub-Api-Version": "2022-11-28"}
+        if self._token:
+            headers["Authorization"] = f"Bearer {self._token}"
+        limits = httpx.Limits(max_connections=self._max_concurrency)
+        async with httpx.AsyncClient(
+            base_url=self._base_url, headers=headers, limits=limits, timeout=self._timeout
+        ) as client:
+            self._client = client
+            self._semaphore = asyncio.Semaphore(self._max_concurrency)
+            try:
+                return await coroutine
+            finally:
+                self._client = None
+                self._semaphore = None
+
+    async def _get_json(self, url: str, *, revalidate: bool = False) -> Any:  # noqa: ANN401
+        """GET the JSON. If `revalidate`, the cached body is returned when the ETag matches."""
+        if self._client is None or self._semaphore is None:
+            msg = "Client is not started"
+            raise RuntimeError(msg)
+        cached = self._etags.get(url) if revalidate else None
+        headers = {"If-None-Match": cached["etag"]} if cached is not None else {}
+        async with self._semaphore:
+            for attempt in range(self._retries + 1):
+                try:
+                    response = await self._client.get(url, headers=headers)
+                except httpx.TransportError:
+                    if attempt == self._retries:
+                        raise
+                else:
+                    if response.status_code not in RETRY_STATUS_CODES or attempt == self._retries:
+                        break
+                await asyncio.sleep(2**attempt)
+        self._stats.requests += 1
+        if response.status_code == httpx.codes.NOT_MODIFIED and cached is not None:
+            self._stats.not_modified += 1
+            return cached["body"]
+        response.raise_for_status()
+        self._stats.downloaded_bytes += len(response.content)
+        body = response.json()
+        if revalidate and "ETag" in response.headers:
+            self._etags[url] = {"etag": response.headers["ETag"], "body": body}
+        return body
+
+    async def _get_tree(self, tree_sha: str) -> list[dict[str, str]]:
+        """Get the entries of the tree."""
+        data = self._blob_cache.get("trees", tree_sha)
+        if data is not None:
+            self._stats.cache_hits += 1
+            entries: list[dict[str, str]] = json.loads(data)
+            return entries
+        tree = await self._get_json(f"/repos/{self._owner}/{self._repo}/git/trees/{tree_sha}")
+        entries = [{"path": obj["path"], "type": obj["type"], "sha": obj["sha"]} for obj in tree["tree"]]
+        self._blob_cache.put("trees", tree_sha, json.dumps(entries).encode())
+        return entries
+
+    async def _list_files(
+        self, tree_sha: str, prefix: str, extensions: tuple[str, ...], directories: Sequence[str]
+    ) -> dict[str, str]:
+        """List blob SHAs of the files under the tree."""
+        files: dict[str, str] = {}
+        subtrees = []
+        for entry in await self._get_tree(tree_sha):
+            path = f"{prefix}{entry['path']}"
+            if entry["type"] == "tree" and _walks_into(path, directories):
+                subtrees.append(self._list_files(entry["sha"], f"{path}/", extensions, directories))
+            elif entry["type"] == "blob" and path.endswith(extensions) and in_directories(path, directories):
+                files[path] = entry["sha"]
+        for subtree_files in await asyncio.gather(*subtrees):
+            files.update(subtree_files)
+        return files
+
+    async def _get_blob(self, sha: str) -> bytes:
+        """Get the content of the blob."""
+        data = self._blob_cache.get("blobs", sha)
+        if data is not None:
+            self._stats.cache_hits += 1
+            return data
+        blob = await self._get_json(f"/repos/{self._owner}/{self._repo}/git/blobs/{sha}")
+        data = base64.b64decode(blob["content"])
+        self._blob_cache.put("blobs", sha, data)
+        return data
+
+    async def _get_blobs(self, files: dict[str, str]) -> dict[str, bytes]:
+        contents = await asyncio.gather(*(self._get_blob(sha) for sha in files.values()))
+        return dict(zip(files, contents, strict=True))
@@ -0,0 +1,70 @@
+"""Index manifest of Github documents."""
+
+import json
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+
+@dataclass
+class ChunkEntry:
+    """Hash of the chunk text and the id of its node."""
+
+    hash: str
+    node_id: str
+
+
+@dataclass
+class FileEntry:
+    """Blob SHA of an indexed file and its chunks in order."""
+
+    sha: str
+    chunks: list[ChunkEntry] = field(default_factory=list)
+
+    @property
+    def node_ids(self) -> list[str]:
+        """Node ids of the chunks."""
+        return [chunk.node_id for chunk in self.chunks]
+
+
+class IndexManifest:
+    """Manifest of the indexed commit and files, which is persisted as JSON.
+
+    It tells which files changed since the last indexed commit, and which nodes belong to each file.
+    """
+
+    def __init__(self, path: str) -> None:
+        """Initialize IndexManifest, loading the file if exists."""
+        self._path = Path(path)
+        self.commit: str | None = None
+        self.files: dict[str, FileEntry] = {}
+        if self._path.exists():
+            data = json.loads(self._path.read_text())
+            self.commit = data["commit"]
+            self.files = {
+                path: FileEntry(entry["sha"], [ChunkEntry(**chunk) for chunk in entry["chunks"]])
+                for path, entry in data["files"].items()
+            }
+
+    @property
+    def is_empty(self) -> bool:
+        """Whether nothing is indexed."""
+        return not self.files
+
+    def changed_files(self, files: dict[str, str]) -> dict[str, str]:
+        """Files of blob SHAs by path which are new or changed."""
+        return {path: sha for path, sha in files.items() if path not in self.files or self.files[path].sha != sha}
+
+    def removed_files(self, files: dict[str, str]) -> list[str]:
+        """Indexed paths which no longer exist in the files."""
+        return [path for path in self.files if path not in files]
+
+    def clear(self) -> None:
+        """Forget everything indexed."""
+        self.commit = None
+        self.files = {}
+
+    def save(self) -> None:
+        """Write the manifest."""
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        data = {"commit": self.commit, "files": {path: asdict(entry) for path, entry in sorted(self.files.items())}}
+        self._path.write_text(json.dumps(data, indent=1))
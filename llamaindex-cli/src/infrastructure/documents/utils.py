@@ -1,10 +1,41 @@
 """Storage utils."""
 
-from llama_index.core.node_parser import SentenceSplitter
-from llama_index.core.schema import BaseNode, Document
+import hashlib
+import uuid
+
+from llama_index.core.node_parser import NodeParser, SentenceSplitter
+from llama_index.core.schema import BaseNode, Document, NodeRelationship
 
 
 def files_to_node(docs: list[Document], chunk_size: int = 512) -> list[BaseNode]:
     """Convert github docs document to node."""
     node_parser = SentenceSplitter(chunk_size=chunk_size, chunk_overlap=20)
     return node_parser.get_nodes_from_documents(docs, show_progress=False)
+
+
+def chunk_hash(text: str) -> str:
+    """Content hash of the chunk text."""
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def document_to_chunks(document: Document, node_parser: NodeParser) -> list[tuple[str, BaseNode]]:
+    """Split the document into pairs of the chunk hash and the node.
+
+    Node ids are UUIDs derived from the document id and the chunk hash (and its occurrence),
+    so unchanged chunks keep their ids across runs. Vector stores such as Qdrant require UUIDs.
+    """
+    nodes = node_parser.get_nodes_from_documents([document], show_progress=False)
+    hashes = [chunk_hash(node.get_content()) for node in nodes]
+    ids: dict[str, str] = {}
+    occurrences: dict[str, int] = {}
+    for node, content_hash in zip(nodes, hashes, strict=True):
+        occurrence = occurrences.get(content_hash, 0)
+        occurrences[content_hash] = occurrence + 1
+        ids[node.node_id] = str(uuid.uuid5(uuid.NAMESPACE_URL, f"{document.doc_id}\0{content_hash}\0{occurrence}"))
+    for node in nodes:
+        node.id_ = ids[node.node_id]
+        for relationship in (NodeRelationship.PREVIOUS, NodeRelationship.NEXT):
+            related = node.relationships.get(relationship)
+            if related is not None and not isinstance(related, list) and related.node_id in ids:
+                related.node_id = ids[related.node_id]
+    return list(zip(hashes, nodes, strict=True))
@@ -0,0 +1,101 @@
+"""Embedding model wrapper with persistent cache."""
+
+from typing import Any
+
+from llama_index.core.base.embeddings.base import BaseEmbedding, Embedding
+from pydantic import PrivateAttr
+
+from infrastructure.cache.embedding_cache import EmbeddingCache
+
+
+class CachedEmbedding(BaseEmbedding):
+    """Embedding model wrapper which looks up `EmbeddingCache` before calling the wrapped model.
+
+    Query embeddings are cached separately from text embeddings,
+    because some models embed queries with a different instruction.
+    """
+
+    _embed_model: BaseEmbedding = PrivateAttr()
+    _cache: EmbeddingCache = PrivateAttr()
+
+    def __init__(self, embed_model: BaseEmbedding, cache: EmbeddingCache, **kwargs: Any) -> None:  # noqa: ANN401
+        """Initialize CachedEmbedding."""
+        super().__init__(model_name=embed_model.model_name, embed_batch_size=embed_model.embed_batch_size, **kwargs)
+        self._embed_model = embed_model
+        self._cache = cache
+
+    @classmethod
+    def class_name(cls) -> str:
+        """Get class name."""
+        return "CachedEmbedding"
+
+    @property
+    def cache(self) -> EmbeddingCache:
+        """Embedding cache exposing hit/miss counters."""
+        return self._cache
+
+    def _get_query_embedding(self, query: str) -> Embedding:
+        """Get query embedding."""
+        cached = self._cache.get_many(self._query_model_key(), [query])[0]
+        if cached is not None:
+            return cached
+        embedding = self._embed_model.get_query_embedding(query)
+        self._cache.put_many(self._query_model_key(), [query], [embedding])
+        return embedding
+
+    async def _aget_query_embedding(self, query: str) -> Embedding:
+        """Get query embedding asynchronously."""
+        cached = self._cache.get_many(self._query_model_key(), [query])[0]
+        if cached is not None:
+            return cached
+        embedding = await self._embed_model.aget_query_embedding(query)
+        self._cache.put_many(self._query_model_key(), [query], [embedding])
+        return embedding
+
+    def _get_text_embedding(self, text: str) -> Embedding:
+        """Get text embedding."""
+        return self._get_text_embeddings([text])[0]
+
+    async def _aget_text_embedding(self, text: str) -> Embedding:
+        """Get text embedding asynchronously."""
+        return (await self._aget_text_embeddings([text]))[0]
+
+    def _get_text_embeddings(self, texts: list[str]) -> list[Embedding]:
+        """Get text embeddings. Only texts missing in the cache are embedded."""
+        embeddings = self._cache.get_many(self.model_name, texts)
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if missing:
+            missing_texts = [texts[i] for i in missing]
+            new_embeddings = self._embed_model.get_text_embedding_batch(missing_texts)
+            self._fill(embeddings, missing, missing_texts, new_embeddings)
+        return [embedding or [] for embedding in embeddings]
+
+    async def _aget_text_embeddings(self, texts: list[str]) -> list[Embedding]:
+        """Get text embeddings asynchronously. Only texts missing in the cache are embedded."""
+        embeddings = self._cache.get_many(self.model_name, texts)
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if missing:
+            missing_texts = [texts[i] for i in missing]
+            new_embeddings = await self._embed_model.aget_text_embedding_batch(missing_texts)
+            self._fill(embeddings, missing, missing_texts, new_embeddings)
+        return [embedding or [] for embedding in embeddings]
+
+    # --------------------------------------------------------------------------
+    # Private methods
+    # --------------------------------------------------------------------------
+
+    def _query_model_key(self) -> str:
+        """Model key of query embeddings."""
+        return f"{self.model_name}:query"
+
+    def _fill(
+        self,
+        embeddings: list[list[float] | None],
+        missing: list[int],
+        missing_texts: list[str],
+        new_embeddings: list[Embedding],
+    ) -> None:
+        """Fill missing embeddings and store them into the cache."""
+        for i, embedding in zip(missing, new_embeddings, strict=True):
+            embeddings[i] = embedding
+        self._cache.put_many(self.model_name, missing_texts, new_embeddings)
@@ -8,6 +8,19 @@ from llama_index.llms.lmstudio import LMStudio
 from llama_index.llms.ollama import Ollama
 from llama_index.llms.openai import OpenAI
 
+# dimensions of embedding models, so that vector stores are configured without calling the model
+EMBEDDING_DIMENSIONS = {
+    "text-embedding-ada-002": 1536,
+    "text-embedding-3-small": 1536,
+    "text-embedding-3-large": 3072,
+    "nomic-embed-text": 768,
+    "nomic-embed-text-v1.5": 768,
+    "text-embedding-nomic-embed-text-v1.5": 768,
+    "mxbai-embed-large": 1024,
+    "bge-m3": 1024,
+    "all-minilm": 384,
+}
+
 
 def create_openai_llm(model: str, api_key: str, temperature: float = 0.5) -> OpenAI:
     """Create an LLM (Language Model) using OpenAI's API."""
@@ -69,6 +82,15 @@ def create_ollama_embedding_llm(embedding_model: str) -> OllamaEmbedding:
     )
 
 
+def get_embedding_dimension(embedding_model: str) -> int:
+    """Get the dimension of the embedding model. The tag of Ollama models (e.g. `:latest`) is ignored."""
+    dimension = EMBEDDING_DIMENSIONS.get(embedding_model.split(":", maxsplit=1)[0])
+    if dimension is None:
+        msg = f"Unknown dimension of the embedding model: {embedding_model}. Pass `--embedding-dimension`"
+        raise ValueError(msg)
+    return dimension
+
+
 def set_global_default_llm(llm: LLM, embed_model: OpenAIEmbedding) -> None:
     """Set global default LLM and embedding model."""
     Settings.llm = llm
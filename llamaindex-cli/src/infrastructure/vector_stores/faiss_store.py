@@ -0,0 +1,119 @@
+"""FAISS vector store module with index types and persistence."""
+
+from collections.abc import Sequence
+from enum import Enum
+from pathlib import Path
+from typing import Any
+
+import faiss
+import numpy as np
+from llama_index.core.schema import BaseNode
+from llama_index.core.vector_stores.simple import DEFAULT_VECTOR_STORE, NAMESPACE_SEP
+from llama_index.core.vector_stores.types import DEFAULT_PERSIST_FNAME
+from llama_index.vector_stores.faiss import FaissVectorStore
+from loguru import logger
+
+# number of codes of a PQ sub-quantizer with 8 bits, which is also the minimum of training vectors
+PQ_CENTROIDS = 256
+
+
+class FaissIndexType(Enum):
+    """FAISS index type enum."""
+
+    FLAT = "flat"
+    IVF_FLAT = "ivf_flat"
+    HNSW = "hnsw"
+    IVF_PQ = "ivf_pq"
+
+    @classmethod
+    def from_str(cls, index_type_str: str) -> "FaissIndexType":
+        """Change string to FaissIndexType."""
+        for index_type in cls:
+            if index_type.value == index_type_str:
+                return index_type
+        msg = f"'{index_type_str}' is not a valid FaissIndexType"
+        raise ValueError(msg)
+
+
+def build_faiss_index(
+    index_type: FaissIndexType, dimension: int, *, nlist: int = 64, hnsw_m: int = 32, pq_m: int = 16
+) -> faiss.Index:
+    """Build an empty FAISS index on L2 distance.
+
+    - `nlist`: number of inverted lists (clusters) of IVF indexes, which need training
+    - `hnsw_m`: number of neighbors of a HNSW node
+    - `pq_m`: number of sub-quantizers of PQ, which must divide `dimension`
+    """
+    if index_type == FaissIndexType.IVF_PQ and dimension % pq_m != 0:
+        msg = f"`pq_m` ({pq_m}) must divide the dimension ({dimension})"
+        raise ValueError(msg)
+    description = {
+        FaissIndexType.FLAT: "Flat",
+        FaissIndexType.IVF_FLAT: f"IVF{nlist},Flat",
+        FaissIndexType.HNSW: f"HNSW{hnsw_m}",
+        FaissIndexType.IVF_PQ: f"IVF{nlist},PQ{pq_m}",
+    }[index_type]
+    return faiss.index_factory(dimension, description, faiss.METRIC_L2)
+
+
+def min_training_vectors(faiss_index: faiss.Index) -> int:
+    """Minimum number of vectors to train the index. 0 if it needs no training."""
+    if faiss_index.is_trained:
+        return 0
+    ivf = faiss.extract_index_ivf(faiss_index)
+    nlist: int = ivf.nlist
+    # extracted as IndexIVF, so it's downcast to tell PQ
+    return max(nlist, PQ_CENTROIDS if isinstance(faiss.downcast_index(ivf), faiss.IndexIVFPQ) else 0)
+
+
+def set_search_params(faiss_index: faiss.Index, *, nprobe: int = 8, ef_search: int = 64) -> None:
+    """Set search-time parameters: `nprobe` of IVF indexes and `ef_search` of HNSW indexes."""
+    if isinstance(faiss_index, faiss.IndexHNSW):
+        faiss_index.hnsw.efSearch = ef_search
+        return
+    try:
+        faiss.extract_index_ivf(faiss_index).nprobe = nprobe
+    except RuntimeError:
+        # neither IVF nor HNSW
+        return
+
+
+def faiss_persist_path(persist_dir: str) -> Path:
+    """Path of the FAISS index persisted by `StorageContext.persist()`."""
+    return Path(persist_dir) / f"{DEFAULT_VECTOR_STORE}{NAMESPACE_SEP}{DEFAULT_PERSIST_FNAME}"
+
+
+class TrainedFaissVectorStore(FaissVectorStore):
+    """FAISS vector store which trains the index with the first added vectors.
+
+    IVF indexes need training before vectors are added, so the first batch must have at least
+    `min_training_vectors()` vectors. The index is loaded by mmap, so startup doesn't read the whole file.
+    """
+
+    def __init__(self, faiss_index: faiss.Index) -> None:
+        """Initialize TrainedFaissVectorStore."""
+        super().__init__(faiss_index=faiss_index)
+
+    def add(self, nodes: Sequence[BaseNode], **add_kwargs: Any) -> list[str]:  # noqa: ANN401
+        """Add nodes to the index, training it first if needed."""
+        if nodes and not self._faiss_index.is_trained:
+            min_vectors = min_training_vectors(self._faiss_index)
+            if len(nodes) < min_vectors:
+                msg = f"FAISS index needs at least {min_vectors} vectors to train, but got {len(nodes)}"
+                raise ValueError(msg)
+            embeddings = np.array([node.get_embedding() for node in nodes], dtype=np.float32)
+            logger.debug(f"train faiss index: vectors: {len(nodes)}")
+            self._faiss_index.train(embeddings)
+        return super().add(list(nodes), **add_kwargs)
+
+    @classmethod
+    def load(cls, persist_dir: str, *, nprobe: int = 8, ef_search: int = 64) -> "TrainedFaissVectorStore":
+        """Load the index persisted in `persist_dir` by mmap. It's read-only."""
+        persist_path = faiss_persist_path(persist_dir)
+        if not persist_path.exists():
+            msg = f"FAISS index is not found: {persist_path}"
+            raise FileNotFoundError(msg)
+        faiss_index = faiss.read_index(str(persist_path), faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+        set_search_params(faiss_index, nprobe=nprobe, ef_search=ef_search)
+        logger.debug(f"load faiss index: {persist_path}, vectors: {faiss_index.ntotal}, dimension: {faiss_index.d}")
+        return cls(faiss_index)
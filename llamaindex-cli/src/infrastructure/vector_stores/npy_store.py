@@ -0,0 +1,308 @@
+"""Local vector store module on a memory-mapped npy file and a SQLite docstore."""
+
+import json
+import sqlite3
+import threading
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+from llama_index.core import StorageContext
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.core.schema import BaseNode
+from llama_index.core.storage.docstore.keyval_docstore import KVDocumentStore
+from llama_index.core.storage.kvstore.types import DEFAULT_COLLECTION, BaseKVStore
+from llama_index.core.vector_stores.simple import DEFAULT_VECTOR_STORE, NAMESPACE_SEP
+from llama_index.core.vector_stores.types import (
+    DEFAULT_PERSIST_FNAME,
+    BasePydanticVectorStore,
+    MetadataFilters,
+    VectorStoreQuery,
+    VectorStoreQueryMode,
+    VectorStoreQueryResult,
+)
+from loguru import logger
+
+DOCSTORE_FILE_NAME = "docstore.sqlite3"
+EMBEDDINGS_FILE_SUFFIX = ".npy"
+FORMAT = "npy"
+
+
+class SQLiteKVStore(BaseKVStore):
+    """Key-value store on SQLite.
+
+    Values are compact JSON and read on demand, so opening the store costs nothing regardless of its size.
+    """
+
+    def __init__(self, path: str) -> None:
+        """Initialize SQLiteKVStore."""
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        # shared by threads, access is serialized by `_lock`
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS kv ("
+            "collection TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, PRIMARY KEY (collection, key))"
+        )
+        self._conn.commit()
+
+    def put(self, key: str, val: dict[str, Any], collection: str = DEFAULT_COLLECTION) -> None:
+        """Put a key-value pair."""
+        self.put_all([(key, val)], collection=collection)
+
+    async def aput(self, key: str, val: dict[str, Any], collection: str = DEFAULT_COLLECTION) -> None:
+        """Put a key-value pair."""
+        self.put(key, val, collection)
+
+    def put_all(
+        self, kv_pairs: list[tuple[str, dict[str, Any]]], collection: str = DEFAULT_COLLECTION, batch_size: int = 1
+    ) -> None:
+        """Put key-value pairs in a transaction. `batch_size` is ignored."""
+        del batch_size
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO kv (collection, key, value) VALUES (?, ?, ?)",
+                [(collection, key, json.dumps(val, separators=(",", ":"))) for key, val in kv_pairs],
+            )
+            self._conn.commit()
+
+    async def aput_all(
+        self, kv_pairs: list[tuple[str, dict[str, Any]]], collection: str = DEFAULT_COLLECTION, batch_size: int = 1
+    ) -> None:
+        """Put key-value pairs in a transaction."""
+        self.put_all(kv_pairs, collection, batch_size)
+
+    def get(self, key: str, collection: str = DEFAULT_COLLECTION) -> dict[str, Any] | None:
+        """Get a value."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM kv WHERE collection = ? AND key = ?", (collection, key)
+            ).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    async def aget(self, key: str, collection: str = DEFAULT_COLLECTION) -> dict[str, Any] | None:
+        """Get a value."""
+        return self.get(key, collection)
+
+    def get_all(self, collection: str = DEFAULT_COLLECTION) -> dict[str, dict[str, Any]]:
+        """Get all values of the collection."""
+        with self._lock:
+            rows = self._conn.execute("SELECT key, value FROM kv WHERE collection = ?", (collection,)).fetchall()
+        return {key: json.loads(value) for key, value in rows}
+
+    async def aget_all(self, collection: str = DEFAULT_COLLECTION) -> dict[str, dict[str, Any]]:
+        """Get all values of the collection."""
+        return self.get_all(collection)
+
+    def delete(self, key: str, collection: str = DEFAULT_COLLECTION) -> bool:
+        """Delete a value."""
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM kv WHERE collection = ? AND key = ?", (collection, key))
+            self._conn.commit()
+        return cursor.rowcount > 0
+
+    async def adelete(self, key: str, collection: str = DEFAULT_COLLECTION) -> bool:
+        """Delete a value."""
+        return self.delete(key, collection)
+
+
+class NpyVectorStore(BasePydanticVectorStore):
+    """Local vector store which persists embeddings as a contiguous float32 npy file.
+
+    Embeddings are L2-normalized, so similarities are cosine as `SimpleVectorStore`. Node ids are kept in a JSON
+    header and nodes are in the docstore (`stores_text` is False). A persisted store is loaded lazily on the first
+    access, and its embeddings are memory-mapped. Added and deleted nodes are applied by `persist()`.
+    Metadata filters are not supported.
+    """
+
+    stores_text: bool = False
+
+    _persist_path: Path | None = PrivateAttr(default=None)
+    _loaded: bool = PrivateAttr(default=True)
+    _node_ids: list[str] = PrivateAttr(default_factory=list)
+    _ref_doc_ids: list[str] = PrivateAttr(default_factory=list)
+    _embeddings: np.ndarray | None = PrivateAttr(default=None)
+    # ids of stored nodes which are deleted or replaced
+    _deleted: set[str] = PrivateAttr(default_factory=set)
+    _added: dict[str, tuple[str, np.ndarray]] = PrivateAttr(default_factory=dict)
+
+    @classmethod
+    def from_persist_dir(cls, persist_dir: str) -> "NpyVectorStore":
+        """Open the store persisted in `persist_dir`. Nothing is read until the first access."""
+        vector_store = cls()
+        vector_store._persist_path = vector_store_persist_path(persist_dir)
+        vector_store._loaded = False
+        return vector_store
+
+    @classmethod
+    def class_name(cls) -> str:
+        """Class name."""
+        return "NpyVectorStore"
+
+    @property
+    def client(self) -> None:
+        """No client."""
+        return
+
+    def add(self, nodes: Sequence[BaseNode], **add_kwargs: Any) -> list[str]:  # noqa: ANN401, ARG002
+        """Add nodes with embeddings."""
+        self._load()
+        for node in nodes:
+            self._added[node.node_id] = (node.ref_doc_id or "None", _normalize(np.asarray(node.get_embedding())))
+            # a stored node of the same id is replaced
+            self._deleted.add(node.node_id)
+        return [node.node_id for node in nodes]
+
+    def delete(self, ref_doc_id: str, **delete_kwargs: Any) -> None:  # noqa: ANN401, ARG002
+        """Delete nodes of the ref doc."""
+        self._load()
+        self._deleted.update(
+            node_id for node_id, ref in zip(self._node_ids, self._ref_doc_ids, strict=True) if ref == ref_doc_id
+        )
+        for node_id in [node_id for node_id, (ref, _) in self._added.items() if ref == ref_doc_id]:
+            del self._added[node_id]
+
+    def delete_nodes(
+        self,
+        node_ids: list[str] | None = None,
+        filters: MetadataFilters | None = None,
+        **delete_kwargs: Any,  # noqa: ANN401, ARG002
+    ) -> None:
+        """Delete nodes by id."""
+        if filters is not None:
+            msg = "Metadata filters are not supported"
+            raise NotImplementedError(msg)
+        self._load()
+        for node_id in node_ids or []:
+            self._added.pop(node_id, None)
+            self._deleted.add(node_id)
+
+    def clear(self) -> None:
+        """Delete all nodes. The persisted files are overwritten by `persist()`."""
+        self._loaded = True
+        self._node_ids = []
+        self._ref_doc_ids = []
+        self._embeddings = None
+        self._deleted = set()
+        self._added = {}
+
+    def query(self, query: VectorStoreQuery, **kwargs: Any) -> VectorStoreQueryResult:  # noqa: ANN401, ARG002
+        """Get the top-k nodes by cosine similarity."""
+        if query.mode != VectorStoreQueryMode.DEFAULT or query.filters is not None:
+            msg = f"Only default mode without filters is supported: {query.mode}"
+            raise NotImplementedError(msg)
+        if query.query_embedding is None:
+            msg = "Query embedding is required"
+            raise ValueError(msg)
+        self._load()
+        node_ids = [*self._node_ids, *self._added]
+        scores = np.full(len(node_ids), -np.inf, dtype=np.float32)
+        query_embedding = _normalize(np.asarray(query.query_embedding))
+        if self._embeddings is not None and len(self._node_ids) > 0:
+            scores[: len(self._node_ids)] = self._embeddings @ query_embedding
+        if self._added:
+            scores[len(self._node_ids) :] = np.stack([vector for _, vector in self._added.values()]) @ query_embedding
+        # `_deleted` applies to stored nodes only
+        excluded_rows = [i for i, node_id in enumerate(self._node_ids) if node_id in self._deleted]
+        excluded: set[str] = set()
+        if query.node_ids is not None:
+            allowed = set(query.node_ids)
+            excluded.update(node_id for node_id in node_ids if node_id not in allowed)
+        if query.doc_ids is not None:
+            allowed_refs = set(query.doc_ids)
+            refs = [*self._ref_doc_ids, *(ref for ref, _ in self._added.values())]
+            excluded.update(node_id for node_id, ref in zip(node_ids, refs, strict=True) if ref not in allowed_refs)
+        excluded_rows.extend(i for i, node_id in enumerate(node_ids) if node_id in excluded)
+        if excluded_rows:
+            scores[excluded_rows] = -np.inf
+
+        top_k = min(query.similarity_top_k, int(np.isfinite(scores).sum()))
+        if top_k == 0:
+            return VectorStoreQueryResult(similarities=[], ids=[])
+        top = np.argpartition(-scores, top_k - 1)[:top_k]
+        top = top[np.argsort(-scores[top])]
+        return VectorStoreQueryResult(similarities=scores[top].tolist(), ids=[node_ids[i] for i in top])
+
+    def persist(self, persist_path: str, fs: Any = None) -> None:  # noqa: ANN401, ARG002
+        """Write embeddings into an npy file next to `persist_path`, and node ids into `persist_path`."""
+        self._load()
+        kept = [i for i, node_id in enumerate(self._node_ids) if node_id not in self._deleted]
+        node_ids = [self._node_ids[i] for i in kept] + list(self._added)
+        ref_doc_ids = [self._ref_doc_ids[i] for i in kept] + [ref for ref, _ in self._added.values()]
+        parts = [vector.reshape(1, -1) for _, vector in self._added.values()]
+        if self._embeddings is not None and kept:
+            parts.insert(0, np.asarray(self._embeddings[kept]))
+        dimension = parts[0].shape[1] if parts else 0
+        embeddings = np.concatenate(parts) if parts else np.empty((0, 0), dtype=np.float32)
+
+        path = Path(persist_path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # written into temporary files and renamed, so the mmap of the current file stays valid
+        tmp_npy_path = path.with_suffix(".tmp.npy")
+        np.save(tmp_npy_path, embeddings.astype(np.float32, copy=False))
+        tmp_npy_path.replace(path.with_suffix(EMBEDDINGS_FILE_SUFFIX))
+        header = {"format": FORMAT, "dimension": dimension, "node_ids": node_ids, "ref_doc_ids": ref_doc_ids}
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(header, separators=(",", ":")))
+        tmp_path.replace(path)
+        logger.debug(f"npy vector store persisted: {path}, vectors: {len(node_ids)}, dimension: {dimension}")
+
+        self._persist_path = path
+        self.clear()
+        self._loaded = False
+
+    # --------------------------------------------------------------------------
+    # Private methods
+    # --------------------------------------------------------------------------
+
+    def _load(self) -> None:
+        """Read the header and memory-map the embeddings on the first access."""
+        if self._loaded:
+            return
+        self._loaded = True
+        if self._persist_path is None or not self._persist_path.exists():
+            return
+        header = json.loads(self._persist_path.read_text())
+        if header.get("format") != FORMAT:
+            msg = f"Not a npy vector store: {self._persist_path}"
+            raise ValueError(msg)
+        self._node_ids = header["node_ids"]
+        self._ref_doc_ids = header["ref_doc_ids"]
+        self._embeddings = np.load(self._persist_path.with_suffix(EMBEDDINGS_FILE_SUFFIX), mmap_mode="r")
+
+
+def _normalize(vector: np.ndarray) -> np.ndarray:
+    """L2-normalize the vector as float32."""
+    vector = vector.astype(np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+
+def vector_store_persist_path(persist_dir: str) -> Path:
+    """Path of the default vector store persisted by `StorageContext.persist()`."""
+    return Path(persist_dir) / f"{DEFAULT_VECTOR_STORE}{NAMESPACE_SEP}{DEFAULT_PERSIST_FNAME}"
+
+
+def is_npy_store(persist_dir: str) -> bool:
+    """Whether `persist_dir` has a persisted npy vector store."""
+    return vector_store_persist_path(persist_dir).with_suffix(EMBEDDINGS_FILE_SUFFIX).exists()
+
+
+def build_npy_storage_context(persist_dir: str, vector_store: NpyVectorStore | None = None) -> StorageContext:
+    """Build a storage context on `persist_dir`, which is a drop-in for `load_index_from_storage()`.
+
+    If `vector_store` is given, a new index is stored: the docstore is recreated and the vector store is used as is.
+    Otherwise the persisted vector store, docstore and index store are opened lazily.
+    """
+    docstore_path = Path(persist_dir) / DOCSTORE_FILE_NAME
+    if vector_store is not None:
+        for path in (docstore_path, *(docstore_path.with_name(f"{DOCSTORE_FILE_NAME}{s}") for s in ("-wal", "-shm"))):
+            path.unlink(missing_ok=True)
+        docstore = KVDocumentStore(SQLiteKVStore(str(docstore_path)))
+        return StorageContext.from_defaults(docstore=docstore, vector_store=vector_store)
+    docstore = KVDocumentStore(SQLiteKVStore(str(docstore_path)))
+    return StorageContext.from_defaults(
+        docstore=docstore, vector_store=NpyVectorStore.from_persist_dir(persist_dir), persist_dir=persist_dir
+    )
@@ -0,0 +1,218 @@
+"""Qdrant vector store module with async batched ingestion, HNSW/quantization config and hybrid search."""
+
+import asyncio
+import threading
+from collections.abc import Coroutine, Sequence
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any
+
+from grpc import RpcError
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.core.schema import BaseNode
+from llama_index.core.utils import iter_batch
+from llama_index.core.vector_stores.types import (
+    MetadataFilters,
+    VectorStoreQuery,
+    VectorStoreQueryResult,
+)
+from llama_index.vector_stores.qdrant import QdrantVectorStore
+from llama_index.vector_stores.qdrant.utils import SparseEncoderCallable
+from loguru import logger
+from qdrant_client import AsyncQdrantClient, QdrantClient
+from qdrant_client.http import models as rest
+from qdrant_client.http.exceptions import UnexpectedResponse
+
+DEFAULT_COLLECTION_NAME = "githbu_docs"
+DEFAULT_LOCATION = "http://localhost:6333"
+# sparse model of fastembed for hybrid search
+SPARSE_MODEL = "Qdrant/bm25"
+
+
+class QdrantQuantization(Enum):
+    """Qdrant quantization enum."""
+
+    NONE = "none"
+    SCALAR = "scalar"
+    PRODUCT = "product"
+    BINARY = "binary"
+
+    @classmethod
+    def from_str(cls, quantization_str: str) -> "QdrantQuantization":
+        """Change string to QdrantQuantization."""
+        for quantization in cls:
+            if quantization.value == quantization_str:
+                return quantization
+        msg = f"'{quantization_str}' is not a valid QdrantQuantization"
+        raise ValueError(msg)
+
+
+@dataclass(frozen=True)
+class QdrantConfig:
+    """Qdrant collection and ingestion config.
+
+    - `location`: URL of the server, or ":memory:"
+    - `async_ingest`: use the async client, which uploads `parallel` batches of `batch_size` points concurrently
+    - `hybrid`: dense and sparse (BM25) vectors, whose results are fused
+    - `hnsw_m`, `hnsw_ef_construct`: HNSW graph of the dense vectors
+    - `quantization`: quantization of the dense vectors, which are rescored by the originals
+    """
+
+    location: str = DEFAULT_LOCATION
+    collection_name: str = DEFAULT_COLLECTION_NAME
+    async_ingest: bool = False
+    batch_size: int = 64
+    parallel: int = 1
+    hybrid: bool = False
+    hnsw_m: int = 16
+    hnsw_ef_construct: int = 100
+    quantization: QdrantQuantization = QdrantQuantization.NONE
+    on_disk: bool = False
+
+
+def build_quantization_config(quantization: QdrantQuantization) -> rest.QuantizationConfig | None:
+    """Build the quantization config. Quantized vectors are kept in RAM."""
+    if quantization == QdrantQuantization.SCALAR:
+        return rest.ScalarQuantization(
+            scalar=rest.ScalarQuantizationConfig(type=rest.ScalarType.INT8, quantile=0.99, always_ram=True)
+        )
+    if quantization == QdrantQuantization.PRODUCT:
+        return rest.ProductQuantization(
+            product=rest.ProductQuantizationConfig(compression=rest.CompressionRatio.X16, always_ram=True)
+        )
+    if quantization == QdrantQuantization.BINARY:
+        return rest.BinaryQuantization(binary=rest.BinaryQuantizationConfig(always_ram=True))
+    return None
+
+
+def build_qdrant_vector_store(
+    config: QdrantConfig,
+    dimension: int | None = None,
+    *,
+    sparse_doc_fn: SparseEncoderCallable | None = None,
+    sparse_query_fn: SparseEncoderCallable | None = None,
+) -> QdrantVectorStore:
+    """Build the Qdrant vector store. The collection is created with the config on the first upload.
+
+    `dimension` configures the dense vectors of a new collection. It can be None to search an existing collection.
+    Sparse vectors are encoded by fastembed unless `sparse_doc_fn` and `sparse_query_fn` are given.
+    """
+    if config.batch_size < 1 or config.parallel < 1:
+        msg = "`batch_size` and `parallel` must be positive"
+        raise ValueError(msg)
+    dense_config = None
+    if dimension is not None:
+        dense_config = rest.VectorParams(
+            size=dimension,
+            distance=rest.Distance.COSINE,
+            hnsw_config=rest.HnswConfigDiff(m=config.hnsw_m, ef_construct=config.hnsw_ef_construct),
+            on_disk=config.on_disk,
+        )
+    kwargs: dict[str, Any] = {
+        "collection_name": config.collection_name,
+        "batch_size": config.batch_size,
+        "parallel": config.parallel,
+        "dense_config": dense_config,
+        "quantization_config": build_quantization_config(config.quantization),
+        "enable_hybrid": config.hybrid,
+    }
+    if config.hybrid:
+        kwargs["fastembed_sparse_model"] = SPARSE_MODEL
+        kwargs["sparse_doc_fn"] = sparse_doc_fn
+        kwargs["sparse_query_fn"] = sparse_query_fn
+    logger.debug(f"qdrant: {config}, dimension: {dimension}")
+    if config.async_ingest:
+        return AsyncBatchQdrantVectorStore(aclient=AsyncQdrantClient(location=config.location), **kwargs)
+    return QdrantVectorStore(client=QdrantClient(location=config.location), **kwargs)
+
+
+class AsyncBatchQdrantVectorStore(QdrantVectorStore):
+    """Qdrant vector store on the async client.
+
+    Operations run on an event loop of its own thread, so the sync interface of the vector store
+    (used by `VectorStoreIndex`) works with the async client, and the client stays on one loop.
+    Uploads split points into batches of `batch_size`, and up to `parallel` batches are in flight.
+    """
+
+    _loop: asyncio.AbstractEventLoop | None = PrivateAttr(default=None)
+    _loop_lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    def __init__(self, **kwargs: Any) -> None:  # noqa: ANN401
+        """Initialize AsyncBatchQdrantVectorStore with the arguments of QdrantVectorStore and `aclient`."""
+        super().__init__(**kwargs)
+
+    def add(self, nodes: Sequence[BaseNode], **add_kwargs: Any) -> list[str]:  # noqa: ANN401
+        """Add nodes with embeddings."""
+        return self._run(self.async_add(nodes, **add_kwargs))
+
+    async def async_add(self, nodes: Sequence[BaseNode], **kwargs: Any) -> list[str]:  # noqa: ANN401, ARG002
+        """Upload nodes with embeddings in concurrent batches."""
+        self._ensure_async_client()
+        collection_initialized = await self._acollection_exists(self.collection_name)
+        if nodes and not collection_initialized:
+            await self._acreate_collection(self.collection_name, len(nodes[0].get_embedding()))
+            # a new collection without hybrid has an unnamed dense vector, which the points must match as in `add`
+            collection_initialized = True
+        if collection_initialized and self._legacy_vector_format is None:
+            await self._adetect_vector_format(self.collection_name)
+
+        points, ids = self._build_points(list(nodes), self.sparse_vector_name)
+        semaphore = asyncio.Semaphore(self.parallel)
+
+        async def upload(batch: list[rest.PointStruct]) -> None:
+            async with semaphore:
+                for attempt in range(1, self.max_retries + 1):
+                    try:
+                        await self._aclient.upsert(collection_name=self.collection_name, points=batch)
+                    except (RpcError, UnexpectedResponse):
+                        if attempt == self.max_retries:
+                            raise
+                    else:
+                        return
+                    # back off, so a loaded server doesn't get `parallel` batches re-sent at once
+                    await asyncio.sleep(2 ** (attempt - 1))
+
+        await asyncio.gather(*(upload(batch) for batch in iter_batch(points, self.batch_size)))
+        return ids
+
+    def delete(self, ref_doc_id: str, **delete_kwargs: Any) -> None:  # noqa: ANN401
+        """Delete nodes of the ref doc."""
+        self._run(self.adelete(ref_doc_id, **delete_kwargs))
+
+    def delete_nodes(
+        self,
+        node_ids: list[str] | None = None,
+        filters: MetadataFilters | None = None,
+        **delete_kwargs: Any,  # noqa: ANN401
+    ) -> None:
+        """Delete nodes by id."""
+        self._run(self.adelete_nodes(node_ids, filters, **delete_kwargs))
+
+    def clear(self) -> None:
+        """Delete the collection."""
+        self._run(self.aclear())
+
+    def query(self, query: VectorStoreQuery, **kwargs: Any) -> VectorStoreQueryResult:  # noqa: ANN401
+        """Query the collection."""
+        return self._run(self.aquery(query, **kwargs))
+
+    def get_nodes(
+        self,
+        node_ids: list[str] | None = None,
+        filters: MetadataFilters | None = None,
+        limit: int | None = None,
+    ) -> list[BaseNode]:
+        """Get nodes by id or filters."""
+        return self._run(self.aget_nodes(node_ids, filters, limit))
+
+    # --------------------------------------------------------------------------
+    # Private methods
+    # --------------------------------------------------------------------------
+
+    def _run[T](self, coroutine: Coroutine[Any, Any, T]) -> T:
+        """Run the coroutine on the loop of the vector store and wait for the result."""
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="qdrant-loop", daemon=True).start()
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
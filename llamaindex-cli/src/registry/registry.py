@@ -1,17 +1,12 @@
 """Registry Class."""
 
-import faiss
 from llama_index.core import Document, VectorStoreIndex
 from llama_index.core.base.base_query_engine import BaseQueryEngine
 from llama_index.core.base.embeddings.base import BaseEmbedding
 from llama_index.core.llms import LLM
-from llama_index.core.vector_stores import SimpleVectorStore
 from llama_index.core.vector_stores.types import BasePydanticVectorStore
 from llama_index.embeddings.openai import OpenAIEmbedding
-from llama_index.vector_stores.faiss import FaissVectorStore
-from llama_index.vector_stores.qdrant import QdrantVectorStore
 from loguru import logger
-from qdrant_client import QdrantClient
 
 from agents.ai_tools import get_search_web, record_notes, review_report, write_report
 from agents.workflow import (
@@ -26,22 +21,43 @@ from agents.workflow import (
 )
 from env.env import EnvSettings
 from infrastructure.documents.document import DocumentList, StorageMode
-from infrastructure.documents.github import GithubDocumentList
+from infrastructure.cache.embedding_cache import EmbeddingCache
+from infrastructure.documents.github import DEFAULT_BRANCH, GithubDocumentList
+from infrastructure.documents.github_fetcher import GITHUB_API_URL, GithubFetcher
+from infrastructure.documents.manifest import IndexManifest
+from infrastructure.llm.cached_embedding import CachedEmbedding
 from infrastructure.llm.models import (
     create_lmstudio_embedding_llm,
     create_lmstudio_llm,
     create_ollama_embedding_llm,
     create_ollama_llm,
     create_openai_llm,
+    get_embedding_dimension,
 )
+from infrastructure.vector_stores.faiss_store import FaissIndexType, TrainedFaissVectorStore, build_faiss_index
+from infrastructure.vector_stores.npy_store import NpyVectorStore
+from infrastructure.vector_stores.qdrant_store import QdrantConfig, build_qdrant_vector_store
 from use_cases.any_question import AnyQuestionAgent
-from use_cases.github_index import GithubIndex
+from use_cases.benchmark_faiss import BenchmarkFaissIndex
+from use_cases.benchmark_github_fetch import BenchmarkGithubFetch
+from use_cases.benchmark_qdrant import BenchmarkQdrant
+from use_cases.benchmark_vector_store import BenchmarkVectorStoreStartup
+from use_cases.github_index import FAISS_PERSIST_DIR, GithubIndex
 from use_cases.multi_agent import MultiAgent
 from use_cases.query_docs import DocsAgent
 from use_cases.query_image import QueryImageAgent
 from use_cases.tech_question import TechQuestionAgent
 from use_cases.tool import ToolAgent
 
+EMBEDDING_CACHE_PATH = "storage/cache/embeddings.sqlite3"
+EMBEDDING_CACHE_MAX_ENTRIES = 200_000
+# manifest of indexed github files per vector store
+GITHUB_MANIFEST_PATH = "storage/github/{db_name}_manifest.json"
+# blob cache and ETags of github fetcher
+GITHUB_CACHE_DIR = "storage/cache/github"
+GITHUB_BENCHMARK_CACHE_DIR = "storage/cache/github_benchmark"
+GITHUB_FETCH_MAX_CONCURRENCY = 8
+
 
 class DependencyRegistry:
     """Dependency Registry."""
@@ -51,6 +67,7 @@ class DependencyRegistry:
         self._settings = EnvSettings()  # type: ignore[call-arg]
         self._tool = tool
         self._llm = self._build_llm(model, self._settings.OPENAI_API_KEY)
+        self._embedding_cache: EmbeddingCache | None = None
 
     # --------------------------------------------------------------------------
     # LLM, Embedding Model
@@ -95,36 +112,59 @@ class DependencyRegistry:
         else:
             msg = f"Unknown LLM toolkit: {self._tool}"
             raise ValueError(msg)
-        return embed_model
+        # re-embedding of unchanged texts and repeated queries is served from the persistent cache
+        return CachedEmbedding(embed_model, self._build_embedding_cache())
+
+    def _build_embedding_cache(self) -> EmbeddingCache:
+        """Build the persistent embedding cache shared by all embedding models built by this registry."""
+        if self._embedding_cache is None:
+            self._embedding_cache = EmbeddingCache(EMBEDDING_CACHE_PATH, max_entries=EMBEDDING_CACHE_MAX_ENTRIES)
+        return self._embedding_cache
 
     # --------------------------------------------------------------------------
     # Vector Store
     # --------------------------------------------------------------------------
 
-    def _build_vector_store(self, db_name: str) -> BasePydanticVectorStore:
+    def _build_vector_store(
+        self,
+        db_name: str,
+        embedding_model: str,
+        embedding_dimension: int,
+        faiss_index_type: str,
+        qdrant_config: QdrantConfig,
+    ) -> BasePydanticVectorStore:
+        """Build the vector store to index into.
+
+        `embedding_dimension` of 0 means the known dimension of `embedding_model`, so the model isn't called.
+        """
         vector_store: BasePydanticVectorStore
         if db_name == "qdrant":
-            client = QdrantClient(host="localhost", port=6333)
-            # aclient = AsyncQdrantClient(location=":memory:")
-            # aclient = AsyncQdrantClient(host="localhost", port=6333)
-            vector_store = QdrantVectorStore(
-                client=client,
-                # aclient=aclient,
-                collection_name="githbu_docs",
-                # enable_hybrid=True,
-                fastembed_sparse_model="Qdrant/bm25",
-            )
+            dimension = embedding_dimension or get_embedding_dimension(embedding_model)
+            vector_store = build_qdrant_vector_store(qdrant_config, dimension)
         elif db_name == "faiss":
-            d = 1536
-            faiss_index = faiss.IndexFlatL2(d)
-            vector_store = FaissVectorStore(faiss_index=faiss_index)
+            dimension = embedding_dimension or get_embedding_dimension(embedding_model)
+            logger.debug(f"faiss index: {faiss_index_type}, dimension: {dimension}")
+            faiss_index = build_faiss_index(FaissIndexType.from_str(faiss_index_type), dimension)
+            vector_store = TrainedFaissVectorStore(faiss_index=faiss_index)
         elif db_name == "":
-            vector_store = SimpleVectorStore()
+            vector_store = NpyVectorStore()
         else:
             msg = f"Unknown vector store: {db_name}"
             raise ValueError(msg)
         return vector_store
 
+    def _build_saved_vector_store(
+        self, db_name: str, embedding_model: str, qdrant_config: QdrantConfig
+    ) -> BasePydanticVectorStore:
+        """Build the vector store of the saved index to search. Nothing depends on the dimension."""
+        if db_name == "qdrant":
+            # the collection is configured already
+            return build_qdrant_vector_store(qdrant_config)
+        if db_name == "faiss":
+            # the dimension and the vectors are read from the saved index
+            return TrainedFaissVectorStore.load(FAISS_PERSIST_DIR)
+        return self._build_vector_store(db_name, embedding_model, 0, FaissIndexType.FLAT.value, qdrant_config)
+
     # --------------------------------------------------------------------------
     # Document
     # --------------------------------------------------------------------------
@@ -191,15 +231,44 @@ class DependencyRegistry:
 
         return MultiAgent(multi_workflow)
 
-    def _build_github_index_usecase(self, embedding_model: str, db_name: str) -> GithubIndex:
-        """Build the github index usecase."""
+    def _build_github_fetcher(self, cache_dir: str, base_url: str = GITHUB_API_URL) -> GithubFetcher:
+        """Build the github fetcher."""
+        return GithubFetcher(
+            self._settings.GITHUB_TOKEN,
+            self._settings.GITHUB_OWNER,
+            self._settings.GITHUB_REPO,
+            cache_dir=cache_dir,
+            base_url=base_url,
+            max_concurrency=GITHUB_FETCH_MAX_CONCURRENCY,
+        )
+
+    def _build_github_index_usecase(
+        self,
+        embedding_model: str,
+        db_name: str,
+        faiss_index_type: str,
+        qdrant_config: QdrantConfig,
+        embedding_dimension: int,
+        search: bool,
+    ) -> GithubIndex:
+        """Build the github index usecase. With `search`, the vector store of the saved index is used."""
         embed_model = self._build_embedding_model(embedding_model)
         github_docs = GithubDocumentList(
-            self._settings.GITHUB_TOKEN, self._settings.GITHUB_OWNER, self._settings.GITHUB_REPO
+            self._settings.GITHUB_TOKEN,
+            self._settings.GITHUB_OWNER,
+            self._settings.GITHUB_REPO,
+            self._build_github_fetcher(GITHUB_CACHE_DIR),
         )
         # vector store
-        vector_store = self._build_vector_store(db_name)
-        return GithubIndex(self._llm, embed_model, github_docs, vector_store)
+        vector_store = (
+            self._build_saved_vector_store(db_name, embedding_model, qdrant_config)
+            if search
+            else self._build_vector_store(
+                db_name, embedding_model, embedding_dimension, faiss_index_type, qdrant_config
+            )
+        )
+        manifest = IndexManifest(GITHUB_MANIFEST_PATH.format(db_name=db_name or "simple"))
+        return GithubIndex(self._llm, embed_model, github_docs, vector_store, manifest)
 
     # --------------------------------------------------------------------------
     # Getter for use cases
@@ -241,7 +310,44 @@ class DependencyRegistry:
         self._multi_agent_usecase = self._build_multi_agent_usecase()
         return self._multi_agent_usecase
 
-    def get_github_index_usecase(self, embedding_model: str, db_name: str) -> GithubIndex:
-        """Get the multi agent usecase."""
-        self._github_index_usecase = self._build_github_index_usecase(embedding_model, db_name)
+    def get_github_index_usecase(
+        self,
+        embedding_model: str,
+        db_name: str,
+        faiss_index_type: str = FaissIndexType.FLAT.value,
+        qdrant_config: QdrantConfig | None = None,
+        embedding_dimension: int = 0,
+        search: bool = False,
+    ) -> GithubIndex:
+        """Get the multi agent usecase.
+
+        `embedding_dimension` of 0 means the known dimension of `embedding_model`.
+        `search` uses the saved index as is, so the dimension isn't needed.
+        """
+        self._github_index_usecase = self._build_github_index_usecase(
+            embedding_model, db_name, faiss_index_type, qdrant_config or QdrantConfig(), embedding_dimension, search
+        )
         return self._github_index_usecase
+
+    def get_benchmark_github_fetch_usecase(self, base_url: str) -> BenchmarkGithubFetch:
+        """Get the benchmark github fetch usecase. `base_url` can point to a local stub of the Github API."""
+        fetcher = self._build_github_fetcher(GITHUB_BENCHMARK_CACHE_DIR, base_url or GITHUB_API_URL)
+        return BenchmarkGithubFetch(fetcher, DEFAULT_BRANCH)
+
+    def get_benchmark_faiss_usecase(
+        self, dimension: int, vectors: int, queries: int, top_k: int
+    ) -> BenchmarkFaissIndex:
+        """Get the benchmark faiss index usecase."""
+        return BenchmarkFaissIndex(dimension, vectors, queries, top_k)
+
+    def get_benchmark_vector_store_usecase(
+        self, dimension: int, nodes: int, queries: int
+    ) -> BenchmarkVectorStoreStartup:
+        """Get the benchmark vector store startup usecase."""
+        return BenchmarkVectorStoreStartup(dimension, nodes, queries)
+
+    def get_benchmark_qdrant_usecase(
+        self, qdrant_config: QdrantConfig, dimension: int, points: int, queries: int
+    ) -> BenchmarkQdrant:
+        """Get the benchmark qdrant usecase."""
+        return BenchmarkQdrant(qdrant_config, dimension, points, queries)
@@ -0,0 +1,127 @@
+"""Benchmark FAISS Index Use Case."""
+
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+import faiss
+import numpy as np
+from loguru import logger
+
+from infrastructure.vector_stores.faiss_store import FaissIndexType, build_faiss_index, set_search_params
+
+
+@dataclass(frozen=True)
+class FaissIndexResult:
+    """Build time, size and query latency of an index type."""
+
+    index_type: str
+    build_seconds: float
+    size_bytes: int
+    load_seconds: float
+    query_p50_ms: float
+    query_p95_ms: float
+    recall: float
+
+
+class BenchmarkFaissIndex:
+    """Benchmark FAISS Index Use Case.
+
+    Vectors are synthetic clusters of normalized embeddings. Each index type is built (trained and added),
+    written by `faiss.write_index`, loaded by mmap and queried one by one.
+    Recall@k is measured against the exact neighbors of the flat index.
+    """
+
+    def __init__(self, dimension: int, vectors: int, queries: int, top_k: int = 10, seed: int = 0) -> None:
+        """Initialize the Benchmark FAISS Index."""
+        if vectors < 1 or queries < 1 or top_k < 1:
+            msg = "`vectors`, `queries` and `top_k` must be positive"
+            raise ValueError(msg)
+        self._dimension = dimension
+        self._vectors = vectors
+        self._queries = queries
+        self._top_k = top_k
+        self._seed = seed
+
+    def run(self, index_types: list[str]) -> list[FaissIndexResult]:
+        """Run the index types (all types if empty) and print the results."""
+        types = [FaissIndexType.from_str(index_type) for index_type in index_types] or list(FaissIndexType)
+        data, queries = self._generate()
+        exact = faiss.IndexFlatL2(self._dimension)
+        exact.add(data)
+        _, ground_truth = exact.search(queries, self._top_k)
+
+        results: list[FaissIndexResult] = []
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for index_type in types:
+                logger.info(f"benchmark faiss index: {index_type.value}")
+                results.append(self._benchmark(index_type, data, queries, ground_truth, Path(tmp_dir)))
+
+        print(
+            f"{'index':<10}{'build(s)':>10}{'size(MB)':>10}{'load(ms)':>10}{'p50(ms)':>9}{'p95(ms)':>9}"
+            f"{f'recall@{self._top_k}':>11}"
+        )
+        for result in results:
+            print(
+                f"{result.index_type:<10}{result.build_seconds:>10.3f}{result.size_bytes / 1e6:>10.2f}"
+                f"{result.load_seconds * 1e3:>10.2f}{result.query_p50_ms:>9.3f}{result.query_p95_ms:>9.3f}"
+                f"{result.recall:>11.3f}"
+            )
+        return results
+
+    # --------------------------------------------------------------------------
+    # Private methods
+    # --------------------------------------------------------------------------
+
+    def _generate(self) -> tuple[np.ndarray, np.ndarray]:
+        """Generate clustered vectors and queries near them."""
+        rng = np.random.default_rng(self._seed)
+        centers = rng.standard_normal((max(1, self._vectors // 100), self._dimension), dtype=np.float32)
+        data = centers[rng.integers(len(centers), size=self._vectors)]
+        data += 0.5 * rng.standard_normal(data.shape, dtype=np.float32)
+        data /= np.linalg.norm(data, axis=1, keepdims=True)
+        queries = data[rng.integers(self._vectors, size=self._queries)]
+        queries = queries + 0.1 * rng.standard_normal(queries.shape, dtype=np.float32)
+        return data, queries.astype(np.float32)
+
+    def _benchmark(
+        self,
+        index_type: FaissIndexType,
+        data: np.ndarray,
+        queries: np.ndarray,
+        ground_truth: np.ndarray,
+        tmp_dir: Path,
+    ) -> FaissIndexResult:
+        """Build, persist, load and query the index."""
+        start = time.perf_counter()
+        faiss_index = build_faiss_index(index_type, self._dimension)
+        if not faiss_index.is_trained:
+            faiss_index.train(data)
+        faiss_index.add(data)
+        build_seconds = time.perf_counter() - start
+
+        path = tmp_dir / f"{index_type.value}.faiss"
+        faiss.write_index(faiss_index, str(path))
+        start = time.perf_counter()
+        loaded = faiss.read_index(str(path), faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+        load_seconds = time.perf_counter() - start
+        set_search_params(loaded)
+
+        latencies = []
+        neighbors = []
+        for query in queries:
+            start = time.perf_counter()
+            _, indices = loaded.search(query.reshape(1, -1), self._top_k)
+            latencies.append(time.perf_counter() - start)
+            neighbors.append(indices[0])
+        hits = sum(len(set(found) & set(expected)) for found, expected in zip(neighbors, ground_truth, strict=True))
+        return FaissIndexResult(
+            index_type=index_type.value,
+            build_seconds=build_seconds,
+            size_bytes=path.stat().st_size,
+            load_seconds=load_seconds,
+            query_p50_ms=float(np.percentile(latencies, 50)) * 1e3,
+            query_p95_ms=float(np.percentile(latencies, 95)) * 1e3,
+            recall=hits / ground_truth.size,
+        )
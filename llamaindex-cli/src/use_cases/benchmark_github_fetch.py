@@ -0,0 +1,60 @@
+"""Benchmark Github Fetch Use Case."""
+
+import time
+from collections.abc import Sequence
+from dataclasses import dataclass
+
+from loguru import logger
+
+from infrastructure.documents.github import INDEXED_FILE_EXTENSIONS
+from infrastructure.documents.github_fetcher import GithubFetcher, GithubFetchStats
+
+
+@dataclass(frozen=True)
+class FetchResult:
+    """Wall time and statistics of a fetch."""
+
+    name: str
+    files: int
+    wall_seconds: float
+    stats: GithubFetchStats
+
+
+class BenchmarkGithubFetch:
+    """Benchmark Github Fetch Use Case.
+
+    The head, the tree and the blobs are fetched on an empty cache (cold), then fetched again (warm),
+    where the head is revalidated by its ETag and the tree and the blobs are served from the blob cache.
+    """
+
+    def __init__(self, fetcher: GithubFetcher, branch: str) -> None:
+        """Initialize the Benchmark Github Fetch with a fetcher of its own cache."""
+        self._fetcher = fetcher
+        self._branch = branch
+
+    def run(self, directories: Sequence[str] = ()) -> list[FetchResult]:
+        """Run cold and warm fetches and print the results."""
+        self._fetcher.clear_cache()
+        results = [self._fetch("cold", directories), self._fetch("warm", directories)]
+        print(f"{'fetch':<8}{'files':>7}{'wall(s)':>10}{'requests':>10}{'304':>6}{'cache hits':>12}{'bytes':>12}")
+        for result in results:
+            print(
+                f"{result.name:<8}{result.files:>7}{result.wall_seconds:>10.3f}{result.stats.requests:>10}"
+                f"{result.stats.not_modified:>6}{result.stats.cache_hits:>12}{result.stats.downloaded_bytes:>12}"
+            )
+        return results
+
+    # --------------------------------------------------------------------------
+    # Private methods
+    # --------------------------------------------------------------------------
+
+    def _fetch(self, name: str, directories: Sequence[str]) -> FetchResult:
+        """Fetch the head, the tree and the blobs."""
+        self._fetcher.reset_stats()
+        start = time.perf_counter()
+        _, tree_sha = self._fetcher.get_head(self._branch)
+        files = self._fetcher.list_files(tree_sha, INDEXED_FILE_EXTENSIONS, directories)
+        self._fetcher.get_blobs(files)
+        wall_seconds = time.perf_counter() - start
+        logger.info(f"github fetch: {name}: files: {len(files)}, elapsed: {wall_seconds:.2f}s")
+        return FetchResult(name, len(files), wall_seconds, self._fetcher.stats())
@@ -0,0 +1,140 @@
+"""Benchmark Qdrant Use Case."""
+
+import dataclasses
+import time
+import uuid
+from dataclasses import dataclass
+
+import numpy as np
+from llama_index.core.schema import BaseNode, TextNode
+from llama_index.core.vector_stores.types import VectorStoreQuery, VectorStoreQueryMode
+from llama_index.vector_stores.qdrant import QdrantVectorStore
+from loguru import logger
+
+from infrastructure.vector_stores.qdrant_store import QdrantConfig, build_qdrant_vector_store
+
+WORDS = ("lambda", "bucket", "queue", "python", "docker", "network", "index", "vector", "query", "cache")
+
+
+@dataclass(frozen=True)
+class QdrantResult:
+    """Ingestion throughput and query latency of an ingestion mode."""
+
+    mode: str
+    points: int
+    ingest_seconds: float
+    query_p50_seconds: float
+    query_p95_seconds: float
+    hybrid_p50_seconds: float | None
+
+    @property
+    def points_per_second(self) -> float:
+        """Ingestion throughput."""
+        return self.points / self.ingest_seconds
+
+
+class BenchmarkQdrant:
+    """Benchmark Qdrant Use Case.
+
+    The same synthetic nodes are uploaded by the sync client (batches one by one) and the async client
+    (`parallel` batches in flight), then the collection is queried by dense vectors, and by dense and sparse
+    vectors if `hybrid` of the config is set (which needs `fastembed`).
+    Note: the in-memory mode (":memory:") searches by brute force and runs the async client on one thread,
+    so HNSW, quantization and parallel uploads show their effect only against a Qdrant server.
+    """
+
+    def __init__(self, config: QdrantConfig, dimension: int, points: int, queries: int, top_k: int = 10) -> None:
+        """Initialize the Benchmark Qdrant."""
+        if points < 1 or queries < 1:
+            msg = "`points` and `queries` must be positive"
+            raise ValueError(msg)
+        self._config = config
+        self._dimension = dimension
+        self._points = points
+        self._queries = queries
+        self._top_k = top_k
+
+    def run(self, seed: int = 0) -> list[QdrantResult]:
+        """Run the sync and async ingestion, and print the results."""
+        rng = np.random.default_rng(seed)
+        embeddings = rng.standard_normal((self._points, self._dimension), dtype=np.float32)
+        query_embeddings = rng.standard_normal((self._queries, self._dimension), dtype=np.float32)
+        texts = [" ".join(rng.choice(WORDS, size=20)) for _ in range(self._points)]
+        logger.info(f"benchmark qdrant: {self._config}, points: {self._points}, dimension: {self._dimension}")
+
+        results = [
+            self._benchmark("sync", texts, embeddings, query_embeddings, async_ingest=False),
+            self._benchmark("async", texts, embeddings, query_embeddings, async_ingest=True),
+        ]
+
+        print(f"{'mode':<7}{'ingest(s)':>11}{'points/s':>11}{'p50(ms)':>10}{'p95(ms)':>10}{'hybrid p50(ms)':>16}")
+        for result in results:
+            hybrid = f"{result.hybrid_p50_seconds * 1e3:>16.2f}" if result.hybrid_p50_seconds is not None else ""
+            print(
+                f"{result.mode:<7}{result.ingest_seconds:>11.2f}{result.points_per_second:>11.0f}"
+                f"{result.query_p50_seconds * 1e3:>10.2f}{result.query_p95_seconds * 1e3:>10.2f}{hybrid}"
+            )
+        return results
+
+    # --------------------------------------------------------------------------
+    # Private methods
+    # --------------------------------------------------------------------------
+
+    def _benchmark(
+        self,
+        mode: str,
+        texts: list[str],
+        embeddings: np.ndarray,
+        query_embeddings: np.ndarray,
+        *,
+        async_ingest: bool,
+    ) -> QdrantResult:
+        """Upload the nodes into a new collection and query it."""
+        config = dataclasses.replace(
+            self._config, collection_name=f"{self._config.collection_name}_{mode}", async_ingest=async_ingest
+        )
+        vector_store = build_qdrant_vector_store(config, self._dimension)
+        nodes: list[BaseNode] = [
+            TextNode(text=text, id_=str(uuid.uuid4()), embedding=embedding.tolist())
+            for text, embedding in zip(texts, embeddings, strict=True)
+        ]
+        try:
+            start = time.perf_counter()
+            vector_store.add(nodes)
+            ingest_seconds = time.perf_counter() - start
+            logger.debug(f"{mode}: ingested: {len(nodes)}, elapsed: {ingest_seconds:.2f}s")
+
+            latencies = self._query(vector_store, query_embeddings, VectorStoreQueryMode.DEFAULT)
+            hybrid_p50 = None
+            if config.hybrid:
+                hybrid_latencies = self._query(vector_store, query_embeddings, VectorStoreQueryMode.HYBRID)
+                hybrid_p50 = float(np.percentile(hybrid_latencies, 50))
+        finally:
+            vector_store.clear()
+        return QdrantResult(
+            mode,
+            len(nodes),
+            ingest_seconds,
+            float(np.percentile(latencies, 50)),
+            float(np.percentile(latencies, 95)),
+            hybrid_p50,
+        )
+
+    def _query(
+        self, vector_store: QdrantVectorStore, query_embeddings: np.ndarray, query_mode: VectorStoreQueryMode
+    ) -> list[float]:
+        """Query the collection and return the latencies."""
+        latencies = []
+        for i, query_embedding in enumerate(query_embeddings):
+            query = VectorStoreQuery(
+                query_embedding=query_embedding.tolist(),
+                query_str=" ".join(WORDS[j % len(WORDS)] for j in range(i, i + 3)),
+                similarity_top_k=self._top_k,
+                sparse_top_k=self._top_k,
+                hybrid_top_k=self._top_k,
+                mode=query_mode,
+            )
+            start = time.perf_counter()
+            vector_store.query(query)
+            latencies.append(time.perf_counter() - start)
+        return latencies
@@ -0,0 +1,110 @@
+"""Benchmark Vector Store Startup Use Case."""
+
+import tempfile
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+from llama_index.core import MockEmbedding, StorageContext, VectorStoreIndex, load_index_from_storage
+from llama_index.core.schema import TextNode
+from llama_index.core.vector_stores import SimpleVectorStore
+from loguru import logger
+
+from infrastructure.vector_stores.npy_store import NpyVectorStore, build_npy_storage_context
+
+
+@dataclass(frozen=True)
+class StartupResult:
+    """Size, startup time and first query latency of a store."""
+
+    store: str
+    size_bytes: int
+    startup_seconds: float
+    first_query_seconds: float
+    query_seconds: float
+
+
+class BenchmarkVectorStoreStartup:
+    """Benchmark Vector Store Startup Use Case.
+
+    The same synthetic nodes are persisted by the JSON store (`SimpleVectorStore` and `SimpleDocumentStore`)
+    and the npy store (`NpyVectorStore` and the SQLite docstore). Startup is `load_index_from_storage()`,
+    and queries go through a retriever, so the npy store reads embeddings and nodes on the first query.
+    """
+
+    def __init__(self, dimension: int, nodes: int, queries: int, top_k: int = 5, seed: int = 0) -> None:
+        """Initialize the Benchmark Vector Store Startup."""
+        if nodes < 1 or queries < 1:
+            msg = "`nodes` and `queries` must be positive"
+            raise ValueError(msg)
+        self._dimension = dimension
+        self._nodes = nodes
+        self._queries = queries
+        self._top_k = top_k
+        self._seed = seed
+
+    def run(self) -> list[StartupResult]:
+        """Run the JSON store and the npy store, and print the results."""
+        embed_model = MockEmbedding(embed_dim=self._dimension)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            json_dir = str(Path(tmp_dir) / "json")
+            npy_dir = str(Path(tmp_dir) / "npy")
+            logger.info(f"benchmark vector store startup: nodes: {self._nodes}, dimension: {self._dimension}")
+            self._store(StorageContext.from_defaults(vector_store=SimpleVectorStore()), json_dir, embed_model)
+            self._store(build_npy_storage_context(npy_dir, NpyVectorStore()), npy_dir, embed_model)
+
+            results = [
+                self._benchmark("json", json_dir, lambda: StorageContext.from_defaults(persist_dir=json_dir)),
+                self._benchmark("npy", npy_dir, lambda: build_npy_storage_context(npy_dir)),
+            ]
+
+        print(f"{'store':<7}{'size(MB)':>10}{'startup(ms)':>13}{'first query(ms)':>17}{'query(ms)':>11}")
+        for result in results:
+            print(
+                f"{result.store:<7}{result.size_bytes / 1e6:>10.2f}{result.startup_seconds * 1e3:>13.2f}"
+                f"{result.first_query_seconds * 1e3:>17.2f}{result.query_seconds * 1e3:>11.2f}"
+            )
+        return results
+
+    # --------------------------------------------------------------------------
+    # Private methods
+    # --------------------------------------------------------------------------
+
+    def _store(self, storage_context: StorageContext, persist_dir: str, embed_model: MockEmbedding) -> None:
+        """Store synthetic nodes with random embeddings."""
+        rng = np.random.default_rng(self._seed)
+        embeddings = rng.standard_normal((self._nodes, self._dimension), dtype=np.float32)
+        nodes = [
+            TextNode(
+                text=f"chunk {i} " * 50,
+                id_=f"node-{i}",
+                embedding=embedding.tolist(),
+                metadata={"file_path": f"docs/{i // 10}.md"},
+            )
+            for i, embedding in enumerate(embeddings)
+        ]
+        index = VectorStoreIndex(nodes, storage_context=storage_context, embed_model=embed_model)
+        index.storage_context.persist(persist_dir=persist_dir)
+
+    def _benchmark(
+        self, store: str, persist_dir: str, build_storage_context: Callable[[], StorageContext]
+    ) -> StartupResult:
+        """Load the index and query it."""
+        embed_model = MockEmbedding(embed_dim=self._dimension)
+        start = time.perf_counter()
+        index = load_index_from_storage(build_storage_context(), embed_model=embed_model)
+        startup_seconds = time.perf_counter() - start
+
+        retriever = index.as_retriever(similarity_top_k=self._top_k)
+        start = time.perf_counter()
+        retriever.retrieve("first query")
+        first_query_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        for i in range(self._queries):
+            retriever.retrieve(f"query {i}")
+        query_seconds = (time.perf_counter() - start) / self._queries
+
+        size_bytes = sum(path.stat().st_size for path in Path(persist_dir).iterdir() if path.is_file())
+        return StartupResult(store, size_bytes, startup_seconds, first_query_seconds, query_seconds)
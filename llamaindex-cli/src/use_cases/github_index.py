@@ -1,15 +1,33 @@
 """Github Index Use Case."""
 
-from llama_index.core import StorageContext, VectorStoreIndex, load_index_from_storage
+import time
+from collections.abc import Sequence
+from typing import TYPE_CHECKING
+
+from llama_index.core import Document, Settings, StorageContext, VectorStoreIndex, load_index_from_storage
 from llama_index.core.base.embeddings.base import BaseEmbedding
 from llama_index.core.data_structs.data_structs import IndexDict
 from llama_index.core.indices.base import BaseIndex
 from llama_index.core.llms import LLM
-from llama_index.core.vector_stores import SimpleVectorStore
-from llama_index.core.vector_stores.types import BasePydanticVectorStore
+from llama_index.core.vector_stores.types import BasePydanticVectorStore, VectorStoreQueryMode
+from llama_index.vector_stores.faiss import FaissVectorStore
+from llama_index.vector_stores.qdrant import QdrantVectorStore
 from loguru import logger
 
 from infrastructure.documents.github import GithubDocumentList
+from infrastructure.documents.github_fetcher import in_directories
+from infrastructure.documents.manifest import ChunkEntry, FileEntry, IndexManifest
+from infrastructure.documents.utils import document_to_chunks
+from infrastructure.llm.cached_embedding import CachedEmbedding
+from infrastructure.vector_stores.npy_store import NpyVectorStore, build_npy_storage_context, is_npy_store
+
+if TYPE_CHECKING:
+    from llama_index.core.schema import BaseNode
+
+# candidates of each of dense and sparse search, which are fused into `similarity_top_k` results
+HYBRID_TOP_K = 10
+NPY_PERSIST_DIR = "storage/github/docs"
+FAISS_PERSIST_DIR = "storage/github/faiss"
 
 
 class GithubIndex:
@@ -24,44 +42,166 @@ class GithubIndex:
         embed_model: BaseEmbedding,
         github_docs: GithubDocumentList,
         vector_store: BasePydanticVectorStore,
+        manifest: IndexManifest,
     ) -> None:
-        """Initialize the Github Index with a LLM."""
+        """Initialize the Github Index with a LLM.
+
+        `manifest` records the indexed commit, blob SHAs and chunks of files indexed into `vector_store`.
+        """
         self._llm = llm
         self._embed_model = embed_model
         self._github_docs = github_docs
         self._vector_store = vector_store
+        self._manifest = manifest
         self._output_dir: str | None = None
-        if isinstance(vector_store, SimpleVectorStore):
-            self._output_dir = "storage/github/docs"
+        if isinstance(vector_store, NpyVectorStore):
+            self._output_dir = NPY_PERSIST_DIR
+        elif isinstance(vector_store, FaissVectorStore):
+            self._output_dir = FAISS_PERSIST_DIR
+
+    def store_index(self, full: bool = False, directories: Sequence[str] = ()) -> None:
+        """Create github document and vector index and store it incrementally.
+
+        Only files changed since the last indexed commit are fetched, and only new or changed chunks are upserted.
+        Vectors of removed files and chunks are deleted. `full` rebuilds the index from scratch.
+        FAISS index can't delete vectors, so it's always rebuilt (and IVF indexes are trained on the whole corpus).
+        `directories` limits the update to the files under them, and the indexed commit is kept as is.
+        They are ignored when the index is rebuilt, since a rebuild covers the whole repository.
+        """
+        start = time.perf_counter()
+        commit_sha, tree_sha = self._github_docs.get_head()
+        full = full or not self._can_update()
+        if full and directories:
+            # a rebuild limited to the directories would drop every other file from the index
+            logger.warning(f"index is rebuilt from the whole repository, so directories are ignored: {directories}")
+            directories = ()
+        if not full and not directories and self._manifest.commit == commit_sha:
+            logger.info(f"index is up to date: commit: {commit_sha}")
+            return
+
+        # 1. diff files against the manifest
+        files = self._github_docs.list_files(tree_sha, directories)
+        if full:
+            self._manifest.clear()
+        changed = self._manifest.changed_files(files)
+        removed = [path for path in self._manifest.removed_files(files) if in_directories(path, directories)]
+        logger.info(f"files: {len(files)}, changed: {len(changed)}, removed: {len(removed)}")
 
-    def store_index(self) -> None:
-        """Create github document and vector index and store it."""
+        # 2. get documents of changed files
         logger.debug("start calling GithubDocumentList")
-        # 1. get documents
-        documents = self._github_docs.get_document()
+        documents = self._github_docs.get_documents(changed)
         logger.debug("end calling GithubDocumentList")
 
-        logger.debug("create index")
-        # Note: `ServiceContext`` is deprecated
-        # create storage context with specific storage
-        storage_context = StorageContext.from_defaults(vector_store=self._vector_store)
-        # create vector index with `embed_model`
-        index = VectorStoreIndex.from_documents(
-            documents, embed_model=self._embed_model, storage_context=storage_context
-        )
+        # 3. upsert and delete chunks
+        logger.debug("update index")
+        index = self._build_index() if full else self._load_index_for_update()
+        inserted, deleted = self._update_chunks(index, documents, changed)
+        for path in removed:
+            deleted += self._delete_nodes(index, self._manifest.files.pop(path).node_ids)
 
         logger.debug("store index")
         if self._output_dir is not None:
             index.storage_context.persist(persist_dir=self._output_dir)
         else:
             index.storage_context.persist()
-        logger.debug("index saved")
+        if not directories:
+            self._manifest.commit = commit_sha
+        self._manifest.save()
+        logger.info(
+            f"index saved: commit: {commit_sha}, inserted chunks: {inserted}, deleted chunks: {deleted}, "
+            f"elapsed: {time.perf_counter() - start:.2f}s"
+        )
+        self._log_embedding_cache_stats()
+
+    def _can_update(self) -> bool:
+        """Whether the stored index can be updated incrementally.
+
+        FAISS index can't delete vectors, and an index not stored (or stored in an old format) is rebuilt.
+        """
+        if isinstance(self._vector_store, FaissVectorStore) or self._manifest.is_empty:
+            return False
+        return not isinstance(self._vector_store, NpyVectorStore) or (
+            self._output_dir is not None and is_npy_store(self._output_dir)
+        )
+
+    def _build_index(self) -> VectorStoreIndex:
+        """Build an empty index on the cleared vector store."""
+        if not isinstance(self._vector_store, FaissVectorStore):
+            self._vector_store.clear()
+        # Note: `ServiceContext`` is deprecated
+        # create storage context with specific storage
+        if isinstance(self._vector_store, NpyVectorStore) and self._output_dir is not None:
+            storage_context = build_npy_storage_context(self._output_dir, self._vector_store)
+        else:
+            storage_context = StorageContext.from_defaults(vector_store=self._vector_store)
+        # create vector index with `embed_model`
+        return VectorStoreIndex(nodes=[], embed_model=self._embed_model, storage_context=storage_context)
+
+    def _load_index_for_update(self) -> VectorStoreIndex:
+        """Load the stored index to update."""
+        if isinstance(self._vector_store, NpyVectorStore) and self._output_dir is not None:
+            storage_context = build_npy_storage_context(self._output_dir)
+            index = load_index_from_storage(storage_context, embed_model=self._embed_model)
+            if not isinstance(index, VectorStoreIndex):
+                msg = f"Unexpected index type: {type(index)}"
+                raise TypeError(msg)
+            return index
+        return VectorStoreIndex.from_vector_store(self._vector_store, embed_model=self._embed_model)
+
+    def _update_chunks(
+        self, index: VectorStoreIndex, documents: list[Document], changed: dict[str, str]
+    ) -> tuple[int, int]:
+        """Insert new chunks of the documents and delete their stale chunks. Unchanged chunks are kept."""
+        deleted = 0
+        new_nodes: list[BaseNode] = []
+        for document in documents:
+            path = document.doc_id
+            chunks = document_to_chunks(document, Settings.node_parser)
+            entry = self._manifest.files.get(path)
+            old_ids = set(entry.node_ids) if entry is not None else set()
+            new_ids = {node.node_id for _, node in chunks}
+            deleted += self._delete_nodes(index, [node_id for node_id in old_ids if node_id not in new_ids])
+            new_nodes.extend(node for _, node in chunks if node.node_id not in old_ids)
+            self._manifest.files[path] = FileEntry(
+                changed[path], [ChunkEntry(content_hash, node.node_id) for content_hash, node in chunks]
+            )
+        # nodes are inserted at once, so embeddings are batched and FAISS IVF indexes are trained on all of them
+        index.insert_nodes(new_nodes)
+        return len(new_nodes), deleted
+
+    @staticmethod
+    def _delete_nodes(index: VectorStoreIndex, node_ids: list[str]) -> int:
+        """Delete nodes from the vector store, the docstore and the index struct."""
+        if not node_ids:
+            return 0
+        index.delete_nodes(node_ids, delete_from_docstore=True)
+        for node_id in node_ids:
+            if node_id in index.index_struct.nodes_dict:
+                index.index_struct.delete(node_id)
+        index.storage_context.index_store.add_index_struct(index.index_struct)
+        return len(node_ids)
+
+    def _log_embedding_cache_stats(self) -> None:
+        """Log hit/miss counters of the embedding cache."""
+        if isinstance(self._embed_model, CachedEmbedding):
+            stats = self._embed_model.cache.stats()
+            logger.info(
+                f"embedding cache: hits: {stats.hits}, misses: {stats.misses}, hit rate: {stats.hit_rate:.2%}, "
+                f"entries: {stats.entries}"
+            )
 
     def _load_saved_index(self) -> BaseIndex[IndexDict]:
         """Load saved index."""
         # https://docs.llamaindex.ai/en/stable/module_guides/storing/save_load/
-        if isinstance(self._vector_store, SimpleVectorStore):
-            storage_context = StorageContext.from_defaults(persist_dir=self._output_dir)
+        if isinstance(self._vector_store, NpyVectorStore) and self._output_dir is not None:
+            # embeddings are memory-mapped and nodes are read from the docstore on demand
+            storage_context = build_npy_storage_context(self._output_dir)
+            return load_index_from_storage(storage_context, embed_model=self._embed_model)
+        if isinstance(self._vector_store, FaissVectorStore) and self._output_dir is not None:
+            # the vector store holds the saved index, and FAISS doesn't store text, so nodes are loaded from the docstore
+            storage_context = StorageContext.from_defaults(
+                vector_store=self._vector_store, persist_dir=self._output_dir
+            )
             return load_index_from_storage(storage_context, embed_model=self._embed_model)
         return VectorStoreIndex.from_vector_store(self._vector_store, embed_model=self._embed_model)
 
@@ -69,7 +209,13 @@ class GithubIndex:
         """Ask the question from github docs."""
         logger.debug("load index from storage")
         index = self._load_saved_index()
-        query_engine = index.as_query_engine(self._llm)
+        if isinstance(self._vector_store, QdrantVectorStore) and self._vector_store.enable_hybrid:
+            # dense and sparse (BM25) results are fused
+            query_engine = index.as_query_engine(
+                self._llm, vector_store_query_mode=VectorStoreQueryMode.HYBRID, sparse_top_k=HYBRID_TOP_K
+            )
+        else:
+            query_engine = index.as_query_engine(self._llm)
 
         logger.debug(f"query: {question}")
         response = query_engine.query(question)
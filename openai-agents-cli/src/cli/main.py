@@ -1,10 +1,24 @@
 """main function for the CLI app."""
 
+import asyncio
+import json
+from pathlib import Path
+
 import typer
 
 # from dotenv import load_dotenv
 from loguru import logger
 
+from entities.embedding.loader import EmbeddingFileFormat, convert_embedding_file
+from entities.vector_index.types import (
+    IndexMethod,
+    IndexParams,
+    IndexTarget,
+    IterativeScan,
+    Quantization,
+    SearchFilter,
+    SearchParams,
+)
 from env.env import EnvSettings
 from registry.registry import DependencyRegistry
 
@@ -13,7 +27,7 @@ app = typer.Typer()
 
 
 @app.command()
-def query_tech_guide(
+def query_tech_guide(  # noqa: PLR0913, PLR0917
     tool: str = typer.Option("openai", "--tool", "-t", help="LLM tool name: openai, ollama, lmstudio"),
     model: str = typer.Option("gpt-4o", "--model", "-m", help="LLM model name"),
     embedding_model: str = typer.Option(
@@ -21,6 +35,15 @@ def query_tech_guide(
     ),
     question: str = typer.Option("", "--question", "-q", help="Question to ask the tech agent."),
     chat: bool = False,
+    stream: bool = False,
+    history_tokens: int = typer.Option(
+        0, "--history-tokens", help="Token budget of conversation history. 0 means unlimited."
+    ),
+    history_strategy: str = typer.Option(
+        "truncate", "--history-strategy", help="Strategy over the budget: truncate, summarize"
+    ),
+    cache: bool = True,
+    cache_backend: str = typer.Option("disk", "--cache-backend", help="LLM response cache: disk, memory"),
 ) -> None:
     """Custom technology agent."""
     logger.info("custom_tech_agent()")
@@ -30,15 +53,25 @@ def query_tech_guide(
         raise ValueError(msg)
 
     # Initialization
-    registry = DependencyRegistry(tool, model, embedding_model)
-    agent = registry.get_query_agent(chat)
-
-    # Execute
-    agent.query_tech_guide(question)
+    registry = DependencyRegistry(
+        tool,
+        model,
+        embedding_model,
+        history_max_tokens=history_tokens,
+        history_strategy=history_strategy,
+        response_cache=cache_backend if cache else None,
+    )
+    try:
+        agent = registry.get_query_agent(chat, stream)
+
+        # Execute
+        agent.query_tech_guide(question)
+    finally:
+        registry.close()
 
 
 @app.command()
-def query_common(
+def query_common(  # noqa: PLR0913, PLR0917
     tool: str = typer.Option("openai", "--tool", "-t", help="LLM tool name: openai, ollama, lmstudio"),
     model: str = typer.Option("gpt-4o", "--model", "-m", help="LLM model name"),
     embedding_model: str = typer.Option(
@@ -46,6 +79,21 @@ def query_common(
     ),
     question: str = typer.Option("", "--question", "-q", help="Question to ask the agent."),
     chat: bool = False,
+    stream: bool = False,
+    history_tokens: int = typer.Option(
+        0, "--history-tokens", help="Token budget of conversation history. 0 means unlimited."
+    ),
+    history_strategy: str = typer.Option(
+        "truncate", "--history-strategy", help="Strategy over the budget: truncate, summarize"
+    ),
+    cache: bool = True,
+    cache_backend: str = typer.Option("disk", "--cache-backend", help="LLM response cache: disk, memory"),
+    semantic_cache_distance: float = typer.Option(
+        0.0, "--semantic-cache-distance", help="Cosine distance to reuse cached answers. 0 disables the cache."
+    ),
+    semantic_cache_ttl: int = typer.Option(
+        86400, "--semantic-cache-ttl", help="Seconds until cached answers expire. 0 means never."
+    ),
 ) -> None:
     """Query common question."""
     logger.info("common query()")
@@ -55,15 +103,25 @@ def query_common(
         raise ValueError(msg)
 
     # Initialization
-    registry = DependencyRegistry(tool, model, embedding_model)
-    agent = registry.get_query_agent(chat)
-
-    # execute
-    agent.query_common(question)
+    registry = DependencyRegistry(
+        tool,
+        model,
+        embedding_model,
+        history_max_tokens=history_tokens,
+        history_strategy=history_strategy,
+        response_cache=cache_backend if cache else None,
+    )
+    try:
+        agent = registry.get_query_agent(chat, stream, semantic_cache_distance, semantic_cache_ttl)
+
+        # execute
+        agent.query_common(question)
+    finally:
+        registry.close()
 
 
 @app.command()
-def prompt_pattern(
+def prompt_pattern(  # noqa: PLR0913, PLR0917
     tool: str = typer.Option("openai", "--tool", "-t", help="LLM tool name: openai, ollama, lmstudio"),
     model: str = typer.Option("gpt-4o", "--model", "-m", help="LLM model name"),
     embedding_model: str = typer.Option(
@@ -71,16 +129,80 @@ def prompt_pattern(
     ),
     chat: bool = False,
     pattern: str = typer.Option("zero-shot", "--pattern", "-p", help="Prompting pattern: zero-shot, few-shot, etc."),
+    stream: bool = False,
+    parallel: bool = False,
+    samples: int = typer.Option(1, "--samples", help="Samples of self-consistency voted by majority."),
+    history_tokens: int = typer.Option(
+        0, "--history-tokens", help="Token budget of conversation history. 0 means unlimited."
+    ),
+    history_strategy: str = typer.Option(
+        "truncate", "--history-strategy", help="Strategy over the budget: truncate, summarize"
+    ),
+    cache: bool = True,
+    cache_backend: str = typer.Option("disk", "--cache-backend", help="LLM response cache: disk, memory"),
 ) -> None:
     """Prompt pattern agent."""
     logger.info("prompt_pattern_agent()")
 
     # Initialization
-    registry = DependencyRegistry(tool, model, embedding_model)
-    agent = registry.get_prompt_agent(chat)
+    registry = DependencyRegistry(
+        tool,
+        model,
+        embedding_model,
+        history_max_tokens=history_tokens,
+        history_strategy=history_strategy,
+        response_cache=cache_backend if cache else None,
+    )
+    try:
+        agent = registry.get_prompt_agent(chat, stream, parallel, samples)
+
+        # Execute
+        agent.call(pattern)
+    finally:
+        registry.close()
 
-    # Execute
-    agent.call(pattern)
+
+@app.command()
+def benchmark_prompts(  # noqa: PLR0913, PLR0917
+    tool: str = typer.Option("stub", "--tool", "-t", help="LLM tool name: stub, openai, ollama, lmstudio"),
+    model: str = typer.Option("gpt-4o", "--model", "-m", help="LLM model name"),
+    embedding_model: str = typer.Option(
+        "text-embedding-ada-002", "--embedding-model", "-e", help="LLM embedding model name"
+    ),
+    chat: bool = False,
+    stream: bool = False,
+    parallel: bool = False,
+    patterns: str = typer.Option("", "--patterns", help="Comma separated patterns. Empty runs all patterns."),
+    db: str = typer.Option("pgvector", "--db", help="Vector DB: pgvector, memory"),
+    output_dir: str = typer.Option("storage/benchmark", "--output-dir", "-o", help="Directory of JSON/CSV results."),
+) -> None:
+    """Benchmark latency and token usage of prompt patterns. Use `--tool stub` with `stub-server`."""
+    logger.debug("benchmark_prompts()")
+
+    registry = DependencyRegistry(tool, model, embedding_model, db=db)
+    try:
+        benchmark_prompt = registry.get_benchmark_prompt_usecase(chat, stream, parallel)
+
+        # execute
+        benchmark_prompt.run([pattern.strip() for pattern in patterns.split(",") if pattern.strip()], output_dir)
+    finally:
+        registry.close()
+
+
+@app.command()
+def stub_server(
+    latency: float = typer.Option(0.2, "--latency", help="Seconds until the first token."),
+    tokens_per_sec: float = typer.Option(50.0, "--tokens-per-sec", help="Output tokens generated per second."),
+    output_tokens: int = typer.Option(64, "--output-tokens", help="Output tokens per completion."),
+) -> None:
+    """Serve OpenAI compatible stub API on localhost for `--tool stub`."""
+    logger.debug("stub_server()")
+
+    registry = DependencyRegistry("stub", "stub")
+    server = registry.get_stub_server(latency, tokens_per_sec, output_tokens)
+
+    # execute
+    server.run()
 
 
 @app.command()
@@ -103,36 +225,282 @@ def news_agent(
 
 
 @app.command()
-def embedding(
+def embedding(  # noqa: PLR0913, PLR0917
     tool: str = typer.Option("openai", "--tool", "-t", help="LLM tool name: openai, ollama, lmstudio"),
     model: str = typer.Option("gpt-4o", "--model", "-m", help="LLM model name"),
+    file_path: str = typer.Option("storage/embedding01.json", "--file", "-f", help="Embedding dump file."),
+    file_format: str = typer.Option(
+        "", "--format", help="json, jsonl, npy, f32, repr. Guessed from the extension if empty."
+    ),
+    dimensions: int = typer.Option(0, "--dimensions", help="Dimensions of raw float32 file."),
+    batch_size: int = typer.Option(1000, "--batch-size", "-b", help="Rows per insert batch."),
+    db: str = typer.Option("pgvector", "--db", help="Vector DB: pgvector, memory"),
 ) -> None:
     """Embedding command for debug."""
     logger.debug("embedding()")
 
-    registry = DependencyRegistry(tool, model)
-    debug_agent = registry.get_debug_agent()
-    debug_agent.embedding("storage/embedding01.json")
+    registry = DependencyRegistry(tool, model, db=db)
+    try:
+        debug_agent = registry.get_debug_agent()
+        debug_agent.embedding(
+            file_path,
+            batch_size,
+            EmbeddingFileFormat.from_str(file_format) if file_format else None,
+            dimensions or None,
+        )
+    finally:
+        registry.close()
+
+
+@app.command()
+def convert_embedding(
+    src_path: str = typer.Option("storage/embedding_all.txt", "--src", help="Embedding dump file."),
+    dst_path: str = typer.Option("storage/embedding_all.npy", "--dst", help="Output `.npy` or `.f32` file."),
+    file_format: str = typer.Option(
+        "", "--format", help="Format of `--src`: json, jsonl, npy, f32, repr. Guessed from the extension if empty."
+    ),
+) -> None:
+    """Convert embedding dump file into binary format for memory-mapped import.
+
+    This command doesn't connect to DB.
+    """
+    logger.debug("convert_embedding()")
+
+    rows, dimensions = convert_embedding_file(
+        src_path, dst_path, EmbeddingFileFormat.from_str(file_format) if file_format else None
+    )
+    logger.info(f"converted: {src_path} -> {dst_path}, rows: {rows}, dimensions: {dimensions}")
+
+
+@app.command()
+def embed_texts(  # noqa: PLR0913, PLR0917
+    tool: str = typer.Option("openai", "--tool", "-t", help="LLM tool name: openai, ollama, lmstudio"),
+    model: str = typer.Option("gpt-4o", "--model", "-m", help="LLM model name"),
+    embedding_model: str = typer.Option(
+        "text-embedding-ada-002", "--embedding-model", "-e", help="LLM embedding model name"
+    ),
+    file_path: str = typer.Option("storage/tech-news01.txt", "--file", "-f", help="Text file, one text per line."),
+    max_batch_tokens: int = typer.Option(8000, "--max-batch-tokens", help="Token budget per embedding request."),
+    concurrency: int = typer.Option(4, "--concurrency", "-c", help="Number of concurrent embedding requests."),
+    batch_size: int = typer.Option(500, "--batch-size", "-b", help="Rows per insert batch."),
+    db: str = typer.Option("pgvector", "--db", help="Vector DB: pgvector, memory"),
+) -> None:
+    """Embed texts by batched, concurrent requests and store them into `item_contents`."""
+    logger.debug("embed_texts()")
+
+    registry = DependencyRegistry(tool, model, embedding_model, db=db)
+    try:
+        agent = registry.get_embed_texts_usecase(max_batch_tokens, concurrency)
+
+        # execute
+        agent.embed_file(file_path, batch_size)
+    finally:
+        registry.close()
 
 
 @app.command()
-def search_similarity(
+def search_similarity(  # noqa: PLR0913, PLR0917
     tool: str = typer.Option("openai", "--tool", "-t", help="LLM tool name: openai, ollama, lmstudio"),
     model: str = typer.Option("gpt-4o", "--model", "-m", help="LLM model name"),
     content_id: int = typer.Option(0, "--id", "-q", help="item_contents.id."),
+    ids: str = typer.Option("", "--ids", help="Comma separated item_contents.id list for bulk search."),
+    ids_file: str = typer.Option("", "--ids-file", help="File of item_contents.id separated by newlines or commas."),
+    top_k: int = typer.Option(3, "--top-k", "-k", help="Number of neighbors per id."),
+    batch_size: int = typer.Option(100, "--batch-size", "-b", help="Queries sent per round-trip in bulk search."),
+    ef_search: int = typer.Option(0, "--ef-search", help="hnsw.ef_search for this query. 0 means server default."),
+    probes: int = typer.Option(0, "--probes", help="ivfflat.probes for this query. 0 means server default."),
+    iterative_scan: str = typer.Option(
+        "", "--iterative-scan", help="off, strict_order, relaxed_order. Empty means relaxed_order with filters."
+    ),
+    metadata: str = typer.Option(
+        "", "--metadata", help='JSON object matched by `metadata @>`, e.g. {"source": "a.txt"}.'
+    ),
+    max_distance: float = typer.Option(0.0, "--max-distance", help="Cosine distance cutoff. 0 means no cutoff."),
+    quantization: str = typer.Option("none", "--quantization", help="Quantized index to search: none, halfvec, bit"),
+    rerank_candidates: int = typer.Option(0, "--rerank", help="Candidates re-ranked in quantized search. 0: top-k * 4"),
+    db: str = typer.Option("pgvector", "--db", help="Vector DB: pgvector, memory"),
 ) -> None:
-    """Search similarity."""
+    """Search similarity. `--ids` / `--ids-file` print neighbors of each id as JSON lines."""
     logger.debug("search_similarity()")
 
-    if content_id == 0:
-        msg = "parameter `--id` must be provided"
+    id_values = ids
+    if ids_file:
+        id_values += "," + Path(ids_file).read_text(encoding="utf-8")
+    content_ids = [int(value) for value in id_values.replace("\n", ",").split(",") if value.strip()]
+    if content_id == 0 and not content_ids:
+        msg = "parameter `--id`, `--ids` or `--ids-file` must be provided"
         raise ValueError(msg)
 
+    search_params = SearchParams(
+        ef_search=ef_search or None,
+        probes=probes or None,
+        iterative_scan=IterativeScan.from_str(iterative_scan) if iterative_scan else None,
+        quantization=Quantization.from_str(quantization),
+        rerank_candidates=rerank_candidates or None,
+    )
+    search_filter = SearchFilter(metadata=json.loads(metadata) if metadata else None, max_distance=max_distance or None)
+    registry = DependencyRegistry(tool, model, db=db)
+    try:
+        search_vector_db = registry.get_search_vector_db_usecase()
+
+        # Search target item_content from DB `item_contents`
+        if content_ids:
+            search_vector_db.search_similarity_many(content_ids, top_k, batch_size, search_params, search_filter)
+        else:
+            search_vector_db.search_similarity(content_id, top_k, search_params, search_filter)
+    finally:
+        registry.close()
+
+
+@app.command()
+def vector_index(  # noqa: PLR0913, PLR0917
+    tool: str = typer.Option("openai", "--tool", "-t", help="LLM tool name: openai, ollama, lmstudio"),
+    model: str = typer.Option("gpt-4o", "--model", "-m", help="LLM model name"),
+    action: str = typer.Option("create", "--action", "-a", help="Index action: create, rebuild, drop"),
+    target: str = typer.Option("item_contents", "--target", help="Target table: item_contents, embeddings"),
+    method: str = typer.Option("hnsw", "--method", help="Index method: hnsw, ivfflat"),
+    m: int = typer.Option(16, "--m", help="HNSW: max connections per layer."),
+    ef_construction: int = typer.Option(64, "--ef-construction", help="HNSW: candidate list size on build."),
+    lists: int = typer.Option(100, "--lists", help="IVFFlat: number of inverted lists."),
+    quantization: str = typer.Option("none", "--quantization", help="Indexed representation: none, halfvec, bit"),
+    db: str = typer.Option("pgvector", "--db", help="Vector DB: pgvector, memory"),
+) -> None:
+    """Manage ANN index (HNSW / IVFFlat) of pgvector tables."""
+    logger.debug("vector_index()")
+
+    params = IndexParams(IndexMethod.from_str(method), m, ef_construction, lists, Quantization.from_str(quantization))
+    registry = DependencyRegistry(tool, model, db=db)
+    try:
+        vector_index_agent = registry.get_vector_index_usecase()
+
+        # execute
+        vector_index_agent.manage(action, IndexTarget.from_str(target), params)
+    finally:
+        registry.close()
+
+
+@app.command()
+def benchmark_insert(
+    tool: str = typer.Option("openai", "--tool", "-t", help="LLM tool name: openai, ollama, lmstudio"),
+    model: str = typer.Option("gpt-4o", "--model", "-m", help="LLM model name"),
+    rows: int = typer.Option(2000, "--rows", "-r", help="Number of rows to insert."),
+    batch_size: int = typer.Option(500, "--batch-size", "-b", help="Rows committed per batch."),
+) -> None:
+    """Benchmark row-by-row insert against bulk insert (COPY / execute_values)."""
+    logger.debug("benchmark_insert()")
+
+    registry = DependencyRegistry(tool, model)
+    try:
+        benchmark_db = registry.get_benchmark_db_usecase()
+
+        # execute
+        benchmark_db.bulk_insert(rows, batch_size)
+    finally:
+        registry.close()
+
+
+@app.command()
+def benchmark_index(  # noqa: PLR0913, PLR0917
+    tool: str = typer.Option("openai", "--tool", "-t", help="LLM tool name: openai, ollama, lmstudio"),
+    model: str = typer.Option("gpt-4o", "--model", "-m", help="LLM model name"),
+    rows: int = typer.Option(10000, "--rows", "-r", help="Number of synthetic rows (corpus size)."),
+    queries: int = typer.Option(50, "--queries", help="Number of queries."),
+    top_k: int = typer.Option(10, "--top-k", "-k", help="Number of neighbors."),
+    method: str = typer.Option("hnsw", "--method", help="Index method: hnsw, ivfflat"),
+    m: int = typer.Option(16, "--m", help="HNSW: max connections per layer."),
+    ef_construction: int = typer.Option(64, "--ef-construction", help="HNSW: candidate list size on build."),
+    lists: int = typer.Option(100, "--lists", help="IVFFlat: number of inverted lists."),
+    search_values: str = typer.Option(
+        "10,20,40,80,160", "--search-values", help="Comma separated hnsw.ef_search or ivfflat.probes values."
+    ),
+) -> None:
+    """Report recall-vs-latency of ANN index against exact search."""
+    logger.debug("benchmark_index()")
+
+    params = IndexParams(IndexMethod.from_str(method), m, ef_construction, lists)
+    values = [int(value) for value in search_values.split(",") if value.strip()]
+    registry = DependencyRegistry(tool, model)
+    try:
+        benchmark_db = registry.get_benchmark_db_usecase()
+
+        # execute
+        benchmark_db.index_recall(rows, queries, top_k, params, values)
+    finally:
+        registry.close()
+
+
+@app.command()
+def benchmark_async_query(
+    tool: str = typer.Option("openai", "--tool", "-t", help="LLM tool name: openai, ollama, lmstudio"),
+    model: str = typer.Option("gpt-4o", "--model", "-m", help="LLM model name"),
+    rows: int = typer.Option(5000, "--rows", "-r", help="Number of synthetic rows (corpus size)."),
+    queries: int = typer.Option(200, "--queries", help="Number of queries."),
+    concurrency: int = typer.Option(8, "--concurrency", "-c", help="Number of concurrent queries."),
+    top_k: int = typer.Option(5, "--top-k", "-k", help="Number of neighbors."),
+) -> None:
+    """Compare concurrent similarity search throughput of sync and async repositories."""
+    logger.debug("benchmark_async_query()")
+
+    registry = DependencyRegistry(tool, model)
+    try:
+        benchmark_db = registry.get_benchmark_db_usecase()
+
+        # execute
+        asyncio.run(benchmark_db.query_throughput(rows, queries, concurrency, top_k))
+    finally:
+        registry.close()
+
+
+@app.command()
+def benchmark_backends(  # noqa: PLR0913, PLR0917
+    tool: str = typer.Option("openai", "--tool", "-t", help="LLM tool name: openai, ollama, lmstudio"),
+    model: str = typer.Option("gpt-4o", "--model", "-m", help="LLM model name"),
+    rows: int = typer.Option(10000, "--rows", "-r", help="Number of synthetic rows (corpus size)."),
+    queries: int = typer.Option(50, "--queries", help="Number of queries."),
+    top_k: int = typer.Option(10, "--top-k", "-k", help="Number of neighbors."),
+    method: str = typer.Option("ivfflat", "--method", help="Index method: hnsw, ivfflat"),
+    lists: int = typer.Option(100, "--lists", help="IVFFlat: number of inverted lists."),
+) -> None:
+    """Compare latency and recall of pgvector against the in-memory repository."""
+    logger.debug("benchmark_backends()")
+
+    params = IndexParams(IndexMethod.from_str(method), lists=lists)
+    registry = DependencyRegistry(tool, model)
+    try:
+        benchmark_db = registry.get_benchmark_db_usecase()
+
+        # execute
+        benchmark_db.compare_backends(rows, queries, top_k, params)
+    finally:
+        registry.close()
+
+
+@app.command()
+def benchmark_quantization(  # noqa: PLR0913, PLR0917
+    tool: str = typer.Option("openai", "--tool", "-t", help="LLM tool name: openai, ollama, lmstudio"),
+    model: str = typer.Option("gpt-4o", "--model", "-m", help="LLM model name"),
+    rows: int = typer.Option(10000, "--rows", "-r", help="Number of synthetic rows (corpus size)."),
+    queries: int = typer.Option(50, "--queries", help="Number of queries."),
+    top_k: int = typer.Option(10, "--top-k", "-k", help="Number of neighbors."),
+    method: str = typer.Option("hnsw", "--method", help="Index method: hnsw, ivfflat"),
+    lists: int = typer.Option(100, "--lists", help="IVFFlat: number of inverted lists."),
+    rerank_factors: str = typer.Option(
+        "1,4,10", "--rerank-factors", help="Comma separated factors of re-ranked candidates per top-k."
+    ),
+) -> None:
+    """Compare index size, recall and latency of full precision, halfvec and bit indexes."""
+    logger.debug("benchmark_quantization()")
+
+    params = IndexParams(IndexMethod.from_str(method), lists=lists)
+    factors = [int(value) for value in rerank_factors.split(",") if value.strip()]
     registry = DependencyRegistry(tool, model)
-    search_vector_db = registry.get_search_vector_db_usecase()
+    try:
+        benchmark_db = registry.get_benchmark_db_usecase()
 
-    # Search target item_content from DB `item_contents`
-    search_vector_db.search_similarity(content_id)
+        # execute
+        benchmark_db.quantization_recall(rows, queries, top_k, params, factors)
+    finally:
+        registry.close()
 
 
 @app.callback()
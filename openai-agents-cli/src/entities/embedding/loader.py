@@ -0,0 +1,229 @@
+"""Streaming loader for embedding dump files.
+
+Supported formats:
+- `json`: a single vector `[...]`, a list of vectors, or a list of `{"embedding": [...], "index": ...}`
+- `jsonl`: one vector or one `{"embedding": [...], "index": ...}` per line
+- `npy`: 1-D or 2-D float array, memory-mapped
+- `f32`: raw little-endian float32, memory-mapped, `dimensions` is required
+- `repr`: dump of `print(list[Embedding])` such as `storage/embedding_all.txt`
+
+All formats except `json` are read with constant memory regardless of the file size.
+"""
+
+import json
+import re
+from collections.abc import Iterator
+from enum import Enum
+from pathlib import Path
+
+import numpy as np
+
+from entities.embedding.types import Embedding, EmbeddingBatch
+
+# read size of text formats
+CHUNK_SIZE = 1 << 20
+
+# `Embedding(embedding=[...], index=0, object='embedding')`, `index` may also come first as the former `__repr__`
+REPR_PATTERN = re.compile(
+    r"Embedding\((?:index=(?P<index1>\d+), )?embedding=\[(?P<values>[^\]]*)\]"
+    r"(?:, index=(?P<index2>\d+))?, object='(?P<object>[^']*)'\)"
+)
+
+
+class EmbeddingFileFormat(Enum):
+    """Embedding file format."""
+
+    JSON = "json"
+    JSONL = "jsonl"
+    NPY = "npy"
+    F32 = "f32"
+    REPR = "repr"
+
+    @classmethod
+    def from_str(cls, format_str: str) -> "EmbeddingFileFormat":
+        """Change string to EmbeddingFileFormat."""
+        for file_format in cls:
+            if file_format.value == format_str:
+                return file_format
+        msg = f"'{format_str}' is not a valid EmbeddingFileFormat"
+        raise ValueError(msg)
+
+    @classmethod
+    def from_path(cls, file_path: str) -> "EmbeddingFileFormat":
+        """Guess EmbeddingFileFormat from the file extension."""
+        suffix = Path(file_path).suffix.lower()
+        suffixes = {
+            ".json": cls.JSON,
+            ".jsonl": cls.JSONL,
+            ".npy": cls.NPY,
+            ".f32": cls.F32,
+            ".bin": cls.F32,
+            ".txt": cls.REPR,
+        }
+        if suffix not in suffixes:
+            msg = f"can't guess embedding file format from '{file_path}'"
+            raise ValueError(msg)
+        return suffixes[suffix]
+
+
+def iter_embedding_batches(
+    file_path: str,
+    batch_size: int,
+    file_format: EmbeddingFileFormat | None = None,
+    dimensions: int | None = None,
+) -> Iterator[list[Embedding]]:
+    """Yield embeddings in batches of `batch_size`.
+
+    `Embedding.index` is the position in the file unless the file has its own index.
+    """
+    if batch_size <= 0:
+        msg = "`batch_size` must be positive"
+        raise ValueError(msg)
+    if file_format is None:
+        file_format = EmbeddingFileFormat.from_path(file_path)
+
+    if file_format in {EmbeddingFileFormat.NPY, EmbeddingFileFormat.F32}:
+        vectors = _open_memmap(file_path, file_format, dimensions)
+        for start in range(0, len(vectors), batch_size):
+            # only the current batch is paged in
+            batch = EmbeddingBatch(
+                vectors[start : start + batch_size], np.arange(start, min(start + batch_size, len(vectors)))
+            )
+            yield batch.to_embeddings()
+        return
+
+    batch_list: list[Embedding] = []
+    for embedding in _iter_text_embeddings(file_path, file_format):
+        batch_list.append(embedding)
+        if len(batch_list) == batch_size:
+            yield batch_list
+            batch_list = []
+    if batch_list:
+        yield batch_list
+
+
+def convert_embedding_file(
+    src_path: str,
+    dst_path: str,
+    file_format: EmbeddingFileFormat | None = None,
+    batch_size: int = 1000,
+) -> tuple[int, int]:
+    """Convert an embedding file into `.npy` (or raw float32 if `dst_path` ends with `.f32`/`.bin`).
+
+    Rows are written batch by batch. `.npy` needs the shape in the header, so the source is read twice.
+    Returns the shape `(rows, dimensions)`.
+    """
+    rows = 0
+    dimensions = 0
+    dst_format = EmbeddingFileFormat.from_path(dst_path)
+    if dst_format == EmbeddingFileFormat.F32:
+        with Path(dst_path).open("wb") as f:
+            for batch in iter_embedding_batches(src_path, batch_size, file_format):
+                vectors = EmbeddingBatch.from_embeddings(batch).vectors
+                dimensions = _check_dimensions(dimensions, vectors.shape[1])
+                f.write(vectors.astype("<f4", copy=False).tobytes())
+                rows += len(vectors)
+        return rows, dimensions
+    if dst_format != EmbeddingFileFormat.NPY:
+        msg = "`dst_path` must end with `.npy`, `.f32` or `.bin`"
+        raise ValueError(msg)
+
+    # 1st pass: shape
+    for batch in iter_embedding_batches(src_path, batch_size, file_format):
+        dimensions = _check_dimensions(dimensions, batch[0].dimensions)
+        rows += len(batch)
+    # 2nd pass: values
+    out = np.lib.format.open_memmap(dst_path, mode="w+", dtype=np.float32, shape=(rows, dimensions))
+    start = 0
+    for batch in iter_embedding_batches(src_path, batch_size, file_format):
+        out[start : start + len(batch)] = EmbeddingBatch.from_embeddings(batch).vectors
+        start += len(batch)
+    out.flush()
+    del out
+    return rows, dimensions
+
+
+# ------------------------------------------------------------------------------
+# Private functions
+# ------------------------------------------------------------------------------
+
+
+def _open_memmap(
+    file_path: str, file_format: EmbeddingFileFormat, dimensions: int | None
+) -> np.typing.NDArray[np.float32]:
+    """Open a binary file as a read-only 2-D array."""
+    if file_format == EmbeddingFileFormat.NPY:
+        vectors = np.load(file_path, mmap_mode="r")
+    else:
+        if not dimensions:
+            msg = "`dimensions` must be provided for raw float32 files"
+            raise ValueError(msg)
+        vectors = np.memmap(file_path, dtype="<f4", mode="r")
+        if vectors.shape[0] % dimensions != 0:
+            msg = f"file size isn't a multiple of {dimensions} float32 values"
+            raise ValueError(msg)
+        vectors = vectors.reshape(-1, dimensions)
+    if vectors.ndim == 1:
+        vectors = vectors.reshape(1, -1)
+    return vectors  # type: ignore[no-any-return]
+
+
+def _iter_text_embeddings(file_path: str, file_format: EmbeddingFileFormat) -> Iterator[Embedding]:
+    """Yield embeddings from a text file."""
+    if file_format == EmbeddingFileFormat.JSON:
+        # JSON can't be parsed incrementally without a streaming parser, use `jsonl` for large files
+        with Path(file_path).open("r") as f:
+            data = json.load(f)
+        items = [data] if data and isinstance(data[0], (int, float)) else data
+        for i, item in enumerate(items):
+            yield _from_json_item(item, i)
+    elif file_format == EmbeddingFileFormat.JSONL:
+        with Path(file_path).open("r") as f:
+            for i, line in enumerate(line for line in f if line.strip()):
+                yield _from_json_item(json.loads(line), i)
+    elif file_format == EmbeddingFileFormat.REPR:
+        yield from _iter_repr_embeddings(file_path)
+    else:
+        msg = f"{file_format.value} is not a text format"
+        raise ValueError(msg)
+
+
+def _from_json_item(item: list[float] | dict[str, object], position: int) -> Embedding:
+    """Create an Embedding from a JSON vector or object."""
+    if isinstance(item, dict):
+        return Embedding.from_dict({"index": position, **item})  # type: ignore[dict-item]
+    return Embedding(embedding=item, index=position, object_type="embedding")
+
+
+def _iter_repr_embeddings(file_path: str) -> Iterator[Embedding]:
+    """Yield embeddings from a `repr` dump, reading chunks so that only one vector is buffered at a time."""
+    buffer = ""
+    with Path(file_path).open("r") as f:
+        while chunk := f.read(CHUNK_SIZE):
+            buffer += chunk
+            end = 0
+            for match in REPR_PATTERN.finditer(buffer):
+                yield _from_repr_match(match)
+                end = match.end()
+            # drop separators and keep only the beginning of the next, incomplete embedding
+            buffer = buffer[end:]
+            start = buffer.find("Embedding(")
+            buffer = buffer[start:] if start >= 0 else buffer[-len("Embedding(") :]
+    if "Embedding(" in buffer:
+        msg = "truncated embedding at the end of the file"
+        raise ValueError(msg)
+
+
+def _from_repr_match(match: re.Match[str]) -> Embedding:
+    """Create an Embedding from a match of `REPR_PATTERN`."""
+    index = match.group("index1") or match.group("index2") or "0"
+    values = np.array(match.group("values").split(","), dtype=np.float32)
+    return Embedding(embedding=values, index=int(index), object_type=match.group("object"))
+
+
+def _check_dimensions(expected: int, actual: int) -> int:
+    """Check all vectors have the same dimensions."""
+    if expected and expected != actual:
+        msg = f"dimensions mismatch: {expected} != {actual}"
+        raise ValueError(msg)
+    return actual
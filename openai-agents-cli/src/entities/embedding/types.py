@@ -4,26 +4,50 @@ This type manipulates the `from openai.types.embedding import Embedding`.
 OpenAI's embedding models returns this type.
 """
 
+import base64
+from collections.abc import Iterator, Sequence
 from dataclasses import dataclass
 
 import numpy as np
 from openai.types.embedding import Embedding as OpenAIEmbedding
 
 EmbeddingType = list[float] | int | str
+VectorLike = Sequence[float] | np.typing.NDArray[np.floating]
+
+# number of leading values shown by `__repr__`
+REPR_HEAD = 3
+
+
+def decode_vector(embedding: list[float] | str) -> np.typing.NDArray[np.float32]:
+    """Decode a vector of OpenAI Embeddings API, which is a float list or a base64 string of little-endian float32."""
+    if isinstance(embedding, str):
+        return np.frombuffer(base64.b64decode(embedding), dtype="<f4").astype(np.float32, copy=False)
+    return np.asarray(embedding, dtype=np.float32)
 
 
 class Embedding:
-    """Embedding entity class."""
+    """Embedding entity class.
+
+    The vector is a contiguous float32 array, 4 bytes per value instead of a boxed float in a list.
+    It can be passed to pgvector parameters as is.
+    """
 
-    def __init__(self, embedding: list[float], index: int, object_type: str) -> None:
+    __slots__ = ("embedding", "index", "object")
+
+    def __init__(self, embedding: VectorLike, index: int, object_type: str) -> None:
         """Initialize the Embedding."""
-        self.embedding = embedding
+        self.embedding: np.typing.NDArray[np.float32] = np.ascontiguousarray(embedding, dtype=np.float32)
         self.index = index
         self.object = object_type
 
+    @property
+    def dimensions(self) -> int:
+        """Number of dimensions."""
+        return int(self.embedding.shape[0])
+
     def to_dict(self) -> dict[str, EmbeddingType]:
         """Convert to dictionary."""
-        return {"embedding": self.embedding, "index": self.index, "object": self.object}
+        return {"embedding": self.embedding.tolist(), "index": self.index, "object": self.object}
 
     @classmethod
     def from_dict(cls, dict_obj: dict[str, EmbeddingType]) -> "Embedding":
@@ -36,19 +60,102 @@ class Embedding:
 
     @classmethod
     def from_openai_embedding(cls, embeddings: list[OpenAIEmbedding]) -> list["Embedding"]:
-        """Convert OpenAI Embedding to custom Embedding."""
+        """Convert OpenAI Embedding to custom Embedding.
+
+        Both `encoding_format="float"` and `encoding_format="base64"` responses are accepted.
+        """
+        return EmbeddingBatch.from_openai_embedding(embeddings).to_embeddings()
+
+    def __repr__(self) -> str:
+        """Representation of the Embedding object without the whole vector."""
+        head = ", ".join(f"{value:.6f}" for value in self.embedding[:REPR_HEAD])
+        return (
+            f"Embedding(index={self.index}, dimensions={self.dimensions}, embedding=[{head}, ...], "
+            f"object='{self.object}')"
+        )
+
+
+class EmbeddingBatch:
+    """Batch of embeddings as a 2-D C-contiguous float32 array with an index column.
+
+    `to_embeddings()` returns row views sharing the same buffer, so no vector is copied.
+    """
+
+    __slots__ = ("indices", "object", "vectors")
+
+    def __init__(
+        self,
+        vectors: np.typing.NDArray[np.floating],
+        indices: Sequence[int] | np.typing.NDArray[np.integer] | None = None,
+    ) -> None:
+        """Initialize the EmbeddingBatch."""
+        self.vectors: np.typing.NDArray[np.float32] = np.ascontiguousarray(vectors, dtype=np.float32)
+        if self.vectors.ndim != 2:  # noqa: PLR2004
+            msg = f"`vectors` must be 2-D, got {self.vectors.ndim}-D"
+            raise ValueError(msg)
+        if indices is None:
+            self.indices: np.typing.NDArray[np.int64] = np.arange(len(self.vectors), dtype=np.int64)
+        else:
+            self.indices = np.asarray(indices, dtype=np.int64)
+        if self.indices.shape != (len(self.vectors),):
+            msg = "`indices` must have one value per vector"
+            raise ValueError(msg)
+        self.object = "embedding"
+
+    @property
+    def dimensions(self) -> int:
+        """Number of dimensions."""
+        return int(self.vectors.shape[1])
+
+    @classmethod
+    def from_embeddings(cls, embeddings: list[Embedding]) -> "EmbeddingBatch":
+        """Stack embeddings into a batch."""
+        if not embeddings:
+            return cls(np.empty((0, 0), dtype=np.float32))
+        return cls(np.stack([embedding.embedding for embedding in embeddings]), [e.index for e in embeddings])
+
+    @classmethod
+    def from_openai_embedding(cls, embeddings: list[OpenAIEmbedding]) -> "EmbeddingBatch":
+        """Convert OpenAI Embeddings into a batch ordered by index, decoding each vector into its row."""
+        ordered = sorted(embeddings, key=lambda embedding: embedding.index)
+        if not ordered:
+            return cls(np.empty((0, 0), dtype=np.float32))
+        first = decode_vector(ordered[0].embedding)
+        vectors = np.empty((len(ordered), first.shape[0]), dtype=np.float32)
+        vectors[0] = first
+        for row, embedding in enumerate(ordered[1:], start=1):
+            vectors[row] = decode_vector(embedding.embedding)
+        return cls(vectors, [embedding.index for embedding in ordered])
+
+    def to_embeddings(self) -> list[Embedding]:
+        """Split into Embeddings whose vectors are views of this batch."""
         return [
-            cls(
-                embedding=embedding.embedding,
-                index=embedding.index,
-                object_type=embedding.object,
-            )
-            for embedding in embeddings
+            Embedding(embedding=vector, index=int(index), object_type=self.object)
+            for vector, index in zip(self.vectors, self.indices, strict=True)
         ]
 
+    def normalized(self) -> "EmbeddingBatch":
+        """Get a batch of L2 normalized vectors."""
+        norms = np.linalg.norm(self.vectors, axis=1, keepdims=True)
+        return EmbeddingBatch(self.vectors / np.maximum(norms, np.finfo(np.float32).tiny), self.indices)
+
+    def cosine_similarity(self, query: VectorLike) -> np.typing.NDArray[np.float32]:
+        """Cosine similarity between every vector and the query."""
+        query_vector = np.asarray(query, dtype=np.float32)
+        query_vector = query_vector / max(float(np.linalg.norm(query_vector)), float(np.finfo(np.float32).tiny))
+        return self.normalized().vectors @ query_vector
+
+    def __len__(self) -> int:
+        """Number of embeddings."""
+        return len(self.vectors)
+
+    def __iter__(self) -> Iterator[Embedding]:
+        """Iterate Embeddings whose vectors are views of this batch."""
+        return iter(self.to_embeddings())
+
     def __repr__(self) -> str:
-        """Representation of the Embedding object."""
-        return f"Embedding(index={self.index}, embedding={self.embedding}, object='{self.object}')"
+        """Representation of the EmbeddingBatch object without vectors."""
+        return f"EmbeddingBatch(size={len(self)}, dimensions={self.dimensions}, object='{self.object}')"
 
 
 @dataclass
@@ -56,4 +163,4 @@ class EmbeddingItem:
     """Embedding item class for response of VectorDB `pgvector`."""
 
     question: str
-    embedding: np.typing.NDArray[np.float64]
+    embedding: np.typing.NDArray[np.float32]
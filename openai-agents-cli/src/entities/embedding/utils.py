@@ -1,19 +1,14 @@
 """Embedding for debug Use Case."""
 
-import json
-from pathlib import Path
-
+from entities.embedding.loader import iter_embedding_batches
 from entities.embedding.types import Embedding
 
 
 def load_embedding(file_name: str) -> list[Embedding]:
-    """Loading embedding JSON file."""
+    """Loading embedding file into memory. Use `iter_embedding_batches()` for large files."""
     # load JSON file
     # with open("storage/embedding01.json") as f:
-    with Path(file_name).open("r") as f:
-        embeddings_data = json.load(f)
-
-    return [Embedding(embedding=embeddings_data, index=0, object_type="embedding")]
+    return [embedding for batch in iter_embedding_batches(file_name, 1000) for embedding in batch]
     # debug
     # for embedding in embeddings_list:
     #     print(
@@ -0,0 +1,163 @@
+"""Vector index entity classes for pgvector ANN indexes.
+
+Refer to: https://github.com/pgvector/pgvector#indexing
+"""
+
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any
+
+
+class IndexMethod(Enum):
+    """ANN index method."""
+
+    HNSW = "hnsw"
+    IVFFLAT = "ivfflat"
+
+    @classmethod
+    def from_str(cls, method_str: str) -> "IndexMethod":
+        """Change string to IndexMethod."""
+        for method in cls:
+            if method.value == method_str:
+                return method
+        msg = f"'{method_str}' is not a valid IndexMethod"
+        raise ValueError(msg)
+
+
+class IndexTarget(Enum):
+    """Target table of ANN index."""
+
+    EMBEDDINGS = "embeddings"
+    ITEM_CONTENTS = "item_contents"
+
+    @classmethod
+    def from_str(cls, target_str: str) -> "IndexTarget":
+        """Change string to IndexTarget."""
+        for target in cls:
+            if target.value == target_str:
+                return target
+        msg = f"'{target_str}' is not a valid IndexTarget"
+        raise ValueError(msg)
+
+
+class Quantization(Enum):
+    """Quantized representation indexed instead of the full precision `vector`.
+
+    - `halfvec`: half precision floats, half the index size. Requires pgvector 0.7+.
+    - `bit`: binary quantization by `binary_quantize()`, 1/32 of the index size. Requires pgvector 0.7+.
+
+    The quantized index is an expression index over the `vector` column, which is kept for re-ranking.
+    """
+
+    NONE = "none"
+    HALFVEC = "halfvec"
+    BIT = "bit"
+
+    @classmethod
+    def from_str(cls, quantization_str: str) -> "Quantization":
+        """Change string to Quantization."""
+        for quantization in cls:
+            if quantization.value == quantization_str:
+                return quantization
+        msg = f"'{quantization_str}' is not a valid Quantization"
+        raise ValueError(msg)
+
+
+class IterativeScan(Enum):
+    """Iterative index scan mode of pgvector 0.8+.
+
+    When rows are filtered after the index scan, the scan continues until enough rows are found.
+    `strict_order` is HNSW only, IVFFlat uses `relaxed_order` instead.
+    """
+
+    OFF = "off"
+    STRICT_ORDER = "strict_order"
+    RELAXED_ORDER = "relaxed_order"
+
+    @classmethod
+    def from_str(cls, scan_str: str) -> "IterativeScan":
+        """Change string to IterativeScan."""
+        for scan in cls:
+            if scan.value == scan_str:
+                return scan
+        msg = f"'{scan_str}' is not a valid IterativeScan"
+        raise ValueError(msg)
+
+
+@dataclass
+class IndexParams:
+    """Build parameters of ANN index.
+
+    - `m`, `ef_construction` are used by HNSW.
+    - `lists` is used by IVFFlat. `rows / 1000` is a good starting point up to 1M rows.
+    - `quantization` indexes `halfvec` or `bit` representation instead of `vector`.
+    """
+
+    method: IndexMethod = IndexMethod.HNSW
+    m: int = 16
+    ef_construction: int = 64
+    lists: int = 100
+    quantization: Quantization = Quantization.NONE
+
+
+@dataclass
+class SearchParams:
+    """Query time parameters of ANN index.
+
+    - `ef_search` sets `hnsw.ef_search` (default 40).
+    - `probes` sets `ivfflat.probes` (default 1).
+    - `exact` disables index scan to get the exact nearest neighbors.
+    - `iterative_scan` sets `hnsw.iterative_scan` / `ivfflat.iterative_scan`.
+      `None` means `relaxed_order` for filtered search and server default otherwise.
+    - `quantization` must match the index. Candidates are searched by the quantized index,
+      then `rerank_candidates` of them (default `top_k * 4`) are re-ranked by full precision distance.
+    """
+
+    ef_search: int | None = None
+    probes: int | None = None
+    exact: bool = False
+    iterative_scan: IterativeScan | None = None
+    quantization: Quantization = Quantization.NONE
+    rerank_candidates: int | None = None
+
+
+@dataclass
+class SearchFilter:
+    """Filters of similarity search applied in SQL.
+
+    - `metadata` matches rows whose `metadata` contains it, i.e. JSONB `@>`.
+    - `exclude_ids` excludes rows such as the query item itself.
+    - `max_distance` drops rows whose cosine distance is larger than it.
+    """
+
+    metadata: dict[str, Any] | None = None
+    exclude_ids: list[int] = field(default_factory=list)
+    max_distance: float | None = None
+
+    @property
+    def is_empty(self) -> bool:
+        """Whether no filter is set."""
+        return not self.metadata and not self.exclude_ids and self.max_distance is None
+
+
+@dataclass(frozen=True)
+class SimilarityResult:
+    """A row of similarity search.
+
+    `distance` is cosine distance `<=>`, so smaller is more similar.
+    """
+
+    id: int
+    content: str
+    distance: float
+
+
+@dataclass(frozen=True)
+class CachedAnswer:
+    """An answer cached with its question in `item_contents`, found by similarity of the question."""
+
+    id: int
+    content: str
+    answer: str
+    distance: float
+    metadata: dict[str, Any] = field(default_factory=dict)
@@ -0,0 +1,193 @@
+"""Embedding cache module class."""
+
+import hashlib
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections.abc import Sequence
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+from loguru import logger
+
+from entities.embedding.types import VectorLike
+
+# keys per `IN (...)` query, to stay under SQLite's limit of host parameters
+KEY_CHUNK_SIZE = 500
+
+
+def normalize_text(text: str) -> str:
+    """Normalize text so that trivially different inputs share a cache entry."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def cache_key(model: str, text: str) -> str:
+    """Content-addressed key of (model name, normalized text)."""
+    return hashlib.sha256(f"{model}\0{normalize_text(text)}".encode()).hexdigest()
+
+
+@dataclass
+class EmbeddingCacheStats:
+    """Statistics of EmbeddingCache."""
+
+    hits: int
+    misses: int
+    entries: int
+    size_bytes: int
+
+    @property
+    def hit_rate(self) -> float:
+        """Ratio of hits in lookups."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups > 0 else 0.0
+
+
+class EmbeddingCache:
+    """Persistent embedding cache on SQLite with LRU eviction.
+
+    Vectors are stored as float32 blobs. When `max_entries` or `max_bytes` is exceeded,
+    the least recently used entries are evicted.
+    The number of entries and their total size are counted once on open, and kept up to date on writes.
+    """
+
+    def __init__(self, path: str, *, max_entries: int = 100_000, max_bytes: int = 1 << 30) -> None:
+        """Initialize EmbeddingCache."""
+        if max_entries <= 0 or max_bytes <= 0:
+            msg = "`max_entries` and `max_bytes` must be positive"
+            raise ValueError(msg)
+
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        # shared by threads of EmbeddingPipeline, access is serialized by `_lock`
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, model TEXT NOT NULL, dim INTEGER NOT NULL, vector BLOB NOT NULL, "
+            "last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_access_idx ON embeddings (last_access)")
+        self._conn.commit()
+        self._entries, self._size_bytes = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings"
+        ).fetchone()
+
+    @property
+    def hits(self) -> int:
+        """Number of cache hits."""
+        return self._hits
+
+    @property
+    def misses(self) -> int:
+        """Number of cache misses."""
+        return self._misses
+
+    def get_many(self, model: str, texts: list[str]) -> list[np.typing.NDArray[np.float32] | None]:
+        """Look up embeddings of texts. Missing entries are None.
+
+        Returned arrays are read-only views of the stored blobs.
+        """
+        keys = [cache_key(model, text) for text in texts]
+        with self._lock:
+            found: dict[str, bytes] = {}
+            for start in range(0, len(keys), KEY_CHUNK_SIZE):
+                chunk = keys[start : start + KEY_CHUNK_SIZE]
+                placeholders = ", ".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",  # noqa: S608
+                    chunk,
+                ).fetchall()
+                found.update(rows)
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_access = ? WHERE key = ?", [(now, key) for key in found]
+                )
+                self._conn.commit()
+            hits = sum(1 for key in keys if key in found)
+            self._hits += hits
+            self._misses += len(keys) - hits
+
+        return [np.frombuffer(found[key], dtype=np.float32) if key in found else None for key in keys]
+
+    def put_many(self, model: str, texts: list[str], embeddings: Sequence[VectorLike]) -> None:
+        """Store embeddings of texts, and evict least recently used entries over the limits."""
+        if len(texts) != len(embeddings):
+            msg = "`texts` and `embeddings` must have the same length"
+            raise ValueError(msg)
+
+        now = time.time()
+        # the last one of duplicated texts is stored, as by `INSERT OR REPLACE`
+        rows = {
+            cache_key(model, text): (model, len(embedding), np.asarray(embedding, dtype=np.float32).tobytes(), now)
+            for text, embedding in zip(texts, embeddings, strict=True)
+        }
+        with self._lock:
+            replaced = self._stored_sizes(list(rows))
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?, ?)", [(key, *row) for key, row in rows.items()]
+            )
+            self._entries += len(rows) - len(replaced)
+            self._size_bytes += sum(len(row[2]) for row in rows.values()) - sum(replaced.values())
+            self._evict()
+            self._conn.commit()
+
+    def stats(self) -> EmbeddingCacheStats:
+        """Get hit/miss counters and size of the cache."""
+        with self._lock:
+            return EmbeddingCacheStats(self._hits, self._misses, self._entries, self._size_bytes)
+
+    def clear(self) -> None:
+        """Remove all entries and reset counters."""
+        with self._lock:
+            self._conn.execute("DELETE FROM embeddings")
+            self._conn.commit()
+            self._hits = 0
+            self._misses = 0
+            self._entries = 0
+            self._size_bytes = 0
+
+    def close(self) -> None:
+        """Close the database."""
+        with self._lock:
+            self._conn.close()
+
+    # --------------------------------------------------------------------------
+    # Private methods
+    # --------------------------------------------------------------------------
+
+    def _stored_sizes(self, keys: list[str]) -> dict[str, int]:
+        """Get sizes of the stored vectors of the keys. Missing keys are omitted."""
+        sizes: dict[str, int] = {}
+        for start in range(0, len(keys), KEY_CHUNK_SIZE):
+            chunk = keys[start : start + KEY_CHUNK_SIZE]
+            placeholders = ", ".join("?" * len(chunk))
+            rows = self._conn.execute(
+                f"SELECT key, LENGTH(vector) FROM embeddings WHERE key IN ({placeholders})",  # noqa: S608
+                chunk,
+            ).fetchall()
+            sizes.update(rows)
+        return sizes
+
+    def _evict(self) -> None:
+        """Evict least recently used entries until both limits are satisfied."""
+        if self._entries <= self._max_entries and self._size_bytes <= self._max_bytes:
+            return
+
+        # entries have a similar size per model, so estimate the number of rows to evict from the average
+        avg_bytes = self._size_bytes / self._entries
+        excess = max(self._entries - self._max_entries, int((self._size_bytes - self._max_bytes) / avg_bytes) + 1)
+        evicted = self._conn.execute(
+            "SELECT key, LENGTH(vector) FROM embeddings ORDER BY last_access LIMIT ?", (excess,)
+        ).fetchall()
+        self._conn.executemany("DELETE FROM embeddings WHERE key = ?", [(key,) for key, _ in evicted])
+        self._entries -= len(evicted)
+        self._size_bytes -= sum(size for _, size in evicted)
+        logger.debug(f"evicted embedding cache entries: {len(evicted)}")
@@ -0,0 +1,206 @@
+"""LLM response cache module classes."""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from enum import Enum
+from pathlib import Path
+
+from loguru import logger
+
+
+class ResponseCacheBackend(Enum):
+    """Backend of response cache."""
+
+    DISK = "disk"
+    MEMORY = "memory"
+
+    @classmethod
+    def from_str(cls, value: str) -> "ResponseCacheBackend":
+        """Convert string to ResponseCacheBackend."""
+        try:
+            return cls(value)
+        except ValueError:
+            msg = f"Unknown response cache backend: {value}"
+            raise ValueError(msg) from None
+
+
+def response_cache_key(  # noqa: PLR0913, PLR0917
+    api: str,
+    model: str,
+    instructions: str,
+    prompt: str,
+    history_hash: str,
+    temperature: float | None,
+    sample: int = 0,
+) -> str:
+    """Deterministic key of (api, model, instructions, prompt, history hash, temperature, sample).
+
+    `sample` tells apart repeated samples of the same request.
+    """
+    payload = json.dumps([api, model, instructions, prompt, history_hash, temperature, sample], ensure_ascii=False)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    """Cached output text. `response_id` of Response API continues the conversation on the server."""
+
+    text: str
+    response_id: str | None = None
+
+
+@dataclass
+class ResponseCacheStats:
+    """Statistics of response cache."""
+
+    hits: int
+    misses: int
+    entries: int
+
+    @property
+    def hit_rate(self) -> float:
+        """Ratio of hits in lookups."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups > 0 else 0.0
+
+
+class ResponseCacheInterface(ABC):
+    """Interface for exact-match LLM response cache."""
+
+    @abstractmethod
+    def get(self, key: str) -> CachedResponse | None:
+        """Look up the response of the key."""
+
+    @abstractmethod
+    def put(self, key: str, response: CachedResponse) -> None:
+        """Store the response of the key."""
+
+    @abstractmethod
+    def stats(self) -> ResponseCacheStats:
+        """Get hit/miss counters and entries of the cache."""
+
+    @abstractmethod
+    def close(self) -> None:
+        """Close the cache."""
+
+
+class MemoryResponseCache(ResponseCacheInterface):
+    """In-memory response cache with LRU eviction. It lives only in the process."""
+
+    def __init__(self, max_entries: int = 1000) -> None:
+        """Initialize MemoryResponseCache."""
+        if max_entries <= 0:
+            msg = "`max_entries` must be positive"
+            raise ValueError(msg)
+
+        self._max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, CachedResponse] = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, key: str) -> CachedResponse | None:
+        """Look up the response of the key."""
+        with self._lock:
+            response = self._entries.get(key)
+            if response is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return response
+
+    def put(self, key: str, response: CachedResponse) -> None:
+        """Store the response of the key, and evict the least recently used entries over the limit."""
+        with self._lock:
+            self._entries[key] = response
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> ResponseCacheStats:
+        """Get hit/miss counters and entries of the cache."""
+        with self._lock:
+            return ResponseCacheStats(self._hits, self._misses, len(self._entries))
+
+    def close(self) -> None:
+        """Nothing to close."""
+
+
+class SQLiteResponseCache(ResponseCacheInterface):
+    """Persistent response cache on SQLite with LRU eviction. It's shared by CLI invocations."""
+
+    def __init__(self, path: str, *, max_entries: int = 10_000) -> None:
+        """Initialize SQLiteResponseCache."""
+        if max_entries <= 0:
+            msg = "`max_entries` must be positive"
+            raise ValueError(msg)
+
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._max_entries = max_entries
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, text TEXT NOT NULL, response_id TEXT, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_access_idx ON responses (last_access)")
+        self._conn.commit()
+
+    def get(self, key: str) -> CachedResponse | None:
+        """Look up the response of the key."""
+        with self._lock:
+            row = self._conn.execute("SELECT text, response_id FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self._misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            self._hits += 1
+        return CachedResponse(text=row[0], response_id=row[1])
+
+    def put(self, key: str, response: CachedResponse) -> None:
+        """Store the response of the key, and evict the least recently used entries over the limit."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+                (key, response.text, response.response_id, time.time()),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def stats(self) -> ResponseCacheStats:
+        """Get hit/miss counters and entries of the cache."""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        return ResponseCacheStats(self._hits, self._misses, entries)
+
+    def close(self) -> None:
+        """Close the database."""
+        with self._lock:
+            self._conn.close()
+
+    # --------------------------------------------------------------------------
+    # Private methods
+    # --------------------------------------------------------------------------
+
+    def _evict(self) -> None:
+        """Evict least recently used entries over `max_entries`."""
+        entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        if entries <= self._max_entries:
+            return
+        excess = entries - self._max_entries
+        self._conn.execute(
+            "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY last_access LIMIT ?)", (excess,)
+        )
+        logger.debug(f"evicted response cache entries: {excess}")
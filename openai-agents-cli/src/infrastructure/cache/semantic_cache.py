@@ -0,0 +1,105 @@
+"""Semantic response cache module class."""
+
+import time
+from dataclasses import dataclass
+
+import numpy as np
+from loguru import logger
+
+from entities.embedding.types import Embedding
+from entities.vector_index.types import CachedAnswer
+from infrastructure.repository.interface import EmbeddingRepositoryInterface
+
+# metadata key of the seconds taken to generate the cached answer
+ANSWER_SECONDS_KEY = "answer_seconds"
+
+
+@dataclass
+class SemanticCacheStats:
+    """Statistics of SemanticCache."""
+
+    hits: int = 0
+    misses: int = 0
+    saved_seconds: float = 0.0
+
+    @property
+    def hit_rate(self) -> float:
+        """Ratio of hits in lookups."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups > 0 else 0.0
+
+
+class SemanticCache:
+    """Semantic response cache on `item_contents` table.
+
+    Answers are cached with their questions and embeddings, and returned for a new question
+    when a cached question is within `max_distance` of cosine distance.
+    Answers older than `ttl_seconds` are expired (0 means never), while questions are kept as contents.
+    """
+
+    def __init__(
+        self, embedding_repo: EmbeddingRepositoryInterface, *, max_distance: float = 0.05, ttl_seconds: int = 86400
+    ) -> None:
+        """Initialize SemanticCache."""
+        if not 0 < max_distance < 2:  # noqa: PLR2004
+            msg = "`max_distance` must be in (0, 2)"
+            raise ValueError(msg)
+        if ttl_seconds < 0:
+            msg = "`ttl_seconds` must not be negative"
+            raise ValueError(msg)
+
+        self._embedding_repo = embedding_repo
+        self._max_distance = max_distance
+        self._ttl_seconds = ttl_seconds
+        self._expired = False
+        self._stats = SemanticCacheStats()
+
+    @property
+    def stats(self) -> SemanticCacheStats:
+        """Statistics of lookups."""
+        return self._stats
+
+    def lookup(self, embedding: np.typing.NDArray[np.floating], embedding_seconds: float = 0.0) -> CachedAnswer | None:
+        """Find the cached answer of a similar question.
+
+        `embedding_seconds` is the time to embed the question, which is counted as the cost of the lookup
+        when the latency saved by a hit is calculated.
+        """
+        self._expire_once()
+
+        start = time.perf_counter()
+        cached = self._embedding_repo.find_answer(embedding, self._max_distance, self._ttl_seconds)
+        lookup_seconds = embedding_seconds + time.perf_counter() - start
+        if cached is None:
+            self._stats.misses += 1
+            logger.info(f"semantic cache: miss, lookup: {lookup_seconds:.3f}s, hit rate: {self._stats.hit_rate:.0%}")
+            return None
+
+        self._stats.hits += 1
+        saved_seconds = float(cached.metadata.get(ANSWER_SECONDS_KEY, 0.0)) - lookup_seconds
+        self._stats.saved_seconds += saved_seconds
+        logger.info(
+            f"semantic cache: hit: id: {cached.id}, distance: {cached.distance:.4f}, lookup: {lookup_seconds:.3f}s, "
+            f"saved: {saved_seconds:.3f}s, hit rate: {self._stats.hit_rate:.0%}"
+        )
+        return cached
+
+    def store(self, question: str, embedding: Embedding, answer: str, answer_seconds: float) -> int:
+        """Insert the question with its embedding, and cache the answer. The id of the question is returned."""
+        ids = self._embedding_repo.insert_item_contents(
+            [question], [embedding], [{"source": "semantic_cache", ANSWER_SECONDS_KEY: round(answer_seconds, 3)}]
+        )
+        self._embedding_repo.save_answer(ids[0], answer)
+        return ids[0]
+
+    # --------------------------------------------------------------------------
+    # Private methods
+    # --------------------------------------------------------------------------
+
+    def _expire_once(self) -> None:
+        """Remove expired answers at the first lookup."""
+        if self._expired or self._ttl_seconds == 0:
+            return
+        expired = self._embedding_repo.expire_answers(self._ttl_seconds)
+        logger.debug(f"semantic cache: expired {expired} answers")
+        self._expired = True
@@ -1,15 +1,33 @@
 """OpenAI API module class."""
 
+import copy
+import time
+from collections.abc import Iterator
+from dataclasses import replace
 from enum import Enum
+from typing import TYPE_CHECKING, Any, Literal
 
+from loguru import logger
 from openai import OpenAI
 
+if TYPE_CHECKING:
+    from openai.types import CompletionUsage
+    from openai.types.responses import Response, ResponseUsage
+
 from entities.embedding.types import Embedding
+from infrastructure.cache.embedding_cache import EmbeddingCache
+from infrastructure.cache.response_cache import CachedResponse, ResponseCacheInterface, response_cache_key
 
 # from openai.types.embedding import Embedding as OpenAIEmbedding
 from infrastructure.web_browser.interface import WebClientInterface
 
-from .interface import OpenAIClientInterface
+from .history import ConversationHistory, HistoryStrategy, Message, SummarizeStrategy, TruncateStrategy
+from .interface import CallUsage, OpenAIClientInterface, StreamMetrics
+
+SUMMARIZE_INSTRUCTIONS = (
+    "Summarize the conversation concisely for yourself to continue it. "
+    "Keep facts, decisions, numbers and open questions. Write in the language of the conversation."
+)
 
 
 class APIMode(Enum):
@@ -22,15 +40,27 @@ class APIMode(Enum):
 class OpenAIClient(OpenAIClientInterface, WebClientInterface):
     """OpenAI API Client class."""
 
-    def __init__(
+    def __init__(  # noqa: PLR0913
         self,
         model: str,
         api_key: str,
         embedding_model: str = "text-embedding-ada-002",
         base_url: str | None = None,
         is_local_llm: bool = False,
+        embedding_cache: EmbeddingCache | None = None,
+        *,
+        history_max_tokens: int = 0,
+        history_strategy: HistoryStrategy = HistoryStrategy.TRUNCATE,
+        response_cache: ResponseCacheInterface | None = None,
+        temperature: float | None = None,
     ) -> None:
-        """Initialize OpenAI client."""
+        """Initialize OpenAI client.
+
+        `history_max_tokens` bounds prompt tokens of the conversation history by `history_strategy`.
+        0 means unlimited, and Response API keeps the history on the server by `previous_response_id`.
+        When `response_cache` is set, responses of identical requests in the same conversation state are reused.
+        `temperature` is the server default if None.
+        """
         if not model:
             msg = "Model must be provided"
             raise ValueError(msg)
@@ -42,55 +72,181 @@ class OpenAIClient(OpenAIClientInterface, WebClientInterface):
         self._model = model
         self._embedding_model = embedding_model
         self._is_local_llm = is_local_llm
+        self._embedding_cache = embedding_cache
+        self._response_cache = response_cache
+        self._temperature = temperature
         if not base_url:
             self._client = OpenAI(api_key=api_key)
         else:
             self._client = OpenAI(api_key=api_key, base_url=base_url)
-        self._message_histories: list[dict[str, str]] = []  # message history
+        strategy = (
+            SummarizeStrategy(self._summarize) if history_strategy == HistoryStrategy.SUMMARIZE else TruncateStrategy()
+        )
+        self._history = ConversationHistory(history_max_tokens, strategy)  # message history
         self._previous_response_id: str | None = None  # message history
+        self._usages: list[CallUsage] = []
+        self._sample = 0
 
     def clear(self) -> None:
         """Clear message history."""
-        self._message_histories = []
+        self._history.clear()
         self._previous_response_id = None
 
+    def fork(self, sample: int = 0) -> "OpenAIClient":
+        """Fork a client with an empty conversation.
+
+        The connection, caches and usages are shared, so forks can call the API concurrently.
+        `sample` tells apart response cache entries of repeated samples of the same request.
+        """
+        client = copy.copy(self)
+        client._history = self._history.new_conversation()  # noqa: SLF001
+        client._previous_response_id = None  # noqa: SLF001
+        client._sample = sample  # noqa: SLF001
+        return client
+
     def call_response(self, instructions: str, prompt: str) -> str:
         """Call Response API."""
-        response = self._client.responses.create(
-            model=self._model,
-            instructions=instructions,
-            input=prompt,
-            previous_response_id=self._previous_response_id,
+        key, cached = self._lookup_response(APIMode.RESPONSE_API, instructions, prompt)
+        if cached is not None:
+            return cached.text
+
+        start = time.perf_counter()
+        response: Response = self._client.responses.create(
+            model=self._model, **self._response_params(instructions, prompt), **self._sampling_params()
         )
         # save response id
         self._previous_response_id = response.id
+        self._history.add_assistant_message(response.output_text)
+        self._record_usage(self._response_usage(response.usage), start=start)
+        self._store_response(key, response.output_text, response.id)
         return response.output_text
 
     def call_chat_completion(self, instructions: str, prompt: str) -> str:
         """Call Chat Completion API."""
-        if len(self._message_histories) > 0:
-            # add message history to the prompt
-            self._message_histories.append({"role": "user", "content": prompt})
-        else:
-            # create new message
-            system_role = "system" if self._is_local_llm else "developer"
-            self._message_histories.append({"role": system_role, "content": instructions})
-            self._message_histories.append({"role": "user", "content": prompt})
+        key, cached = self._lookup_response(APIMode.CHAT_COMPLETION_API, instructions, prompt)
+        if cached is not None:
+            return cached.text
+
+        self._history.add_user_message(instructions, prompt)
 
+        start = time.perf_counter()
         completion = self._client.chat.completions.create(
             model=self._model,
-            messages=self._message_histories,  # type: ignore[arg-type]
+            messages=self._history.messages(self._system_role),  # type: ignore[arg-type]
+            **self._sampling_params(),
         )
         # save message history
-        self._message_histories.append({"role": "assistant", "content": completion.choices[0].message.content or ""})
+        self._history.add_assistant_message(completion.choices[0].message.content or "")
+        self._record_usage(self._chat_usage(completion.usage), start=start)
+        self._store_response(key, completion.choices[0].message.content or "")
         # return completion.choices[0].message.content
         return completion.choices[0].message.content if completion.choices[0].message.content else ""
 
+    def stream_response(self, instructions: str, prompt: str, metrics: StreamMetrics | None = None) -> Iterator[str]:
+        """Stream text deltas of Response API. A cached response is yielded at once."""
+        start = time.perf_counter()
+        key, cached = self._lookup_response(APIMode.RESPONSE_API, instructions, prompt)
+        if cached is not None:
+            yield cached.text
+            self._fill_stream_metrics(metrics, start, time.perf_counter(), 0)
+            return
+
+        stream = self._client.responses.create(
+            model=self._model, stream=True, **self._response_params(instructions, prompt), **self._sampling_params()
+        )
+        first_token_at: float | None = None
+        texts: list[str] = []
+        usage: CallUsage | None = None
+        for event in stream:
+            if event.type == "response.output_text.delta":
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                texts.append(event.delta)
+                yield event.delta
+            elif event.type == "response.completed":
+                # save response id
+                self._previous_response_id = event.response.id
+                usage = self._response_usage(event.response.usage)
+        self._history.add_assistant_message("".join(texts))
+        self._record_usage(usage, start=start, first_token_at=first_token_at)
+        self._store_response(key, "".join(texts), self._previous_response_id)
+        self._fill_stream_metrics(
+            metrics, start, first_token_at, usage.output_tokens if usage is not None else len(texts)
+        )
+
+    def stream_chat_completion(
+        self, instructions: str, prompt: str, metrics: StreamMetrics | None = None
+    ) -> Iterator[str]:
+        """Stream text deltas of Chat Completion API.
+
+        Usage is requested by `stream_options`, and it comes in the last chunk without choices.
+        A cached response is yielded at once.
+        """
+        start = time.perf_counter()
+        key, cached = self._lookup_response(APIMode.CHAT_COMPLETION_API, instructions, prompt)
+        if cached is not None:
+            yield cached.text
+            self._fill_stream_metrics(metrics, start, time.perf_counter(), 0)
+            return
+
+        self._history.add_user_message(instructions, prompt)
+
+        stream = self._client.chat.completions.create(  # type: ignore[call-overload]
+            model=self._model,
+            messages=self._history.messages(self._system_role),
+            stream=True,
+            stream_options={"include_usage": True},
+            **self._sampling_params(),
+        )
+        first_token_at: float | None = None
+        texts: list[str] = []
+        usage: CallUsage | None = None
+        for chunk in stream:
+            if chunk.usage is not None:
+                usage = self._chat_usage(chunk.usage)
+            if not chunk.choices or not chunk.choices[0].delta.content:
+                continue
+            if first_token_at is None:
+                first_token_at = time.perf_counter()
+            texts.append(chunk.choices[0].delta.content)
+            yield chunk.choices[0].delta.content
+        # save message history
+        self._history.add_assistant_message("".join(texts))
+        self._record_usage(usage, start=start, first_token_at=first_token_at)
+        self._store_response(key, "".join(texts))
+        self._fill_stream_metrics(
+            metrics, start, first_token_at, usage.output_tokens if usage is not None else len(texts)
+        )
+
+    def get_usages(self) -> list[CallUsage]:
+        """Get token usage of the calls of Response API and Chat Completion API in order."""
+        return list(self._usages)
+
     def call_embeddings(self, prompt: str | list[str]) -> list[Embedding]:
-        """Call Embeddings API."""
-        response = self._client.embeddings.create(model=self._embedding_model, input=prompt, encoding_format="float")
-        # convert OnenAI Embedding to inner Embedding
-        return Embedding.from_openai_embedding(response.data)
+        """Call Embeddings API.
+
+        When the embedding cache is set, only texts missing in the cache are requested.
+        """
+        if self._embedding_cache is None:
+            return self._create_embeddings(prompt)
+
+        texts = [prompt] if isinstance(prompt, str) else prompt
+        vectors = self._embedding_cache.get_many(self._embedding_model, texts)
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        logger.debug(f"embedding cache: hits: {len(texts) - len(missing)}, misses: {len(missing)}")
+        if missing:
+            missing_texts = [texts[i] for i in missing]
+            embeddings = self._create_embeddings(missing_texts)
+            for embedding in embeddings:
+                vectors[missing[embedding.index]] = embedding.embedding
+            self._embedding_cache.put_many(
+                self._embedding_model, missing_texts, [embedding.embedding for embedding in embeddings]
+            )
+        return [
+            Embedding(embedding=vector, index=i, object_type="embedding")
+            for i, vector in enumerate(vectors)
+            if vector is not None
+        ]
 
     def call_web_search(self, prompt: str) -> str:
         """Call Web Search API."""
@@ -119,3 +275,155 @@ class OpenAIClient(OpenAIClientInterface, WebClientInterface):
         # return cast("str", completion.choices[0].message.content)
         response = self._client.responses.create(model="gpt-4.1", tools=[{"type": "web_search_preview"}], input=prompt)
         return response.output_text
+
+    # --------------------------------------------------------------------------
+    # Private methods
+    # --------------------------------------------------------------------------
+
+    @property
+    def _system_role(self) -> str:
+        """Role of instructions. Local LLM servers may not support `developer`."""
+        return "system" if self._is_local_llm else "developer"
+
+    def _sampling_params(self) -> dict[str, Any]:
+        """Build sampling parameters. Unset ones are omitted to use server defaults."""
+        return {"temperature": self._temperature} if self._temperature is not None else {}
+
+    def _lookup_response(
+        self, api_mode: APIMode, instructions: str, prompt: str
+    ) -> tuple[str | None, CachedResponse | None]:
+        """Look up the response cache, and return the key and the cached response.
+
+        The key is the request and the state of the conversation before it. On a hit, the turn is replayed
+        into the message history (and `previous_response_id`) so that following turns see the same conversation.
+        """
+        if self._response_cache is None:
+            return None, None
+        key = response_cache_key(
+            api_mode.name, self._model, instructions, prompt, self._history.digest(), self._temperature, self._sample
+        )
+        cached = self._response_cache.get(key)
+        if cached is None:
+            return key, None
+
+        logger.info(f"response cache: hit: {key[:12]}")
+        self._history.add_user_message(instructions, prompt)
+        self._history.add_assistant_message(cached.text)
+        if cached.response_id is not None:
+            self._previous_response_id = cached.response_id
+        return key, cached
+
+    def _store_response(self, key: str | None, text: str, response_id: str | None = None) -> None:
+        """Store the response into the response cache."""
+        if key is not None and self._response_cache is not None:
+            self._response_cache.put(key, CachedResponse(text=text, response_id=response_id))
+
+    def _response_params(self, instructions: str, prompt: str) -> dict[str, Any]:
+        """Build parameters of Response API and add user message to message history.
+
+        The history is kept on the server by `previous_response_id` unless the token budget is set.
+        """
+        self._history.add_user_message(instructions, prompt)
+        if not self._history.is_bounded:
+            return {
+                "instructions": instructions,
+                "input": prompt,
+                "previous_response_id": self._previous_response_id,
+            }
+        return {"instructions": self._history.instructions, "input": self._history.context(self._system_role)}
+
+    def _summarize(self, summary: str, messages: list[Message]) -> str:
+        """Summarize the previous summary and older messages of the conversation."""
+        transcript = "\n".join(f"{message['role']}: {message['content']}" for message in messages)
+        if summary:
+            transcript = f"Summary of the earlier conversation:\n{summary}\n\n{transcript}"
+        request: list[Message] = [
+            {"role": self._system_role, "content": SUMMARIZE_INSTRUCTIONS},
+            {"role": "user", "content": transcript},
+        ]
+        completion = self._client.chat.completions.create(
+            model=self._model,
+            messages=request,  # type: ignore[arg-type]
+        )
+        self._record_usage(self._chat_usage(completion.usage), is_turn=False)
+        return completion.choices[0].message.content or summary
+
+    def _record_usage(
+        self,
+        usage: CallUsage | None,
+        is_turn: bool = True,
+        *,
+        start: float | None = None,
+        first_token_at: float | None = None,
+    ) -> None:
+        """Record token usage of a call. Prompt tokens of a turn are recorded into the message history too.
+
+        The latency is measured from `start` to now, and to `first_token_at` for the first token of streams.
+        """
+        if is_turn:
+            self._history.record_prompt_tokens(usage.prompt_tokens if usage is not None else None)
+        if usage is None:
+            logger.debug("usage isn't reported")
+            return
+        if start is not None:
+            end = time.perf_counter()
+            usage = replace(
+                usage,
+                elapsed=end - start,
+                time_to_first_token=(first_token_at if first_token_at is not None else end) - start,
+            )
+        self._usages.append(usage)
+        logger.info(
+            f"usage: prompt tokens: {usage.prompt_tokens}, cached tokens: {usage.cached_tokens} "
+            f"({usage.cache_hit_ratio:.0%}), output tokens: {usage.output_tokens}"
+        )
+
+    @staticmethod
+    def _response_usage(usage: "ResponseUsage | None") -> CallUsage | None:
+        """Convert usage of Response API."""
+        if usage is None:
+            return None
+        # `input_tokens_details` isn't reported by older SDKs and local LLM servers
+        details = getattr(usage, "input_tokens_details", None)
+        return CallUsage(
+            prompt_tokens=usage.input_tokens,
+            cached_tokens=getattr(details, "cached_tokens", None) or 0,
+            output_tokens=usage.output_tokens,
+        )
+
+    @staticmethod
+    def _chat_usage(usage: "CompletionUsage | None") -> CallUsage | None:
+        """Convert usage of Chat Completion API."""
+        if usage is None:
+            return None
+        details = usage.prompt_tokens_details
+        return CallUsage(
+            prompt_tokens=usage.prompt_tokens,
+            cached_tokens=(details.cached_tokens if details is not None else None) or 0,
+            output_tokens=usage.completion_tokens,
+        )
+
+    @staticmethod
+    def _fill_stream_metrics(
+        metrics: StreamMetrics | None, start: float, first_token_at: float | None, output_tokens: int
+    ) -> None:
+        """Fill metrics of a finished stream."""
+        if metrics is None:
+            return
+        end = time.perf_counter()
+        metrics.time_to_first_token = (first_token_at if first_token_at is not None else end) - start
+        metrics.elapsed = end - start
+        metrics.output_tokens = output_tokens
+
+    def _create_embeddings(self, prompt: str | list[str]) -> list[Embedding]:
+        """Request embeddings.
+
+        OpenAI API returns base64 encoded float32, which is decoded into arrays without float lists.
+        Local LLM servers may not support it, so float is requested.
+        """
+        encoding_format: Literal["float", "base64"] = "float" if self._is_local_llm else "base64"
+        response = self._client.embeddings.create(
+            model=self._embedding_model, input=prompt, encoding_format=encoding_format
+        )
+        # convert OnenAI Embedding to inner Embedding
+        return Embedding.from_openai_embedding(response.data)
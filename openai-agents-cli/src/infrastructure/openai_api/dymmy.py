@@ -1,10 +1,11 @@
 """OpenAI dummy module class."""
 
-# from openai.types.embedding import Embedding
+from collections.abc import Iterator
 
+# from openai.types.embedding import Embedding
 from entities.embedding.types import Embedding
 
-from .interface import OpenAIClientInterface
+from .interface import CallUsage, OpenAIClientInterface, StreamMetrics
 
 
 class OpenAIDummyClient(OpenAIClientInterface):
@@ -21,6 +22,27 @@ class OpenAIDummyClient(OpenAIClientInterface):
         """Call Chat Completion API with instructions and prompt."""
         return "dummy response"
 
+    def stream_response(self, _instructions: str, _prompt: str, _metrics: StreamMetrics | None = None) -> Iterator[str]:
+        """Stream text deltas of Response API."""
+        yield "dummy response"
+
+    def stream_chat_completion(
+        self, _instructions: str, _prompt: str, _metrics: StreamMetrics | None = None
+    ) -> Iterator[str]:
+        """Stream text deltas of Chat Completion API."""
+        yield "dummy response"
+
+    def clear(self) -> None:
+        """Dummy client has no conversation."""
+
+    def fork(self, _sample: int = 0) -> "OpenAIDummyClient":
+        """Dummy client has no conversation."""
+        return self
+
+    def get_usages(self) -> list[CallUsage]:
+        """Get token usage of the calls."""
+        return []
+
     def call_embeddings(self, _prompt: str | list[str]) -> list[Embedding]:
         """Call Embedding API with prompt."""
         return [Embedding(embedding=[0.1, 0.2, 0.3, 0.4, 0.5], index=0, object_type="embedding")]
@@ -0,0 +1,186 @@
+"""Embedding pipeline module class."""
+
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+import openai
+from loguru import logger
+
+from entities.embedding.types import Embedding
+
+from .interface import OpenAIClientInterface
+
+# Limits of OpenAI Embeddings API per request
+MAX_BATCH_TOKENS = 300_000
+MAX_BATCH_ITEMS = 2048
+
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.InternalServerError,
+    openai.APIConnectionError,  # APITimeoutError is a subclass
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of tokens without a tokenizer.
+
+    One token is roughly 4 characters in English and 1 character in CJK,
+    so counting 3 UTF-8 bytes as a token over-estimates both and keeps batches under the limit.
+    """
+    return len(text.encode("utf-8")) // 3 + 1
+
+
+@dataclass
+class EmbeddingPipelineMetrics:
+    """Throughput metrics of EmbeddingPipeline."""
+
+    texts: int = 0
+    tokens: int = 0
+    batches: int = 0
+    retries: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def texts_per_sec(self) -> float:
+        """Embedded texts per second."""
+        return self.texts / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def tokens_per_sec(self) -> float:
+        """Estimated tokens per second."""
+        return self.tokens / self.elapsed if self.elapsed > 0 else 0.0
+
+
+class EmbeddingPipeline:
+    """Batched, concurrent embedding pipeline on top of `OpenAIClientInterface.call_embeddings`.
+
+    Inputs are split into batches by token budget and item count, and the batches are sent concurrently.
+    Results are returned in input order.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        openai_client: OpenAIClientInterface,
+        *,
+        max_batch_tokens: int = 8000,
+        max_batch_items: int = 256,
+        concurrency: int = 4,
+        max_retries: int = 5,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0,
+    ) -> None:
+        """Initialize EmbeddingPipeline."""
+        if not 0 < max_batch_tokens <= MAX_BATCH_TOKENS:
+            msg = f"`max_batch_tokens` must be in (0, {MAX_BATCH_TOKENS}]"
+            raise ValueError(msg)
+        if not 0 < max_batch_items <= MAX_BATCH_ITEMS:
+            msg = f"`max_batch_items` must be in (0, {MAX_BATCH_ITEMS}]"
+            raise ValueError(msg)
+        if concurrency <= 0:
+            msg = "`concurrency` must be positive"
+            raise ValueError(msg)
+
+        self._openai_client = openai_client
+        self._max_batch_tokens = max_batch_tokens
+        self._max_batch_items = max_batch_items
+        self._concurrency = concurrency
+        self._max_retries = max_retries
+        self._backoff_base = backoff_base
+        self._backoff_max = backoff_max
+        self._lock = threading.Lock()
+        self._metrics = EmbeddingPipelineMetrics()
+
+    @property
+    def metrics(self) -> EmbeddingPipelineMetrics:
+        """Metrics of the last `embed()` call."""
+        return self._metrics
+
+    def embed(self, texts: list[str]) -> list[Embedding]:
+        """Embed texts and return embeddings in input order.
+
+        `Embedding.index` is the position in `texts`.
+        """
+        self._metrics = EmbeddingPipelineMetrics(texts=len(texts))
+        if not texts:
+            return []
+
+        batches = self._split(texts)
+        self._metrics.batches = len(batches)
+        logger.debug(f"EmbeddingPipeline.embed(): texts: {len(texts)}, batches: {len(batches)}")
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=min(self._concurrency, len(batches))) as executor:
+            results = list(executor.map(lambda batch: self._embed_batch(texts, *batch), batches))
+        self._metrics.elapsed = time.perf_counter() - start
+
+        embeddings = [embedding for result in results for embedding in result]
+        embeddings.sort(key=lambda embedding: embedding.index)
+        logger.info(
+            f"embedded texts: {self._metrics.texts}, batches: {self._metrics.batches}, "
+            f"retries: {self._metrics.retries}, texts/sec: {self._metrics.texts_per_sec:.1f}, "
+            f"tokens/sec: {self._metrics.tokens_per_sec:.1f}"
+        )
+        return embeddings
+
+    # --------------------------------------------------------------------------
+    # Private methods
+    # --------------------------------------------------------------------------
+
+    def _split(self, texts: list[str]) -> list[tuple[int, int]]:
+        """Split texts into `(start, end)` ranges by token budget and item count."""
+        batches: list[tuple[int, int]] = []
+        start = 0
+        tokens = 0
+        for i, text in enumerate(texts):
+            text_tokens = estimate_tokens(text)
+            if text_tokens > self._max_batch_tokens:
+                logger.warning(f"text at index {i} exceeds token budget: {text_tokens} tokens")
+            if i > start and (tokens + text_tokens > self._max_batch_tokens or i - start >= self._max_batch_items):
+                batches.append((start, i))
+                start = i
+                tokens = 0
+            tokens += text_tokens
+        batches.append((start, len(texts)))
+        self._metrics.tokens = sum(estimate_tokens(text) for text in texts)
+        return batches
+
+    def _embed_batch(self, texts: list[str], start: int, end: int) -> list[Embedding]:
+        """Embed one batch, and offset `Embedding.index` to the input position."""
+        batch = texts[start:end]
+        embeddings = self._call_with_retry(batch, f"[{start}:{end}]")
+        if len(embeddings) != len(batch):
+            msg = f"expected {len(batch)} embeddings, got {len(embeddings)}"
+            raise ValueError(msg)
+        for embedding in embeddings:
+            embedding.index += start
+        return embeddings
+
+    def _call_with_retry(self, batch: list[str], label: str) -> list[Embedding]:
+        """Call Embeddings API retrying on rate limit, 5xx and connection errors."""
+        attempt = 0
+        while True:
+            try:
+                return self._openai_client.call_embeddings(batch)
+            except RETRYABLE_ERRORS as e:
+                if attempt >= self._max_retries:
+                    raise
+                wait = self._backoff(attempt, e)
+                logger.warning(f"embedding batch {label} failed: {type(e).__name__}, retry in {wait:.2f}s")
+                with self._lock:
+                    self._metrics.retries += 1
+                time.sleep(wait)
+                attempt += 1
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        """Exponential backoff with full jitter, honoring `Retry-After` header if any."""
+        if isinstance(error, openai.APIStatusError):
+            retry_after = error.response.headers.get("retry-after")
+            if retry_after is not None:
+                try:
+                    return min(float(retry_after), self._backoff_max)
+                except ValueError:
+                    pass
+        return random.uniform(0, min(self._backoff_max, self._backoff_base * 2**attempt))  # noqa: S311
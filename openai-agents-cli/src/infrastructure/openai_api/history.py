@@ -0,0 +1,212 @@
+"""Conversation history module with token budget."""
+
+import hashlib
+import json
+from abc import ABC, abstractmethod
+from collections.abc import Callable
+from dataclasses import dataclass
+from enum import Enum
+
+from loguru import logger
+
+from .embedding_pipeline import estimate_tokens
+
+# tokens added to every message by the chat format
+MESSAGE_OVERHEAD_TOKENS = 4
+SUMMARY_PREFIX = "Summary of the earlier conversation:\n"
+
+Message = dict[str, str]
+
+
+def estimate_message_tokens(messages: list[Message]) -> int:
+    """Estimate prompt tokens of messages without a tokenizer."""
+    return sum(estimate_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS for message in messages)
+
+
+def estimate_summary_tokens(summary: str) -> int:
+    """Estimate prompt tokens of the summary message. It's 0 without summary."""
+    return estimate_tokens(SUMMARY_PREFIX + summary) + MESSAGE_OVERHEAD_TOKENS if summary else 0
+
+
+class HistoryStrategy(Enum):
+    """Strategy to fit conversation history into the token budget."""
+
+    TRUNCATE = "truncate"
+    SUMMARIZE = "summarize"
+
+    @classmethod
+    def from_str(cls, value: str) -> "HistoryStrategy":
+        """Convert string to HistoryStrategy."""
+        try:
+            return cls(value)
+        except ValueError:
+            msg = f"Unknown history strategy: {value}"
+            raise ValueError(msg) from None
+
+
+@dataclass(frozen=True)
+class TurnUsage:
+    """Prompt tokens of a turn. `prompt_tokens` is None when the server doesn't report usage."""
+
+    turn: int
+    messages: int
+    estimated_prompt_tokens: int
+    prompt_tokens: int | None = None
+
+
+class HistoryStrategyInterface(ABC):
+    """Interface to fit conversation history into the token budget."""
+
+    @abstractmethod
+    def fit(self, summary: str, turns: list[Message], max_tokens: int) -> tuple[str, list[Message]]:
+        """Fit summary of older turns and turns into `max_tokens`. The last message must be kept."""
+
+
+class TruncateStrategy(HistoryStrategyInterface):
+    """Drop the oldest turns until the history fits into the token budget."""
+
+    def fit(self, summary: str, turns: list[Message], max_tokens: int) -> tuple[str, list[Message]]:
+        """Drop the oldest messages. A history always starts with a user message."""
+        budget = max_tokens - estimate_summary_tokens(summary)
+        start = 0
+        while start < len(turns) - 1 and (
+            estimate_message_tokens(turns[start:]) > budget or turns[start]["role"] != "user"
+        ):
+            start += 1
+        if start > 0:
+            logger.debug(f"history: dropped {start} messages")
+        return summary, turns[start:]
+
+
+class SummarizeStrategy(HistoryStrategyInterface):
+    """Summarize older turns into the summary, keeping the last exchanges verbatim.
+
+    When the summary and the kept exchanges still don't fit, they are summarized too,
+    and the oldest turns are dropped as the last resort.
+    """
+
+    def __init__(self, summarize: Callable[[str, list[Message]], str], keep_exchanges: int = 1) -> None:
+        """Initialize SummarizeStrategy.
+
+        `summarize` gets the previous summary and older messages, and returns the new summary.
+        """
+        self._summarize = summarize
+        self._keep_exchanges = keep_exchanges
+        self._truncate = TruncateStrategy()
+
+    def fit(self, summary: str, turns: list[Message], max_tokens: int) -> tuple[str, list[Message]]:
+        """Summarize older turns when the history exceeds the token budget."""
+        user_indexes = [i for i, message in enumerate(turns) if message["role"] == "user"]
+        for keep_exchanges in range(self._keep_exchanges, -1, -1):
+            if estimate_summary_tokens(summary) + estimate_message_tokens(turns) <= max_tokens:
+                break
+            # keep the last user message and `keep_exchanges` exchanges before it
+            split = user_indexes[max(len(user_indexes) - 1 - keep_exchanges, 0)] if user_indexes else 0
+            if split > 0:
+                logger.debug(f"history: summarize {split} messages")
+                summary = self._summarize(summary, turns[:split])
+                turns = turns[split:]
+                user_indexes = [i - split for i in user_indexes if i >= split]
+        return self._truncate.fit(summary, turns, max_tokens)
+
+
+class ConversationHistory:
+    """Conversation history bounded by the token budget of prompts.
+
+    Messages are laid out as instructions, the summary of older turns, then turns,
+    so that static instructions stay an identical prefix for provider-side prompt caching.
+    Instructions are always kept. `max_tokens` of 0 means unlimited.
+    """
+
+    def __init__(self, max_tokens: int = 0, strategy: HistoryStrategyInterface | None = None) -> None:
+        """Initialize ConversationHistory."""
+        if max_tokens < 0:
+            msg = "`max_tokens` must not be negative"
+            raise ValueError(msg)
+        self._max_tokens = max_tokens
+        self._strategy = strategy or TruncateStrategy()
+        self._instructions: str | None = None
+        self._summary = ""
+        self._turns: list[Message] = []
+        self._usages: list[TurnUsage] = []
+
+    @property
+    def is_bounded(self) -> bool:
+        """Whether the token budget is set."""
+        return self._max_tokens > 0
+
+    @property
+    def instructions(self) -> str:
+        """Instructions of the session."""
+        return self._instructions or ""
+
+    @property
+    def turns(self) -> list[Message]:
+        """User and assistant messages."""
+        return list(self._turns)
+
+    @property
+    def usages(self) -> list[TurnUsage]:
+        """Prompt tokens per turn."""
+        return list(self._usages)
+
+    def messages(self, system_role: str) -> list[Message]:
+        """Messages of Chat Completion API starting with the instructions."""
+        return [{"role": system_role, "content": self.instructions}, *self.context(system_role)]
+
+    def context(self, system_role: str) -> list[Message]:
+        """The summary of older turns followed by turns."""
+        if not self._summary:
+            return list(self._turns)
+        summary = {"role": system_role, "content": f"{SUMMARY_PREFIX}{self._summary}"}
+        return [summary, *self._turns]
+
+    def new_conversation(self) -> "ConversationHistory":
+        """Empty history with the same token budget and strategy."""
+        return ConversationHistory(self._max_tokens, self._strategy)
+
+    def digest(self) -> str:
+        """Hash of instructions, summary and turns, which identifies the state of the conversation."""
+        payload = json.dumps([self._instructions, self._summary, self._turns], ensure_ascii=False)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def add_user_message(self, instructions: str, prompt: str) -> None:
+        """Add user message and fit the history into the token budget.
+
+        Instructions are set at the first message like a session.
+        """
+        if self._instructions is None:
+            self._instructions = instructions
+        self._turns.append({"role": "user", "content": prompt})
+        if self.is_bounded:
+            budget = self._max_tokens - estimate_message_tokens([{"role": "system", "content": self._instructions}])
+            self._summary, self._turns = self._strategy.fit(self._summary, self._turns, budget)
+        self._usages.append(
+            TurnUsage(
+                turn=len(self._usages) + 1,
+                messages=len(self._turns),
+                estimated_prompt_tokens=estimate_message_tokens(self.messages("system")),
+            )
+        )
+
+    def add_assistant_message(self, content: str) -> None:
+        """Add assistant message."""
+        self._turns.append({"role": "assistant", "content": content})
+
+    def record_prompt_tokens(self, prompt_tokens: int | None) -> None:
+        """Record prompt tokens reported by the server for the last turn."""
+        if not self._usages:
+            return
+        usage = self._usages[-1]
+        self._usages[-1] = TurnUsage(usage.turn, usage.messages, usage.estimated_prompt_tokens, prompt_tokens)
+        logger.debug(
+            f"history: turn: {usage.turn}, messages: {usage.messages}, "
+            f"prompt tokens: {prompt_tokens}, estimated: {usage.estimated_prompt_tokens}"
+        )
+
+    def clear(self) -> None:
+        """Clear the history."""
+        self._instructions = None
+        self._summary = ""
+        self._turns = []
+        self._usages = []
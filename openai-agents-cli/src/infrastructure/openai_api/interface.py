@@ -1,11 +1,52 @@
 """Interface module for OpenAIClient."""
 
 from abc import ABC, abstractmethod
+from collections.abc import Iterator
+from dataclasses import dataclass
 
 # from openai.types.embedding import Embedding
 from entities.embedding.types import Embedding
 
 
+@dataclass
+class StreamMetrics:
+    """Latency metrics of a streamed completion.
+
+    `output_tokens` is the usage reported by the server, or the number of text deltas when usage isn't reported.
+    """
+
+    time_to_first_token: float = 0.0
+    elapsed: float = 0.0
+    output_tokens: int = 0
+
+    @property
+    def tokens_per_sec(self) -> float:
+        """Output tokens per second after the first token."""
+        generation = self.elapsed - self.time_to_first_token
+        return self.output_tokens / generation if generation > 0 else 0.0
+
+
+@dataclass(frozen=True)
+class CallUsage:
+    """Token usage and latency of a call.
+
+    `cached_tokens` are prompt tokens served by the provider-side prompt cache, which matches the longest
+    identical prefix of the prompt. It's 0 when the server doesn't report it.
+    `time_to_first_token` equals `elapsed` unless the response is streamed.
+    """
+
+    prompt_tokens: int
+    cached_tokens: int
+    output_tokens: int
+    elapsed: float = 0.0
+    time_to_first_token: float = 0.0
+
+    @property
+    def cache_hit_ratio(self) -> float:
+        """Ratio of cached tokens in prompt tokens."""
+        return self.cached_tokens / self.prompt_tokens if self.prompt_tokens > 0 else 0.0
+
+
 class OpenAIClientInterface(ABC):
     """Interface for OpenAIClient."""
 
@@ -17,6 +58,28 @@ class OpenAIClientInterface(ABC):
     def call_chat_completion(self, instructions: str, prompt: str) -> str:
         """Call Chat Completion API with instructions and prompt."""
 
+    @abstractmethod
+    def stream_response(self, instructions: str, prompt: str, metrics: StreamMetrics | None = None) -> Iterator[str]:
+        """Stream text deltas of Response API. `metrics` is filled when the stream is exhausted."""
+
+    @abstractmethod
+    def stream_chat_completion(
+        self, instructions: str, prompt: str, metrics: StreamMetrics | None = None
+    ) -> Iterator[str]:
+        """Stream text deltas of Chat Completion API. `metrics` is filled when the stream is exhausted."""
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Clear the conversation."""
+
+    @abstractmethod
+    def fork(self, sample: int = 0) -> "OpenAIClientInterface":
+        """Fork a client with an empty conversation, which can be called concurrently with the others."""
+
+    @abstractmethod
+    def get_usages(self) -> list[CallUsage]:
+        """Get token usage of the calls of Response API and Chat Completion API in order."""
+
     @abstractmethod
     def call_embeddings(self, prompt: str | list[str]) -> list[Embedding]:
         """Call Embedding API with prompt."""
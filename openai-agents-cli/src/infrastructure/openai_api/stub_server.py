@@ -0,0 +1,283 @@
+"""OpenAI compatible stub server module for benchmarks."""
+
+import base64
+import hashlib
+import json
+import time
+import uuid
+from collections.abc import Iterator
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, cast
+
+import numpy as np
+from loguru import logger
+
+from .embedding_pipeline import estimate_tokens
+
+
+@dataclass(frozen=True)
+class StubServerConfig:
+    """Behavior of the stub server.
+
+    A completion waits `latency` seconds until the first token, then generates `output_tokens` at `tokens_per_sec`.
+    """
+
+    latency: float = 0.2
+    tokens_per_sec: float = 50.0
+    output_tokens: int = 64
+    dimensions: int = 768
+
+    @property
+    def generation_seconds(self) -> float:
+        """Seconds to generate all output tokens after the first one."""
+        return self.output_tokens / self.tokens_per_sec
+
+
+class StubServer(ThreadingHTTPServer):
+    """OpenAI compatible stub server.
+
+    Chat Completion, Response and Embeddings APIs (including streaming) return synthetic outputs
+    with simulated latency, so the cost of prompts can be measured without a provider.
+    Prompt tokens are estimated from the request.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, host: str, port: int, config: StubServerConfig) -> None:
+        """Initialize StubServer."""
+        if config.tokens_per_sec <= 0:
+            msg = "`tokens_per_sec` must be positive"
+            raise ValueError(msg)
+        if config.latency < 0 or config.output_tokens < 1:
+            msg = "`latency` must not be negative and `output_tokens` must be positive"
+            raise ValueError(msg)
+        super().__init__((host, port), _StubRequestHandler)
+        self.config = config
+
+    def run(self) -> None:
+        """Serve until interrupted."""
+        host, port = self.server_address[:2]
+        logger.info(f"stub server: http://{host!s}:{port}/v1, {self.config}")
+        try:
+            self.serve_forever()
+        except KeyboardInterrupt:
+            logger.info("stub server: stopped")
+        finally:
+            self.server_close()
+
+
+class _StubRequestHandler(BaseHTTPRequestHandler):
+    """Request handler of StubServer."""
+
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def _config(self) -> StubServerConfig:
+        return cast("StubServer", self.server).config
+
+    def do_POST(self) -> None:
+        """Dispatch API requests."""
+        length = int(self.headers.get("Content-Length", "0"))
+        body: dict[str, Any] = json.loads(self.rfile.read(length) or b"{}")
+        path = self.path.removeprefix("/v1")
+        if path == "/chat/completions":
+            self._chat_completions(body)
+        elif path == "/responses":
+            self._responses(body)
+        elif path == "/embeddings":
+            self._embeddings(body)
+        else:
+            self._send_json({"error": {"message": f"Unknown path: {self.path}"}}, status=404)
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002, ANN401
+        """Log requests by loguru."""
+        logger.debug(f"stub server: {format % args}")
+
+    # --------------------------------------------------------------------------
+    # APIs
+    # --------------------------------------------------------------------------
+
+    def _chat_completions(self, body: dict[str, Any]) -> None:
+        """Chat Completion API."""
+        completion_id = f"chatcmpl-stub-{uuid.uuid4().hex}"
+        model = body.get("model", "stub")
+        usage = self._usage(
+            "prompt_tokens", "completion_tokens", [message.get("content") for message in body.get("messages", [])]
+        )
+        if not body.get("stream"):
+            time.sleep(self._config.latency + self._config.generation_seconds)
+            self._send_json(
+                {
+                    "id": completion_id,
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [
+                        {
+                            "index": 0,
+                            "finish_reason": "stop",
+                            "message": {"role": "assistant", "content": "".join(self._tokens())},
+                        }
+                    ],
+                    "usage": usage,
+                }
+            )
+            return
+
+        def chunk(choices: list[dict[str, Any]], **fields: Any) -> dict[str, Any]:  # noqa: ANN401
+            return {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": choices,
+                **fields,
+            }
+
+        self._start_stream()
+        for token in self._generate():
+            self._send_event(chunk([{"index": 0, "delta": {"content": token}, "finish_reason": None}]))
+        self._send_event(chunk([{"index": 0, "delta": {}, "finish_reason": "stop"}]))
+        if body.get("stream_options", {}).get("include_usage"):
+            self._send_event(chunk([], usage=usage))
+        self._send_data("[DONE]")
+
+    def _responses(self, body: dict[str, Any]) -> None:
+        """Response API."""
+        request_input = body.get("input", "")
+        messages = request_input if isinstance(request_input, list) else [{"content": request_input}]
+        usage = self._usage(
+            "input_tokens",
+            "output_tokens",
+            [body.get("instructions"), *(message.get("content") for message in messages)],
+        )
+        usage["input_tokens_details"] = {"cached_tokens": 0}
+        usage["output_tokens_details"] = {"reasoning_tokens": 0}
+        response_id = f"resp_stub_{uuid.uuid4().hex}"
+        message_id = f"msg_stub_{uuid.uuid4().hex}"
+
+        def response(text: str) -> dict[str, Any]:
+            return {
+                "id": response_id,
+                "object": "response",
+                "created_at": int(time.time()),
+                "model": body.get("model", "stub"),
+                "status": "completed",
+                "output": [
+                    {
+                        "type": "message",
+                        "id": message_id,
+                        "status": "completed",
+                        "role": "assistant",
+                        "content": [{"type": "output_text", "text": text, "annotations": []}],
+                    }
+                ],
+                "parallel_tool_calls": False,
+                "tool_choice": "auto",
+                "tools": [],
+                "usage": usage,
+            }
+
+        if not body.get("stream"):
+            time.sleep(self._config.latency + self._config.generation_seconds)
+            self._send_json(response("".join(self._tokens())))
+            return
+
+        self._start_stream()
+        tokens: list[str] = []
+        for sequence_number, token in enumerate(self._generate()):
+            tokens.append(token)
+            self._send_event(
+                {
+                    "type": "response.output_text.delta",
+                    "item_id": message_id,
+                    "output_index": 0,
+                    "content_index": 0,
+                    "delta": token,
+                    "sequence_number": sequence_number,
+                }
+            )
+        self._send_event(
+            {
+                "type": "response.completed",
+                "response": response("".join(tokens)),
+                "sequence_number": len(tokens),
+            }
+        )
+
+    def _embeddings(self, body: dict[str, Any]) -> None:
+        """Embeddings API. Vectors are deterministic per text."""
+        texts = body.get("input", [])
+        texts = [texts] if isinstance(texts, str) else texts
+        data = []
+        for index, text in enumerate(texts):
+            seed = int.from_bytes(hashlib.sha256(str(text).encode()).digest()[:8], "little")
+            vector = np.random.default_rng(seed).standard_normal(self._config.dimensions, dtype=np.float32)
+            vector /= np.linalg.norm(vector)
+            embedding: str | list[float] = (
+                base64.b64encode(vector.tobytes()).decode()
+                if body.get("encoding_format") == "base64"
+                else vector.tolist()
+            )
+            data.append({"object": "embedding", "index": index, "embedding": embedding})
+        prompt_tokens = sum(estimate_tokens(str(text)) for text in texts)
+        time.sleep(self._config.latency)
+        self._send_json(
+            {
+                "object": "list",
+                "data": data,
+                "model": body.get("model", "stub"),
+                "usage": {"prompt_tokens": prompt_tokens, "total_tokens": prompt_tokens},
+            }
+        )
+
+    # --------------------------------------------------------------------------
+    # Private methods
+    # --------------------------------------------------------------------------
+
+    def _tokens(self) -> list[str]:
+        """Synthetic output tokens."""
+        return [f"token{i} " for i in range(self._config.output_tokens)]
+
+    def _generate(self) -> Iterator[str]:
+        """Wait for the first token, then yield output tokens at `tokens_per_sec`."""
+        time.sleep(self._config.latency)
+        interval = 1 / self._config.tokens_per_sec
+        tokens = self._tokens()
+        for i, token in enumerate(tokens):
+            if i > 0:
+                time.sleep(interval)
+            yield token
+
+    def _usage(self, prompt_key: str, output_key: str, contents: list[Any]) -> dict[str, Any]:
+        """Usage with prompt tokens estimated from text contents."""
+        prompt_tokens = sum(estimate_tokens(content) for content in contents if isinstance(content, str))
+        output_tokens = self._config.output_tokens
+        return {prompt_key: prompt_tokens, output_key: output_tokens, "total_tokens": prompt_tokens + output_tokens}
+
+    def _send_json(self, payload: dict[str, Any], status: int = 200) -> None:
+        """Send JSON response."""
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _start_stream(self) -> None:
+        """Start server-sent events. The connection is closed at the end of the stream."""
+        self.close_connection = True
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+
+    def _send_event(self, payload: dict[str, Any]) -> None:
+        """Send a server-sent event of JSON."""
+        self._send_data(json.dumps(payload))
+
+    def _send_data(self, data: str) -> None:
+        """Send a server-sent event."""
+        self.wfile.write(f"data: {data}\n\n".encode())
+        self.wfile.flush()
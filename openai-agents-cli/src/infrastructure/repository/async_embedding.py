@@ -0,0 +1,155 @@
+"""Async Embedding VectorDB repository class."""
+
+from typing import Any
+
+import numpy as np
+from loguru import logger
+from psycopg import AsyncCursor
+
+from entities.embedding.types import Embedding, EmbeddingItem
+from entities.vector_index.types import SearchParams, SimilarityResult
+from infrastructure.repository.interface import AsyncEmbeddingRepositoryInterface
+from infrastructure.vectordb.pgvector.async_client import AsyncPgVectorClient
+
+
+class AsyncPgVectorEmbeddingRepository(AsyncEmbeddingRepositoryInterface):
+    """Async Documents VectorDB repository class."""
+
+    def __init__(self, pg_vector_client: AsyncPgVectorClient, is_large_embedding: bool) -> None:
+        """Initialize Async Documents VectorDB repository class."""
+        if not pg_vector_client:
+            msg = "`pg_vector_client` must be provided"
+            raise ValueError(msg)
+
+        self._pg_vector_client = pg_vector_client
+        self._embeddings_table = "embeddings_large" if is_large_embedding else "embeddings"
+        self._item_contents_table = "item_contents_large" if is_large_embedding else "item_contents"
+
+    async def open(self) -> None:
+        """Open the connection pool. It must be awaited in the running event loop."""
+        await self._pg_vector_client.open()
+
+    async def insert_embeddings_bulk(self, data: list[Embedding], batch_size: int = 1000) -> list[int]:
+        """Insert embeddings data into `embeddings` table by binary COPY.
+
+        `id` of `embeddings` table is `bigserial`.
+        """
+        logger.debug(f"AsyncDocumentsRepository.insert_embeddings_bulk(): rows: {len(data)}")
+
+        rows = [(self._to_vector(embedding),) for embedding in data]
+        return await self._copy_bulk(self._embeddings_table, ["embedding"], ["int8", "vector"], rows, batch_size)
+
+    async def insert_item_contents_bulk(
+        self, contents: list[str], embeddings: list[Embedding], batch_size: int = 1000
+    ) -> list[int]:
+        """Insert content, embedding into `item_contents` table by binary COPY.
+
+        `id` of `item_contents` table is `serial`.
+        """
+        logger.debug(f"AsyncDocumentsRepository.insert_item_contents_bulk(): rows: {len(contents)}")
+
+        if len(contents) != len(embeddings):
+            msg = "`contents` and `embeddings` must have the same length"
+            raise ValueError(msg)
+
+        rows = [(content, self._to_vector(embedding)) for content, embedding in zip(contents, embeddings, strict=True)]
+        return await self._copy_bulk(
+            self._item_contents_table, ["content", "embedding"], ["int4", "text", "vector"], rows, batch_size
+        )
+
+    async def get_item_by_id(self, item_id: int) -> EmbeddingItem | None:
+        """Get a record by id from `item_contents` table."""
+        logger.debug("AsyncDocumentsRepository.get_item_by_id()")
+
+        query = f"SELECT content, embedding FROM {self._item_contents_table} WHERE id = %s"  # noqa: S608
+        async with self._pg_vector_client.cursor() as cur:
+            await cur.execute(query, (item_id,))
+            item = await cur.fetchone()
+        if item is None:
+            return None
+
+        content, embedding = item
+        return EmbeddingItem(question=content, embedding=embedding)
+
+    async def similarity_search(
+        self, embedding: np.typing.NDArray[np.floating], top_k: int = 5, search_params: SearchParams | None = None
+    ) -> list[SimilarityResult]:
+        """Execute similarity search and return rows ordered by cosine distance."""
+        query = (
+            f"SELECT id, content, embedding <=> %s AS distance FROM {self._item_contents_table} "  # noqa: S608
+            "ORDER BY distance LIMIT %s"
+        )
+        async with self._pg_vector_client.cursor() as cur:
+            if search_params is not None:
+                await self._apply_search_params(cur, search_params)
+            await cur.execute(query, (self._to_query_vector(embedding), top_k))
+            items = await cur.fetchall()
+        return [
+            SimilarityResult(id=int(item_id), content=str(content), distance=float(distance))
+            for item_id, content, distance in items
+        ]
+
+    async def close(self) -> None:
+        """Close all pooled connections."""
+        await self._pg_vector_client.close()
+
+    # --------------------------------------------------------------------------
+    # Private methods
+    # --------------------------------------------------------------------------
+
+    @staticmethod
+    def _to_vector(embedding: Embedding) -> np.typing.NDArray[np.float32]:
+        """Convert embedding to float32 array dumped by `register_vector_async`."""
+        return np.asarray(embedding.embedding, dtype=np.float32)
+
+    @staticmethod
+    def _to_query_vector(embedding: np.typing.NDArray[np.floating]) -> np.typing.NDArray[np.float32]:
+        """Convert query embedding to float32 array."""
+        return np.asarray(embedding, dtype=np.float32)
+
+    @staticmethod
+    async def _apply_search_params(cur: AsyncCursor[Any], search_params: SearchParams) -> None:
+        """Apply query time parameters of ANN index until the end of the transaction.
+
+        `SET` can't take bind parameters with server-side binding, so `set_config()` is used.
+        """
+        if search_params.exact:
+            await cur.execute("SELECT set_config('enable_indexscan', 'off', true)")
+        if search_params.ef_search is not None:
+            await cur.execute("SELECT set_config('hnsw.ef_search', %s, true)", (str(search_params.ef_search),))
+        if search_params.probes is not None:
+            await cur.execute("SELECT set_config('ivfflat.probes', %s, true)", (str(search_params.probes),))
+
+    async def _copy_bulk(
+        self,
+        table: str,
+        columns: list[str],
+        column_types: list[str],
+        rows: list[tuple[Any, ...]],
+        batch_size: int,
+    ) -> list[int]:
+        """Stream rows through `COPY ... FROM STDIN (FORMAT BINARY)` committing once per batch.
+
+        COPY can't return generated values, so ids are reserved from the sequence beforehand.
+        """
+        if batch_size <= 0:
+            msg = "`batch_size` must be positive"
+            raise ValueError(msg)
+
+        ids: list[int] = []
+        query = f"COPY {table} (id, {', '.join(columns)}) FROM STDIN WITH (FORMAT BINARY)"
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start : start + batch_size]
+            # one transaction per batch
+            async with self._pg_vector_client.cursor() as cur:
+                await cur.execute(
+                    "SELECT nextval(pg_get_serial_sequence(%s, 'id')) FROM generate_series(1, %s)",
+                    (table, len(batch)),
+                )
+                batch_ids = [int(row[0]) for row in await cur.fetchall()]
+                async with cur.copy(query) as copy:
+                    copy.set_types(column_types)
+                    for row_id, row in zip(batch_ids, batch, strict=True):
+                        await copy.write_row((row_id, *row))
+            ids.extend(batch_ids)
+        return ids
@@ -1,68 +1,171 @@
 """Embedding VectorDB repository class."""
 
+import io
+import json
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import replace
+from typing import Any
+
 import numpy as np
+import psycopg2
 from loguru import logger
-from pgvector.psycopg2 import register_vector
+from psycopg2.extras import Json, execute_values
 
 from entities.embedding.types import Embedding, EmbeddingItem
-from infrastructure.repository.interface import EmbeddingRepositoryInterface
+from entities.vector_index.types import (
+    CachedAnswer,
+    IndexMethod,
+    IndexParams,
+    IndexTarget,
+    IterativeScan,
+    Quantization,
+    SearchFilter,
+    SearchParams,
+    SimilarityResult,
+)
+from infrastructure.repository.interface import BulkInsertMethod, EmbeddingRepositoryInterface
 from infrastructure.vectordb.pgvector.client import PgVectorClient
+from infrastructure.vectordb.pgvector.copy_binary import CopyColumnType, CopyValue, encode_copy_binary
+
+# `hnsw.iterative_scan` / `ivfflat.iterative_scan` are available since pgvector 0.8.0
+ITERATIVE_SCAN_MIN_VERSION = (0, 8)
+# default of `hnsw.ef_search`
+DEFAULT_EF_SEARCH = 40
+# candidates of quantized search per `top_k`, re-ranked by full precision distance
+RERANK_FACTOR = 4
+# suffix of scratch tables of benchmarks
+SCRATCH_SUFFIX = "_scratch"
 
 
 class PgVectorEmbeddingRepository(EmbeddingRepositoryInterface):
     """Documents VectorDB repository class."""
 
-    def __init__(self, pg_vector_client: PgVectorClient, is_large_embedding: bool) -> None:
-        """Initialize Documents VectorDB repository class."""
+    def __init__(self, pg_vector_client: PgVectorClient, is_large_embedding: bool, table_suffix: str = "") -> None:
+        """Initialize Documents VectorDB repository class.
+
+        `table_suffix` is appended to the table names, e.g. for scratch tables.
+        """
         if not pg_vector_client:
             msg = "`pg_vector_client` must be provided"
             raise ValueError(msg)
 
         self._pg_vector_client = pg_vector_client
-        self._embeddings_table = "embeddings_large" if is_large_embedding else "embeddings"
-        self._item_contents_table = "item_contents_large" if is_large_embedding else "item_contents"
+        self._is_large_embedding = is_large_embedding
+        self._embeddings_table = ("embeddings_large" if is_large_embedding else "embeddings") + table_suffix
+        self._item_contents_table = ("item_contents_large" if is_large_embedding else "item_contents") + table_suffix
+        self._dimensions = 1536 if is_large_embedding else 768
+        self._iterative_scan_supported: bool | None = None
 
-    def insert_embeddings(self, data: list[Embedding]) -> None:
+    def insert_embeddings(self, data: list[Embedding]) -> list[int]:
         """Insert embeddings data into `embeddings` table."""
         logger.debug("DocumentsRepository.insert_embeddings()")
 
-        register_vector(self._pg_vector_client.get_conn())
-        cur = self._pg_vector_client.get_cursor()
-
-        query = f"INSERT INTO {self._embeddings_table} (embedding) VALUES (%s)"  # noqa: S608
-        for embedding in data:
-            # logger.debug(f"embedding.embedding: {embedding.embedding}")
-            # parameters must be tuple
-            cur.execute(query, (embedding.embedding,))
-            self._pg_vector_client.get_conn().commit()
+        ids: list[int] = []
+        query = f"INSERT INTO {self._embeddings_table} (embedding) VALUES (%s) RETURNING id"  # noqa: S608
+        with self._pg_vector_client.connection() as conn, conn.cursor() as cur:
+            for embedding in data:
+                # logger.debug(f"embedding.embedding: {embedding.embedding}")
+                # parameters must be tuple
+                cur.execute(query, (embedding.embedding,))
+                ids.append(cur.fetchone()[0])
+                conn.commit()
 
-        cur.close()
+        return ids
 
-    def insert_item_contents(self, contents: list[str], embeddings: list[Embedding]) -> None:
-        """Insert content, embedding into `item_contents` table."""
+    def insert_item_contents(
+        self, contents: list[str], embeddings: list[Embedding], metadata: list[dict[str, Any]] | None = None
+    ) -> list[int]:
+        """Insert content, embedding and metadata into `item_contents` table."""
         logger.debug("DocumentsRepository.insert_item_contents()")
 
-        register_vector(self._pg_vector_client.get_conn())
-        cur = self._pg_vector_client.get_cursor()
+        metadata_list = self._metadata_list(metadata, len(contents))
+        ids: list[int] = []
+        query = (
+            f"INSERT INTO {self._item_contents_table} (content, embedding, metadata) "  # noqa: S608
+            "VALUES (%s, %s, %s) RETURNING id"
+        )
+        with self._pg_vector_client.connection() as conn, conn.cursor() as cur:
+            for content, embedding, item_metadata in zip(contents, embeddings, metadata_list, strict=False):
+                # parameters must be tuple
+                cur.execute(query, (content, embedding.embedding, Json(item_metadata)))
+                ids.append(cur.fetchone()[0])
+                conn.commit()
 
-        query = f"INSERT INTO {self._item_contents_table} (content, embedding) VALUES (%s, %s)"  # noqa: S608
-        for content, embedding in zip(contents, embeddings, strict=False):
-            # parameters must be tuple
-            cur.execute(query, (content, embedding.embedding))
-            self._pg_vector_client.get_conn().commit()
+        return ids
+
+    def insert_embeddings_bulk(
+        self, data: list[Embedding], batch_size: int = 1000, method: BulkInsertMethod = BulkInsertMethod.COPY
+    ) -> list[int]:
+        """Insert embeddings data into `embeddings` table by batch.
+
+        `id` of `embeddings` table is `bigserial`.
+        """
+        logger.debug(f"DocumentsRepository.insert_embeddings_bulk(): method: {method.value}, rows: {len(data)}")
+
+        rows: list[tuple[CopyValue, ...]] = [(self._to_vector(embedding),) for embedding in data]
+        return self._insert_bulk(
+            self._embeddings_table,
+            ["embedding"],
+            [CopyColumnType.INT8, CopyColumnType.VECTOR],
+            rows,
+            batch_size,
+            method,
+        )
+
+    def insert_item_contents_bulk(
+        self,
+        contents: list[str],
+        embeddings: list[Embedding],
+        batch_size: int = 1000,
+        method: BulkInsertMethod = BulkInsertMethod.COPY,
+        metadata: list[dict[str, Any]] | None = None,
+    ) -> list[int]:
+        """Insert content, embedding and metadata into `item_contents` table by batch.
 
-        cur.close()
+        `id` of `item_contents` table is `serial`.
+        """
+        logger.debug(f"DocumentsRepository.insert_item_contents_bulk(): method: {method.value}, rows: {len(contents)}")
+
+        if len(contents) != len(embeddings):
+            msg = "`contents` and `embeddings` must have the same length"
+            raise ValueError(msg)
+
+        # JSON text is cast to `jsonb` by `INSERT ... VALUES`
+        metadata_values: list[CopyValue] = [
+            item_metadata if method == BulkInsertMethod.COPY else json.dumps(item_metadata, ensure_ascii=False)
+            for item_metadata in self._metadata_list(metadata, len(contents))
+        ]
+        rows: list[tuple[CopyValue, ...]] = [
+            (content, self._to_vector(embedding), item_metadata)
+            for content, embedding, item_metadata in zip(contents, embeddings, metadata_values, strict=True)
+        ]
+        return self._insert_bulk(
+            self._item_contents_table,
+            ["content", "embedding", "metadata"],
+            [CopyColumnType.INT4, CopyColumnType.TEXT, CopyColumnType.VECTOR, CopyColumnType.JSONB],
+            rows,
+            batch_size,
+            method,
+        )
+
+    def delete_embeddings(self, ids: list[int]) -> None:
+        """Delete records by ids from `embeddings` table."""
+        self._delete_by_ids(self._embeddings_table, ids)
+
+    def delete_item_contents(self, ids: list[int]) -> None:
+        """Delete records by ids from `item_contents` table."""
+        self._delete_by_ids(self._item_contents_table, ids)
 
     def get_item_by_id(self, item_id: int) -> EmbeddingItem | None:
         """Get a record by id from `item_contents` table."""
         logger.debug("DocumentsRepository.get_item_by_id()")
 
-        cur = self._pg_vector_client.get_cursor()
         query = f"SELECT content, embedding FROM {self._item_contents_table} WHERE id = %s"  # noqa: S608
-        # parameters must be tuple
-        cur.execute(query, (item_id,))
-        item = cur.fetchone()
-        cur.close()
+        with self._pg_vector_client.cursor() as cur:
+            # parameters must be tuple
+            cur.execute(query, (item_id,))
+            item = cur.fetchone()
         if item is None:
             return None
 
@@ -71,20 +174,521 @@ class PgVectorEmbeddingRepository(EmbeddingRepositoryInterface):
         content, embedding = item
         return EmbeddingItem(question=content, embedding=embedding)
 
-    def similarity_search(self, embedding: np.typing.NDArray[np.float64], top_k: int = 5) -> list[str] | None:
-        """Execute similarity search."""
-        cur = self._pg_vector_client.get_cursor()
-        query = f"SELECT content FROM {self._item_contents_table} ORDER BY embedding <=> %s LIMIT %s"  # noqa: S608
-        # parameters must be tuple
-        cur.execute(query, (embedding, top_k))
-        items = cur.fetchall()
-        cur.close()
-        if items is None:
+    def get_items_by_ids(self, item_ids: list[int]) -> dict[int, EmbeddingItem]:
+        """Get records by ids from `item_contents` table in one query."""
+        logger.debug(f"DocumentsRepository.get_items_by_ids(): {len(item_ids)} ids")
+
+        if not item_ids:
+            return {}
+        query = f"SELECT id, content, embedding FROM {self._item_contents_table} WHERE id = ANY(%s)"  # noqa: S608
+        with self._pg_vector_client.cursor() as cur:
+            cur.execute(query, (item_ids,))
+            items = cur.fetchall()
+        return {
+            int(item_id): EmbeddingItem(question=content, embedding=embedding) for item_id, content, embedding in items
+        }
+
+    def similarity_search(
+        self,
+        embedding: np.typing.NDArray[np.floating],
+        top_k: int = 5,
+        search_params: SearchParams | None = None,
+        search_filter: SearchFilter | None = None,
+    ) -> list[SimilarityResult]:
+        """Execute similarity search and return rows ordered by cosine distance."""
+        query, parameters = self._similarity_query("id, content", embedding, top_k, search_params, search_filter)
+        items = self._search(query, parameters, self._effective_search_params(search_params, search_filter, top_k))
+        return [
+            SimilarityResult(id=int(item_id), content=str(content), distance=float(distance))
+            for item_id, content, distance in items
+        ]
+
+    def similarity_search_ids(
+        self,
+        embedding: np.typing.NDArray[np.floating],
+        top_k: int = 5,
+        search_params: SearchParams | None = None,
+        search_filter: SearchFilter | None = None,
+    ) -> list[int]:
+        """Execute similarity search and return ids of `item_contents` table."""
+        query, parameters = self._similarity_query("id", embedding, top_k, search_params, search_filter)
+        items = self._search(query, parameters, self._effective_search_params(search_params, search_filter, top_k))
+        return [int(item[0]) for item in items]
+
+    def similarity_search_many(
+        self,
+        embeddings: list[np.typing.NDArray[np.floating]],
+        top_k: int = 5,
+        search_params: SearchParams | None = None,
+        search_filter: SearchFilter | None = None,
+    ) -> list[list[SimilarityResult]]:
+        """Execute similarity search of many queries in one round-trip.
+
+        Query vectors are sent as a single `vector[]` parameter, and each of them runs
+        `ORDER BY ... LIMIT` by LATERAL join, so that ANN index is used per query.
+        With quantization, candidates of each query are re-ranked inside the LATERAL subquery.
+        """
+        logger.debug(f"DocumentsRepository.similarity_search_many(): {len(embeddings)} queries, top_k: {top_k}")
+
+        if not embeddings:
+            return []
+        where, where_parameters = self._filter_conditions(search_filter)
+        distance_condition = ""
+        distance_parameters: list[object] = []
+        if search_filter is not None and search_filter.max_distance is not None:
+            distance_condition = "WHERE t.distance <= %s "
+            distance_parameters.append(search_filter.max_distance)
+        quantization = search_params.quantization if search_params is not None else Quantization.NONE
+        if quantization == Quantization.NONE:
+            lateral = (
+                "SELECT id, content, embedding <=> q.embedding AS distance "  # noqa: S608
+                f"FROM {self._item_contents_table} {where}ORDER BY embedding <=> q.embedding LIMIT %s"
+            )
+            lateral_parameters: tuple[object, ...] = (*where_parameters, top_k)
+        else:
+            lateral = (
+                "SELECT id, content, embedding <=> q.embedding AS distance FROM ("  # noqa: S608
+                f"SELECT id, content, embedding FROM {self._item_contents_table} {where}"
+                f"ORDER BY {self._quantized_distance(quantization, 'q.embedding')} LIMIT %s"
+                ") AS c ORDER BY distance LIMIT %s"
+            )
+            lateral_parameters = (*where_parameters, self._rerank_candidates(search_params, top_k), top_k)
+        query = (
+            "SELECT q.ord, t.id, t.content, t.distance "  # noqa: S608
+            "FROM unnest(%s::vector[]) WITH ORDINALITY AS q(embedding, ord) "
+            f"CROSS JOIN LATERAL ({lateral}) AS t {distance_condition}"
+            "ORDER BY q.ord, t.distance"
+        )
+        vectors = [np.asarray(embedding, dtype=np.float32) for embedding in embeddings]
+        items = self._search(
+            query,
+            (vectors, *lateral_parameters, *distance_parameters),
+            self._effective_search_params(search_params, search_filter, top_k),
+        )
+
+        results: list[list[SimilarityResult]] = [[] for _ in embeddings]
+        for ord_, item_id, content, distance in items:
+            # `WITH ORDINALITY` starts from 1
+            results[ord_ - 1].append(SimilarityResult(id=int(item_id), content=str(content), distance=float(distance)))
+        return results
+
+    def save_answer(self, item_id: int, answer: str) -> None:
+        """Cache the answer of the question in `item_contents` table."""
+        query = f"UPDATE {self._item_contents_table} SET answer = %s, answered_at = now() WHERE id = %s"  # noqa: S608
+        with self._pg_vector_client.cursor(commit=True) as cur:
+            cur.execute(query, (answer, item_id))
+
+    def find_answer(
+        self, embedding: np.typing.NDArray[np.floating], max_distance: float, ttl_seconds: int = 0
+    ) -> CachedAnswer | None:
+        """Find the cached answer of the most similar question.
+
+        Questions without answers are filtered while scanning the index, like filtered similarity search.
+        """
+        conditions = "answer IS NOT NULL "
+        parameters: tuple[object, ...] = (embedding,)
+        if ttl_seconds > 0:
+            conditions += "AND answered_at > now() - make_interval(secs => %s) "
+            parameters = (*parameters, ttl_seconds)
+        query = (
+            "WITH candidates AS MATERIALIZED ("  # noqa: S608
+            f"SELECT id, content, answer, metadata, embedding <=> %s::vector AS distance "
+            f"FROM {self._item_contents_table} WHERE {conditions}ORDER BY distance LIMIT 1"
+            ") SELECT * FROM candidates WHERE distance <= %s"
+        )
+        search_params = (
+            SearchParams(iterative_scan=IterativeScan.RELAXED_ORDER) if self._supports_iterative_scan() else None
+        )
+        items = self._search(query, (*parameters, max_distance), search_params)
+        if not items:
             return None
-        # convert list[tuple[str]] to list[str]
-        # return cast("list[tuple[str]]", items)
-        return [str(item[0]) for item in items]
+        item_id, content, answer, metadata, distance = items[0]
+        return CachedAnswer(
+            id=int(item_id), content=content, answer=answer, distance=float(distance), metadata=metadata
+        )
+
+    def expire_answers(self, ttl_seconds: int) -> int:
+        """Remove cached answers older than `ttl_seconds`. Questions are kept as contents."""
+        query = (
+            f"UPDATE {self._item_contents_table} SET answer = NULL, answered_at = NULL "  # noqa: S608
+            "WHERE answer IS NOT NULL AND answered_at <= now() - make_interval(secs => %s)"
+        )
+        with self._pg_vector_client.cursor(commit=True) as cur:
+            cur.execute(query, (ttl_seconds,))
+            expired: int = cur.rowcount
+        return expired
+
+    def create_index(self, target: IndexTarget, params: IndexParams) -> str:
+        """Create ANN index on `embedding` column replacing the existing one.
+
+        `vector_cosine_ops` is used because similarity search orders by cosine distance `<=>`.
+        With quantization, the index is an expression index of `halfvec` (cosine) or `bit` (hamming).
+        """
+        table = self._table_of(target)
+        index_name = self._index_name_of(table)
+        logger.debug(f"DocumentsRepository.create_index(): table: {table}, params: {params}")
+
+        if params.method == IndexMethod.HNSW:
+            options = f"m = {int(params.m)}, ef_construction = {int(params.ef_construction)}"
+        elif params.method == IndexMethod.IVFFLAT:
+            options = f"lists = {int(params.lists)}"
+        else:
+            msg = f"Unknown index method: {params.method}"
+            raise ValueError(msg)
+
+        with self._pg_vector_client.cursor(commit=True) as cur:
+            cur.execute(f"DROP INDEX IF EXISTS {index_name}")
+            cur.execute(
+                f"CREATE INDEX {index_name} ON {table} "
+                f"USING {params.method.value} ({self._indexed_expression(params.quantization)}) WITH ({options})"
+            )
+        return index_name
+
+    def rebuild_index(self, target: IndexTarget) -> None:
+        """Rebuild ANN index. e.g. after bulk load changed the data distribution for IVFFlat."""
+        index_name = self._index_name_of(self._table_of(target))
+        logger.debug(f"DocumentsRepository.rebuild_index(): index: {index_name}")
+
+        with self._pg_vector_client.cursor(commit=True) as cur:
+            cur.execute(f"REINDEX INDEX {index_name}")
+
+    def drop_index(self, target: IndexTarget) -> None:
+        """Drop ANN index."""
+        index_name = self._index_name_of(self._table_of(target))
+        logger.debug(f"DocumentsRepository.drop_index(): index: {index_name}")
+
+        with self._pg_vector_client.cursor(commit=True) as cur:
+            cur.execute(f"DROP INDEX IF EXISTS {index_name}")
+
+    def get_index_size(self, target: IndexTarget) -> int:
+        """Get disk size of ANN index in bytes. 0 if the index doesn't exist."""
+        index_name = self._index_name_of(self._table_of(target))
+        with self._pg_vector_client.cursor() as cur:
+            cur.execute("SELECT COALESCE(pg_relation_size(to_regclass(%s)), 0)", (index_name,))
+            size: int = cur.fetchone()[0]
+        return size
+
+    @contextmanager
+    def scratch(self) -> Iterator["PgVectorEmbeddingRepository"]:
+        """Get a repository on empty scratch copies of the tables, dropped on exit.
+
+        The copies have the same columns, defaults and indexes (including the ANN index) as the tables,
+        and `id` is generated by an identity of their own, so ids of the tables aren't consumed.
+        Temporary tables aren't used because they are visible only to the connection which created them.
+        """
+        repo = PgVectorEmbeddingRepository(self._pg_vector_client, self._is_large_embedding, SCRATCH_SUFFIX)
+        tables = [
+            (self._embeddings_table, repo._embeddings_table),
+            (self._item_contents_table, repo._item_contents_table),
+        ]
+        logger.debug(f"DocumentsRepository.scratch(): tables: {[scratch for _, scratch in tables]}")
+        with self._pg_vector_client.cursor(commit=True) as cur:
+            for table, scratch in tables:
+                cur.execute(f"DROP TABLE IF EXISTS {scratch}")
+                cur.execute(f"CREATE TABLE {scratch} (LIKE {table} INCLUDING ALL)")
+                cur.execute(f"ALTER TABLE {scratch} ALTER COLUMN id DROP DEFAULT")
+                cur.execute(f"ALTER TABLE {scratch} ALTER COLUMN id ADD GENERATED BY DEFAULT AS IDENTITY")
+                self._rename_ann_index(cur, scratch)
+        try:
+            yield repo
+        finally:
+            with self._pg_vector_client.cursor(commit=True) as cur:
+                for _, scratch in tables:
+                    cur.execute(f"DROP TABLE IF EXISTS {scratch}")
+
+    def flush(self) -> None:
+        """Nothing to do, since each write is committed."""
 
     def close(self) -> None:
-        """Close connection."""
+        """Close all pooled connections."""
         self._pg_vector_client.close()
+
+    # --------------------------------------------------------------------------
+    # Private methods
+    # --------------------------------------------------------------------------
+
+    def _table_of(self, target: IndexTarget) -> str:
+        """Get table name of the index target."""
+        if target == IndexTarget.EMBEDDINGS:
+            return self._embeddings_table
+        return self._item_contents_table
+
+    @staticmethod
+    def _index_name_of(table: str) -> str:
+        """Get ANN index name of the table. It must be same as the one in `init.sql`."""
+        return f"{table}_embedding_idx"
+
+    def _rename_ann_index(self, cur: psycopg2.extensions.cursor, table: str) -> None:
+        """Rename the ANN index copied by `CREATE TABLE ... LIKE`, whose name is generated, to the managed one."""
+        cur.execute(
+            "SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "JOIN pg_am am ON am.oid = c.relam WHERE i.indrelid = %s::regclass AND am.amname IN ('hnsw', 'ivfflat')",
+            (table,),
+        )
+        row = cur.fetchone()
+        index_name = self._index_name_of(table)
+        if row is not None and row[0] != index_name:
+            cur.execute(f"ALTER INDEX {row[0]} RENAME TO {index_name}")
+
+    def _similarity_query(
+        self,
+        columns: str,
+        embedding: np.typing.NDArray[np.floating],
+        top_k: int,
+        search_params: SearchParams | None,
+        search_filter: SearchFilter | None,
+    ) -> tuple[str, tuple[object, ...]]:
+        """Build similarity search query with `distance` as the last column.
+
+        Filtered query follows the pattern recommended for iterative index scans:
+        rows are filtered while scanning the index inside a materialized CTE, then ordered by distance
+        again because `relaxed_order` can return slightly out of order rows.
+        The distance cutoff is applied outside so that the index is still used to order rows.
+        """
+        quantization = search_params.quantization if search_params is not None else Quantization.NONE
+        if quantization != Quantization.NONE:
+            return self._quantized_similarity_query(columns, embedding, top_k, search_params, search_filter)
+
+        where, where_parameters = self._filter_conditions(search_filter)
+        query = (
+            f"SELECT {columns}, embedding <=> %s AS distance FROM {self._item_contents_table} "  # noqa: S608
+            f"{where}ORDER BY distance LIMIT %s"
+        )
+        parameters: tuple[object, ...] = (embedding, *where_parameters, top_k)
+        if search_filter is None or search_filter.is_empty:
+            return query, parameters
+
+        query = f"WITH candidates AS MATERIALIZED ({query}) SELECT * FROM candidates "  # noqa: S608
+        if search_filter.max_distance is not None:
+            query += "WHERE distance <= %s "
+            parameters = (*parameters, search_filter.max_distance)
+        return query + "ORDER BY distance", parameters
+
+    def _quantized_similarity_query(
+        self,
+        columns: str,
+        embedding: np.typing.NDArray[np.floating],
+        top_k: int,
+        search_params: SearchParams | None,
+        search_filter: SearchFilter | None,
+    ) -> tuple[str, tuple[object, ...]]:
+        """Build similarity search query which re-ranks candidates of the quantized index.
+
+        Candidates are fetched by the quantized distance in a materialized CTE,
+        then ordered by the full precision distance of the `vector` column.
+        """
+        quantization = search_params.quantization if search_params is not None else Quantization.NONE
+        where, where_parameters = self._filter_conditions(search_filter)
+        query = (
+            f"WITH candidates AS MATERIALIZED (SELECT {columns}, embedding FROM {self._item_contents_table} "  # noqa: S608
+            f"{where}ORDER BY {self._quantized_distance(quantization, '%s::vector')} LIMIT %s) "
+            f"SELECT * FROM (SELECT {columns}, embedding <=> %s AS distance FROM candidates) AS reranked "
+        )
+        parameters: tuple[object, ...] = (
+            *where_parameters,
+            embedding,
+            self._rerank_candidates(search_params, top_k),
+            embedding,
+        )
+        if search_filter is not None and search_filter.max_distance is not None:
+            query += "WHERE distance <= %s "
+            parameters = (*parameters, search_filter.max_distance)
+        return query + "ORDER BY distance LIMIT %s", (*parameters, top_k)
+
+    def _indexed_expression(self, quantization: Quantization) -> str:
+        """Get indexed expression and operator class. It must match `_quantized_distance()`."""
+        if quantization == Quantization.HALFVEC:
+            return f"(embedding::halfvec({self._dimensions})) halfvec_cosine_ops"
+        if quantization == Quantization.BIT:
+            return f"(binary_quantize(embedding)::bit({self._dimensions})) bit_hamming_ops"
+        return "embedding vector_cosine_ops"
+
+    def _quantized_distance(self, quantization: Quantization, query_vector: str) -> str:
+        """Get distance expression answered by the quantized index. `query_vector` is a SQL expression of `vector`."""
+        if quantization == Quantization.HALFVEC:
+            return f"embedding::halfvec({self._dimensions}) <=> {query_vector}::halfvec({self._dimensions})"
+        if quantization == Quantization.BIT:
+            return f"binary_quantize(embedding)::bit({self._dimensions}) <~> binary_quantize({query_vector})"
+        return f"embedding <=> {query_vector}"
+
+    @staticmethod
+    def _rerank_candidates(search_params: SearchParams | None, top_k: int) -> int:
+        """Number of candidates re-ranked by full precision distance."""
+        candidates = search_params.rerank_candidates if search_params is not None else None
+        return max(candidates or top_k * RERANK_FACTOR, top_k)
+
+    @staticmethod
+    def _filter_conditions(search_filter: SearchFilter | None) -> tuple[str, list[object]]:
+        """Build `WHERE` clause of metadata containment and id exclusion."""
+        if search_filter is None:
+            return "", []
+        conditions: list[str] = []
+        parameters: list[object] = []
+        if search_filter.metadata:
+            # `@>` can be answered by GIN index `jsonb_path_ops`
+            conditions.append("metadata @> %s")
+            parameters.append(Json(search_filter.metadata))
+        if search_filter.exclude_ids:
+            conditions.append("id <> ALL(%s)")
+            parameters.append(search_filter.exclude_ids)
+        if not conditions:
+            return "", []
+        return f"WHERE {' AND '.join(conditions)} ", parameters
+
+    def _effective_search_params(
+        self, search_params: SearchParams | None, search_filter: SearchFilter | None, top_k: int
+    ) -> SearchParams | None:
+        """Complete query time parameters.
+
+        - Enable iterative index scan for filtered search unless it's given explicitly.
+          Without it, HNSW returns at most `ef_search` candidates before filtering, which may leave too few rows.
+        - Raise `ef_search` to the number of re-ranked candidates for quantized search for the same reason.
+        """
+        if search_filter is not None and not search_filter.is_empty and self._supports_iterative_scan():
+            search_params = search_params or SearchParams()
+            if search_params.iterative_scan is None:
+                search_params = replace(search_params, iterative_scan=IterativeScan.RELAXED_ORDER)
+        if search_params is not None and search_params.quantization != Quantization.NONE:
+            candidates = self._rerank_candidates(search_params, top_k)
+            if search_params.ef_search is None and candidates > DEFAULT_EF_SEARCH:
+                search_params = replace(search_params, ef_search=candidates)
+        return search_params
+
+    def _supports_iterative_scan(self) -> bool:
+        """Check pgvector is 0.8.0 or later once. Older versions reject `*.iterative_scan` parameters."""
+        if self._iterative_scan_supported is None:
+            with self._pg_vector_client.cursor() as cur:
+                cur.execute("SELECT extversion FROM pg_extension WHERE extname = 'vector'")
+                row = cur.fetchone()
+            version = tuple(int(part) for part in row[0].split(".")[:2]) if row else (0, 0)
+            self._iterative_scan_supported = version >= ITERATIVE_SCAN_MIN_VERSION
+            if not self._iterative_scan_supported:
+                logger.warning(f"pgvector {row[0] if row else '-'} doesn't support iterative index scans")
+        return self._iterative_scan_supported
+
+    @staticmethod
+    def _metadata_list(metadata: list[dict[str, Any]] | None, size: int) -> list[dict[str, Any]]:
+        """Fill empty metadata, and check its length."""
+        if metadata is None:
+            return [{} for _ in range(size)]
+        if len(metadata) != size:
+            msg = "`metadata` must have the same length as `contents`"
+            raise ValueError(msg)
+        return metadata
+
+    def _search(
+        self,
+        query: str,
+        parameters: tuple[object, ...],
+        search_params: SearchParams | None,
+    ) -> list[tuple[Any, ...]]:
+        """Execute search query within a transaction applying query time parameters.
+
+        `SET LOCAL` is only effective until the end of the transaction.
+        """
+        # transaction is rolled back when leaving the context, which resets `SET LOCAL` parameters
+        with self._pg_vector_client.cursor() as cur:
+            if search_params is not None:
+                self._apply_search_params(cur, search_params)
+            cur.execute(query, parameters)
+            items: list[tuple[Any, ...]] = cur.fetchall()
+        return items
+
+    @staticmethod
+    def _apply_search_params(cur: psycopg2.extensions.cursor, search_params: SearchParams) -> None:
+        """Apply query time parameters of ANN index."""
+        if search_params.exact:
+            cur.execute("SET LOCAL enable_indexscan = off")
+        if search_params.ef_search is not None:
+            cur.execute("SET LOCAL hnsw.ef_search = %s", (search_params.ef_search,))
+        if search_params.probes is not None:
+            cur.execute("SET LOCAL ivfflat.probes = %s", (search_params.probes,))
+        if search_params.iterative_scan is not None:
+            # IVFFlat doesn't support `strict_order`, its results are ordered again by the query anyway
+            ivfflat_scan = (
+                IterativeScan.RELAXED_ORDER
+                if search_params.iterative_scan == IterativeScan.STRICT_ORDER
+                else search_params.iterative_scan
+            )
+            cur.execute("SET LOCAL hnsw.iterative_scan = %s", (search_params.iterative_scan.value,))
+            cur.execute("SET LOCAL ivfflat.iterative_scan = %s", (ivfflat_scan.value,))
+
+    @staticmethod
+    def _to_vector(embedding: Embedding) -> np.typing.NDArray[np.float32]:
+        """Convert embedding to float32 array adapted by `register_vector`."""
+        return np.asarray(embedding.embedding, dtype=np.float32)
+
+    def _insert_bulk(
+        self,
+        table: str,
+        columns: list[str],
+        column_types: list[CopyColumnType],
+        rows: list[tuple[CopyValue, ...]],
+        batch_size: int,
+        method: BulkInsertMethod,
+    ) -> list[int]:
+        """Insert rows committing once per batch and return inserted ids in input order."""
+        if batch_size <= 0:
+            msg = "`batch_size` must be positive"
+            raise ValueError(msg)
+
+        if method not in (BulkInsertMethod.COPY, BulkInsertMethod.EXECUTE_VALUES):
+            msg = f"Unknown bulk insert method: {method}"
+            raise ValueError(msg)
+
+        ids: list[int] = []
+        with self._pg_vector_client.connection() as conn, conn.cursor() as cur:
+            for start in range(0, len(rows), batch_size):
+                batch = rows[start : start + batch_size]
+                try:
+                    if method == BulkInsertMethod.COPY:
+                        ids.extend(self._copy_batch(cur, table, columns, column_types, batch))
+                    else:
+                        ids.extend(self._execute_values_batch(cur, table, columns, batch))
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+        return ids
+
+    @staticmethod
+    def _copy_batch(
+        cur: psycopg2.extensions.cursor,
+        table: str,
+        columns: list[str],
+        column_types: list[CopyColumnType],
+        batch: list[tuple[CopyValue, ...]],
+    ) -> list[int]:
+        """Stream a batch through `COPY ... FROM STDIN (FORMAT BINARY)`.
+
+        COPY can't return generated values, so ids are reserved from the sequence beforehand.
+        """
+        cur.execute(
+            "SELECT nextval(pg_get_serial_sequence(%s, 'id')) FROM generate_series(1, %s)",
+            (table, len(batch)),
+        )
+        ids = [int(row[0]) for row in cur.fetchall()]
+
+        payload = encode_copy_binary(column_types, ((row_id, *row) for row_id, row in zip(ids, batch, strict=True)))
+        query = f"COPY {table} (id, {', '.join(columns)}) FROM STDIN WITH (FORMAT BINARY)"
+        cur.copy_expert(query, io.BytesIO(payload))
+        return ids
+
+    @staticmethod
+    def _execute_values_batch(
+        cur: psycopg2.extensions.cursor,
+        table: str,
+        columns: list[str],
+        batch: list[tuple[CopyValue, ...]],
+    ) -> list[int]:
+        """Insert a batch by multi-row `INSERT ... VALUES` pages."""
+        query = f"INSERT INTO {table} ({', '.join(columns)}) VALUES %s RETURNING id"  # noqa: S608
+        result = execute_values(cur, query, batch, page_size=len(batch), fetch=True)
+        return [int(row[0]) for row in result]
+
+    def _delete_by_ids(self, table: str, ids: list[int]) -> None:
+        """Delete records by ids."""
+        if not ids:
+            return
+        with self._pg_vector_client.cursor(commit=True) as cur:
+            cur.execute(f"DELETE FROM {table} WHERE id = ANY(%s)", (ids,))  # noqa: S608
@@ -1,31 +1,191 @@
 """Interface module for OpenAIClient."""
 
 from abc import ABC, abstractmethod
+from contextlib import AbstractContextManager
+from enum import Enum
+from typing import Any
 
 import numpy as np
 
 from entities.embedding.types import Embedding, EmbeddingItem
+from entities.vector_index.types import (
+    CachedAnswer,
+    IndexParams,
+    IndexTarget,
+    SearchFilter,
+    SearchParams,
+    SimilarityResult,
+)
+
+
+class BulkInsertMethod(Enum):
+    """Bulk insert method."""
+
+    COPY = "copy"
+    EXECUTE_VALUES = "execute_values"
+
+    @classmethod
+    def from_str(cls, method_str: str) -> "BulkInsertMethod":
+        """Change string to BulkInsertMethod."""
+        for method in cls:
+            if method.value == method_str:
+                return method
+        msg = f"'{method_str}' is not a valid BulkInsertMethod"
+        raise ValueError(msg)
 
 
 class EmbeddingRepositoryInterface(ABC):
     """Interface for DocumentsRepository."""
 
     @abstractmethod
-    def insert_embeddings(self, data: list[Embedding]) -> None:
+    def insert_embeddings(self, data: list[Embedding]) -> list[int]:
         """Execute insert."""
 
     @abstractmethod
-    def insert_item_contents(self, contents: list[str], embeddings: list[Embedding]) -> None:
+    def insert_item_contents(
+        self, contents: list[str], embeddings: list[Embedding], metadata: list[dict[str, Any]] | None = None
+    ) -> list[int]:
         """Execute insert."""
 
+    @abstractmethod
+    def insert_embeddings_bulk(
+        self, data: list[Embedding], batch_size: int, method: BulkInsertMethod = BulkInsertMethod.COPY
+    ) -> list[int]:
+        """Execute bulk insert committing once per batch."""
+
+    @abstractmethod
+    def insert_item_contents_bulk(
+        self,
+        contents: list[str],
+        embeddings: list[Embedding],
+        batch_size: int,
+        method: BulkInsertMethod = BulkInsertMethod.COPY,
+        metadata: list[dict[str, Any]] | None = None,
+    ) -> list[int]:
+        """Execute bulk insert committing once per batch."""
+
+    @abstractmethod
+    def delete_embeddings(self, ids: list[int]) -> None:
+        """Delete embeddings by ids."""
+
+    @abstractmethod
+    def delete_item_contents(self, ids: list[int]) -> None:
+        """Delete item contents by ids."""
+
     @abstractmethod
     def get_item_by_id(self, item_id: int) -> EmbeddingItem | None:
         """Get content and embedding by id."""
 
     @abstractmethod
-    def similarity_search(self, embedding: np.typing.NDArray[np.float64], top_k: int) -> list[str] | None:
-        """Execute similarity search."""
+    def get_items_by_ids(self, item_ids: list[int]) -> dict[int, EmbeddingItem]:
+        """Get contents and embeddings by ids. Missing ids are omitted."""
+
+    @abstractmethod
+    def similarity_search(
+        self,
+        embedding: np.typing.NDArray[np.floating],
+        top_k: int,
+        search_params: SearchParams | None = None,
+        search_filter: SearchFilter | None = None,
+    ) -> list[SimilarityResult]:
+        """Execute similarity search and return rows ordered by distance."""
+
+    @abstractmethod
+    def similarity_search_ids(
+        self,
+        embedding: np.typing.NDArray[np.floating],
+        top_k: int,
+        search_params: SearchParams | None = None,
+        search_filter: SearchFilter | None = None,
+    ) -> list[int]:
+        """Execute similarity search and return ids of `item_contents`."""
+
+    @abstractmethod
+    def similarity_search_many(
+        self,
+        embeddings: list[np.typing.NDArray[np.floating]],
+        top_k: int,
+        search_params: SearchParams | None = None,
+        search_filter: SearchFilter | None = None,
+    ) -> list[list[SimilarityResult]]:
+        """Execute similarity search of many queries at once and return results per query in the same order."""
+
+    @abstractmethod
+    def save_answer(self, item_id: int, answer: str) -> None:
+        """Cache the answer of the question in `item_contents`."""
+
+    @abstractmethod
+    def find_answer(
+        self, embedding: np.typing.NDArray[np.floating], max_distance: float, ttl_seconds: int = 0
+    ) -> CachedAnswer | None:
+        """Find the cached answer of the most similar question within `max_distance` and `ttl_seconds`.
+
+        `ttl_seconds` of 0 means answers never expire.
+        """
+
+    @abstractmethod
+    def expire_answers(self, ttl_seconds: int) -> int:
+        """Remove cached answers older than `ttl_seconds`, and return the number of them."""
+
+    @abstractmethod
+    def create_index(self, target: IndexTarget, params: IndexParams) -> str:
+        """Create ANN index replacing the existing one, and return the index name."""
+
+    @abstractmethod
+    def rebuild_index(self, target: IndexTarget) -> None:
+        """Rebuild ANN index."""
+
+    @abstractmethod
+    def drop_index(self, target: IndexTarget) -> None:
+        """Drop ANN index."""
+
+    @abstractmethod
+    def get_index_size(self, target: IndexTarget) -> int:
+        """Get size of ANN index in bytes."""
+
+    @abstractmethod
+    def scratch(self) -> AbstractContextManager["EmbeddingRepositoryInterface"]:
+        """Get a repository on empty scratch tables with the same columns and indexes, dropped on exit.
+
+        Benchmarks replace indexes and insert rows there without touching the data and indexes in use.
+        """
+
+    @abstractmethod
+    def flush(self) -> None:
+        """Persist written data. Nothing to do when each write is persisted."""
 
     @abstractmethod
     def close(self) -> None:
         """Close connection."""
+
+
+class AsyncEmbeddingRepositoryInterface(ABC):
+    """Async interface for DocumentsRepository."""
+
+    @abstractmethod
+    async def open(self) -> None:
+        """Open connection."""
+
+    @abstractmethod
+    async def insert_embeddings_bulk(self, data: list[Embedding], batch_size: int) -> list[int]:
+        """Execute bulk insert committing once per batch."""
+
+    @abstractmethod
+    async def insert_item_contents_bulk(
+        self, contents: list[str], embeddings: list[Embedding], batch_size: int
+    ) -> list[int]:
+        """Execute bulk insert committing once per batch."""
+
+    @abstractmethod
+    async def get_item_by_id(self, item_id: int) -> EmbeddingItem | None:
+        """Get content and embedding by id."""
+
+    @abstractmethod
+    async def similarity_search(
+        self, embedding: np.typing.NDArray[np.floating], top_k: int, search_params: SearchParams | None = None
+    ) -> list[SimilarityResult]:
+        """Execute similarity search and return rows ordered by cosine distance."""
+
+    @abstractmethod
+    async def close(self) -> None:
+        """Close connection."""
@@ -0,0 +1,389 @@
+"""In-memory Embedding repository class."""
+
+import json
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+from loguru import logger
+
+from entities.embedding.types import Embedding, EmbeddingBatch, EmbeddingItem
+from entities.vector_index.types import (
+    CachedAnswer,
+    IndexParams,
+    IndexTarget,
+    Quantization,
+    SearchFilter,
+    SearchParams,
+    SimilarityResult,
+)
+from infrastructure.repository.interface import BulkInsertMethod, EmbeddingRepositoryInterface
+from infrastructure.vectordb.memory.index import InMemoryVectorIndex
+
+# growth of candidates per round of filtered search, like iterative index scan of pgvector
+FILTER_SCAN_GROWTH = 4
+
+
+class InMemoryEmbeddingRepository(EmbeddingRepositoryInterface):
+    """In-memory Documents repository class.
+
+    Zero-infrastructure backend with the same behavior as `PgVectorEmbeddingRepository`.
+    When `persist_dir` is given, data is loaded from it on initialization and saved on `flush()`.
+    """
+
+    def __init__(self, dimensions: int, is_large_embedding: bool, persist_dir: str | None = None) -> None:
+        """Initialize In-memory Documents repository class."""
+        self._persist_dir = persist_dir
+        self._dimensions = dimensions
+        self._is_large_embedding = is_large_embedding
+        self._embeddings_table = "embeddings_large" if is_large_embedding else "embeddings"
+        self._item_contents_table = "item_contents_large" if is_large_embedding else "item_contents"
+        self._lock = threading.Lock()
+        self._embeddings = self._load_index(self._embeddings_table, dimensions)
+        self._item_contents = self._load_index(self._item_contents_table, dimensions)
+        self._contents: dict[int, str] = self._load_contents()
+        self._metadata: dict[int, dict[str, Any]] = self._load_metadata()
+        # answer and its unix time of the semantic response cache
+        self._answers: dict[int, tuple[str, float]] = self._load_answers()
+
+    def insert_embeddings(self, data: list[Embedding]) -> list[int]:
+        """Insert embeddings data into `embeddings` table."""
+        logger.debug("InMemoryDocumentsRepository.insert_embeddings()")
+
+        if not data:
+            return []
+        with self._lock:
+            return self._embeddings.add(EmbeddingBatch.from_embeddings(data).vectors)
+
+    def insert_item_contents(
+        self, contents: list[str], embeddings: list[Embedding], metadata: list[dict[str, Any]] | None = None
+    ) -> list[int]:
+        """Insert content, embedding and metadata into `item_contents` table."""
+        logger.debug("InMemoryDocumentsRepository.insert_item_contents()")
+
+        if len(contents) != len(embeddings):
+            msg = "`contents` and `embeddings` must have the same length"
+            raise ValueError(msg)
+        if metadata is not None and len(metadata) != len(contents):
+            msg = "`metadata` must have the same length as `contents`"
+            raise ValueError(msg)
+        if not contents:
+            return []
+        with self._lock:
+            ids = self._item_contents.add(EmbeddingBatch.from_embeddings(embeddings).vectors)
+            self._contents.update(zip(ids, contents, strict=True))
+            if metadata is not None:
+                self._metadata.update(
+                    (item_id, item_metadata)
+                    for item_id, item_metadata in zip(ids, metadata, strict=True)
+                    if item_metadata
+                )
+        return ids
+
+    def insert_embeddings_bulk(
+        self,
+        data: list[Embedding],
+        batch_size: int = 1000,
+        method: BulkInsertMethod = BulkInsertMethod.COPY,  # noqa: ARG002
+    ) -> list[int]:
+        """Insert embeddings data by batches. `method` is ignored."""
+        ids: list[int] = []
+        for start in range(0, len(data), batch_size):
+            ids.extend(self.insert_embeddings(data[start : start + batch_size]))
+        return ids
+
+    def insert_item_contents_bulk(
+        self,
+        contents: list[str],
+        embeddings: list[Embedding],
+        batch_size: int = 1000,
+        method: BulkInsertMethod = BulkInsertMethod.COPY,  # noqa: ARG002
+        metadata: list[dict[str, Any]] | None = None,
+    ) -> list[int]:
+        """Insert content, embedding and metadata by batches. `method` is ignored."""
+        if len(contents) != len(embeddings):
+            msg = "`contents` and `embeddings` must have the same length"
+            raise ValueError(msg)
+
+        ids: list[int] = []
+        for start in range(0, len(contents), batch_size):
+            end = start + batch_size
+            batch_metadata = metadata[start:end] if metadata is not None else None
+            ids.extend(self.insert_item_contents(contents[start:end], embeddings[start:end], batch_metadata))
+        return ids
+
+    def delete_embeddings(self, ids: list[int]) -> None:
+        """Delete embeddings by ids."""
+        with self._lock:
+            self._embeddings.delete(ids)
+
+    def delete_item_contents(self, ids: list[int]) -> None:
+        """Delete item contents by ids."""
+        with self._lock:
+            self._item_contents.delete(ids)
+            for item_id in ids:
+                self._contents.pop(item_id, None)
+                self._metadata.pop(item_id, None)
+                self._answers.pop(item_id, None)
+
+    def get_item_by_id(self, item_id: int) -> EmbeddingItem | None:
+        """Get a record by id from `item_contents` table."""
+        logger.debug("InMemoryDocumentsRepository.get_item_by_id()")
+
+        with self._lock:
+            embedding = self._item_contents.get(item_id)
+            if embedding is None:
+                return None
+            return EmbeddingItem(question=self._contents[item_id], embedding=embedding)
+
+    def get_items_by_ids(self, item_ids: list[int]) -> dict[int, EmbeddingItem]:
+        """Get records by ids from `item_contents` table."""
+        items: dict[int, EmbeddingItem] = {}
+        with self._lock:
+            for item_id in item_ids:
+                embedding = self._item_contents.get(item_id)
+                if embedding is not None:
+                    items[item_id] = EmbeddingItem(question=self._contents[item_id], embedding=embedding)
+        return items
+
+    def similarity_search(
+        self,
+        embedding: np.typing.NDArray[np.floating],
+        top_k: int = 5,
+        search_params: SearchParams | None = None,
+        search_filter: SearchFilter | None = None,
+    ) -> list[SimilarityResult]:
+        """Execute similarity search."""
+        return self.similarity_search_many([embedding], top_k, search_params, search_filter)[0]
+
+    def similarity_search_ids(
+        self,
+        embedding: np.typing.NDArray[np.floating],
+        top_k: int = 5,
+        search_params: SearchParams | None = None,
+        search_filter: SearchFilter | None = None,
+    ) -> list[int]:
+        """Execute similarity search and return ids of `item_contents` table."""
+        with self._lock:
+            hits = self._search_many(np.asarray(embedding).reshape(1, -1), top_k, search_params, search_filter)
+        return [item_id for item_id, _ in hits[0]]
+
+    def similarity_search_many(
+        self,
+        embeddings: list[np.typing.NDArray[np.floating]],
+        top_k: int = 5,
+        search_params: SearchParams | None = None,
+        search_filter: SearchFilter | None = None,
+    ) -> list[list[SimilarityResult]]:
+        """Execute similarity search of many queries at once."""
+        if not embeddings:
+            return []
+        with self._lock:
+            hits = self._search_many(np.stack(embeddings), top_k, search_params, search_filter)
+            return [
+                [
+                    SimilarityResult(id=item_id, content=self._contents[item_id], distance=distance)
+                    for item_id, distance in query_hits
+                ]
+                for query_hits in hits
+            ]
+
+    def save_answer(self, item_id: int, answer: str) -> None:
+        """Cache the answer of the question in `item_contents`."""
+        with self._lock:
+            if item_id in self._contents:
+                self._answers[item_id] = (answer, time.time())
+
+    def find_answer(
+        self, embedding: np.typing.NDArray[np.floating], max_distance: float, ttl_seconds: int = 0
+    ) -> CachedAnswer | None:
+        """Find the cached answer of the most similar question by exact search over answered questions."""
+        with self._lock:
+            since = time.time() - ttl_seconds if ttl_seconds > 0 else -np.inf
+            candidates = [
+                (item_id, vector)
+                for item_id, (_, answered_at) in self._answers.items()
+                if answered_at > since and (vector := self._item_contents.get(item_id)) is not None
+            ]
+            if not candidates:
+                return None
+            ids = [item_id for item_id, _ in candidates]
+            vectors = np.stack([vector for _, vector in candidates])
+            query = np.asarray(embedding, dtype=np.float32)
+            norms = np.linalg.norm(vectors, axis=1) * np.linalg.norm(query)
+            distances = 1.0 - (vectors @ query) / np.where(norms > 0, norms, 1.0)
+            best = int(np.argmin(distances))
+            if distances[best] > max_distance:
+                return None
+            item_id = ids[best]
+            return CachedAnswer(
+                id=item_id,
+                content=self._contents[item_id],
+                answer=self._answers[item_id][0],
+                distance=float(distances[best]),
+                metadata=self._metadata.get(item_id, {}),
+            )
+
+    def expire_answers(self, ttl_seconds: int) -> int:
+        """Remove cached answers older than `ttl_seconds`. Questions are kept as contents."""
+        with self._lock:
+            since = time.time() - ttl_seconds
+            expired = [item_id for item_id, (_, answered_at) in self._answers.items() if answered_at <= since]
+            for item_id in expired:
+                del self._answers[item_id]
+        return len(expired)
+
+    def create_index(self, target: IndexTarget, params: IndexParams) -> str:
+        """Create ANN index replacing the existing one. Quantization isn't supported."""
+        logger.debug(f"InMemoryDocumentsRepository.create_index(): target: {target.value}, params: {params}")
+        if params.quantization != Quantization.NONE:
+            msg = "quantized index is only supported by pgvector"
+            raise ValueError(msg)
+        with self._lock:
+            self._index_of(target).build_index(params)
+        return f"{self._table_of(target)}_embedding_idx"
+
+    def rebuild_index(self, target: IndexTarget) -> None:
+        """Rebuild ANN index."""
+        with self._lock:
+            self._index_of(target).rebuild_index()
+
+    def drop_index(self, target: IndexTarget) -> None:
+        """Drop ANN index."""
+        with self._lock:
+            self._index_of(target).drop_index()
+
+    def get_index_size(self, target: IndexTarget) -> int:
+        """Get memory size of ANN index in bytes. Vectors are included because exact search uses them."""
+        with self._lock:
+            return self._index_of(target).nbytes
+
+    @contextmanager
+    def scratch(self) -> Iterator["InMemoryEmbeddingRepository"]:
+        """Get an empty repository which isn't persisted."""
+        yield InMemoryEmbeddingRepository(self._dimensions, self._is_large_embedding)
+
+    def flush(self) -> None:
+        """Save data into `persist_dir` if it's given."""
+        if self._persist_dir is None:
+            return
+        with self._lock:
+            self._embeddings.save(self._persist_dir, self._embeddings_table)
+            self._item_contents.save(self._persist_dir, self._item_contents_table)
+            contents_path = Path(self._persist_dir) / f"{self._item_contents_table}_contents.json"
+            contents_path.write_text(json.dumps(self._contents, ensure_ascii=False))
+            metadata_path = Path(self._persist_dir) / f"{self._item_contents_table}_metadata.json"
+            metadata_path.write_text(json.dumps(self._metadata, ensure_ascii=False))
+            answers_path = Path(self._persist_dir) / f"{self._item_contents_table}_answers.json"
+            answers_path.write_text(json.dumps(self._answers, ensure_ascii=False))
+        logger.debug(f"saved in-memory repository: {self._persist_dir}")
+
+    def close(self) -> None:
+        """Nothing to close. Data is saved by `flush()`."""
+
+    # --------------------------------------------------------------------------
+    # Private methods
+    # --------------------------------------------------------------------------
+
+    def _table_of(self, target: IndexTarget) -> str:
+        """Get table name of the index target."""
+        if target == IndexTarget.EMBEDDINGS:
+            return self._embeddings_table
+        return self._item_contents_table
+
+    def _index_of(self, target: IndexTarget) -> InMemoryVectorIndex:
+        """Get vector index of the index target."""
+        if target == IndexTarget.EMBEDDINGS:
+            return self._embeddings
+        return self._item_contents
+
+    def _search_many(
+        self,
+        queries: np.typing.NDArray[np.floating],
+        top_k: int,
+        search_params: SearchParams | None,
+        search_filter: SearchFilter | None,
+    ) -> list[list[tuple[int, float]]]:
+        """Search `item_contents` applying filters.
+
+        Like iterative index scan, more candidates are fetched until every query has `top_k` rows passing filters,
+        its candidates exceed `max_distance`, or all rows are scanned.
+        """
+        if search_filter is None or search_filter.is_empty:
+            return self._item_contents.search_many(queries, top_k, search_params)
+
+        exclude_ids = set(search_filter.exclude_ids)
+        max_distance = search_filter.max_distance if search_filter.max_distance is not None else np.inf
+        k = top_k + len(exclude_ids)
+        while True:
+            hits = self._item_contents.search_many(queries, k, search_params)
+            results = [
+                [
+                    (item_id, distance)
+                    for item_id, distance in query_hits
+                    if item_id not in exclude_ids
+                    and distance <= max_distance
+                    and _json_contains(self._metadata.get(item_id, {}), search_filter.metadata or {})
+                ][:top_k]
+                for query_hits in hits
+            ]
+            scanned_all = k >= len(self._item_contents)
+            if scanned_all or all(
+                len(result) >= top_k or (query_hits and query_hits[-1][1] > max_distance)
+                for result, query_hits in zip(results, hits, strict=True)
+            ):
+                return results
+            k *= FILTER_SCAN_GROWTH
+
+    def _load_index(self, table: str, dimensions: int) -> InMemoryVectorIndex:
+        """Load saved vector index, or create an empty one."""
+        if self._persist_dir is not None and (Path(self._persist_dir) / f"{table}_meta.json").exists():
+            return InMemoryVectorIndex.load(self._persist_dir, table)
+        return InMemoryVectorIndex(dimensions)
+
+    def _load_contents(self) -> dict[int, str]:
+        """Load saved contents of `item_contents`."""
+        if self._persist_dir is None:
+            return {}
+        contents_path = Path(self._persist_dir) / f"{self._item_contents_table}_contents.json"
+        if not contents_path.exists():
+            return {}
+        return {int(item_id): content for item_id, content in json.loads(contents_path.read_text()).items()}
+
+    def _load_metadata(self) -> dict[int, dict[str, Any]]:
+        """Load saved metadata of `item_contents`. Empty metadata isn't stored."""
+        if self._persist_dir is None:
+            return {}
+        metadata_path = Path(self._persist_dir) / f"{self._item_contents_table}_metadata.json"
+        if not metadata_path.exists():
+            return {}
+        return {int(item_id): item_metadata for item_id, item_metadata in json.loads(metadata_path.read_text()).items()}
+
+    def _load_answers(self) -> dict[int, tuple[str, float]]:
+        """Load saved answers of `item_contents`."""
+        if self._persist_dir is None:
+            return {}
+        answers_path = Path(self._persist_dir) / f"{self._item_contents_table}_answers.json"
+        if not answers_path.exists():
+            return {}
+        return {
+            int(item_id): (answer, float(answered_at))
+            for item_id, (answer, answered_at) in json.loads(answers_path.read_text()).items()
+        }
+
+
+def _json_contains(document: object, subset: object) -> bool:
+    """Same semantics as JSONB containment `document @> subset`."""
+    if isinstance(subset, dict):
+        return isinstance(document, dict) and all(
+            key in document and _json_contains(document[key], value) for key, value in subset.items()
+        )
+    if isinstance(subset, list):
+        # every element of `subset` must be contained by some element of `document`
+        document_list = document if isinstance(document, list) else [document]
+        return all(any(_json_contains(element, value) for element in document_list) for value in subset)
+    return document == subset
@@ -0,0 +1,337 @@
+"""In-process vector index module class."""
+
+import json
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+from loguru import logger
+
+from entities.vector_index.types import IndexMethod, IndexParams, SearchParams
+
+# same defaults as pgvector
+DEFAULT_EF_SEARCH = 40
+DEFAULT_PROBES = 1
+
+KMEANS_ITERATIONS = 10
+KMEANS_MAX_SAMPLES = 50_000
+INITIAL_CAPACITY = 1024
+# queries scored by one matrix product, `QUERY_BLOCK_SIZE x rows` float32 similarities are allocated
+QUERY_BLOCK_SIZE = 64
+
+
+class InMemoryVectorIndex:
+    """In-process cosine vector index.
+
+    Vectors are kept L2 normalized in a contiguous float32 matrix with their norms,
+    so that cosine similarity of all rows is a single matrix-vector product.
+    Exact search is the default. IVF (k-means in NumPy) or HNSW (requires `hnswlib`) can be built on top.
+    Deleted rows are masked until the next `save()`.
+    """
+
+    def __init__(self, dimensions: int) -> None:
+        """Initialize InMemoryVectorIndex."""
+        if dimensions <= 0:
+            msg = "`dimensions` must be positive"
+            raise ValueError(msg)
+
+        self._dimensions = dimensions
+        self._vectors: np.typing.NDArray[np.float32] = np.empty((0, dimensions), dtype=np.float32)
+        self._norms: np.typing.NDArray[np.float32] = np.empty(0, dtype=np.float32)
+        self._ids: np.typing.NDArray[np.int64] = np.empty(0, dtype=np.int64)
+        self._alive: np.typing.NDArray[np.bool_] = np.empty(0, dtype=np.bool_)
+        self._size = 0
+        self._next_id = 1
+        self._row_of: dict[int, int] = {}
+        # ANN index
+        self._index_params: IndexParams | None = None
+        self._centroids: np.typing.NDArray[np.float32] | None = None
+        self._assignments: np.typing.NDArray[np.int32] = np.empty(0, dtype=np.int32)
+        self._hnsw: Any = None
+
+    @property
+    def dimensions(self) -> int:
+        """Number of dimensions."""
+        return self._dimensions
+
+    @property
+    def nbytes(self) -> int:
+        """Memory size of vectors and ANN index. HNSW graph is estimated by `hnswlib` parameters."""
+        size = self._vectors[: self._size].nbytes + self._norms[: self._size].nbytes
+        if self._centroids is not None:
+            size += self._centroids.nbytes + self._assignments[: self._size].nbytes
+        if self._hnsw is not None:
+            # level 0 links: 2 * M int32 per element
+            size += self._size * 2 * int(self._hnsw.M) * 4
+        return int(size)
+
+    def __len__(self) -> int:
+        """Number of alive vectors."""
+        return len(self._row_of)
+
+    def add(self, vectors: np.typing.NDArray[np.floating]) -> list[int]:
+        """Add vectors and return their ids. Ids are sequential like `serial` columns."""
+        matrix = np.asarray(vectors, dtype=np.float32).reshape(-1, self._dimensions)
+        count = len(matrix)
+        if count == 0:
+            return []
+
+        self._reserve(self._size + count)
+        start, end = self._size, self._size + count
+        norms = np.linalg.norm(matrix, axis=1)
+        self._vectors[start:end] = matrix / np.maximum(norms, np.finfo(np.float32).tiny)[:, None]
+        self._norms[start:end] = norms
+        ids = np.arange(self._next_id, self._next_id + count, dtype=np.int64)
+        self._ids[start:end] = ids
+        self._alive[start:end] = True
+        self._row_of.update(zip(ids.tolist(), range(start, end), strict=True))
+        self._size = end
+        self._next_id += count
+
+        if self._centroids is not None:
+            self._assignments[start:end] = self._nearest_centroids(self._vectors[start:end])
+        if self._hnsw is not None:
+            self._hnsw_add(start, end)
+        return ids.tolist()
+
+    def delete(self, ids: list[int]) -> None:
+        """Delete vectors by ids."""
+        for vector_id in ids:
+            row = self._row_of.pop(vector_id, None)
+            if row is None:
+                continue
+            self._alive[row] = False
+            if self._hnsw is not None:
+                self._hnsw.mark_deleted(row)
+
+    def get(self, vector_id: int) -> np.typing.NDArray[np.float32] | None:
+        """Get the original (not normalized) vector by id."""
+        row = self._row_of.get(vector_id)
+        if row is None:
+            return None
+        vector: np.typing.NDArray[np.float32] = self._vectors[row] * self._norms[row]
+        return vector
+
+    def search(
+        self, query: np.typing.NDArray[np.floating], top_k: int, search_params: SearchParams | None = None
+    ) -> list[tuple[int, float]]:
+        """Search nearest vectors and return `(id, cosine distance)` ordered by distance."""
+        return self.search_many(np.asarray(query).reshape(1, self._dimensions), top_k, search_params)[0]
+
+    def search_many(
+        self, queries: np.typing.NDArray[np.floating], top_k: int, search_params: SearchParams | None = None
+    ) -> list[list[tuple[int, float]]]:
+        """Search nearest vectors of each query row and return `(id, cosine distance)` per query.
+
+        Exact search scores a block of queries by one matrix-matrix product.
+        """
+        query_vectors = np.asarray(queries, dtype=np.float32).reshape(-1, self._dimensions)
+        if top_k <= 0 or not self._row_of:
+            return [[] for _ in range(len(query_vectors))]
+        norms = np.maximum(np.linalg.norm(query_vectors, axis=1, keepdims=True), np.finfo(np.float32).tiny)
+        query_vectors = query_vectors / norms
+        k = min(top_k, len(self._row_of))
+
+        exact = search_params is not None and search_params.exact
+        hits: list[tuple[np.typing.NDArray[np.intp], np.typing.NDArray[np.float32]]] = []
+        if self._hnsw is not None and not exact:
+            hits = self._search_hnsw(query_vectors, k, search_params)
+        elif self._centroids is not None and not exact:
+            hits = [self._search_ivf(query_vector, k, search_params) for query_vector in query_vectors]
+        else:
+            alive = self._alive[: self._size]
+            for start in range(0, len(query_vectors), QUERY_BLOCK_SIZE):
+                block_similarities = query_vectors[start : start + QUERY_BLOCK_SIZE] @ self._vectors[: self._size].T
+                block_similarities[:, ~alive] = -np.inf
+                hits.extend(self._top_k(similarities, k) for similarities in block_similarities)
+        return [
+            [(int(self._ids[row]), float(1.0 - similarity)) for row, similarity in zip(rows, similarities, strict=True)]
+            for rows, similarities in hits
+        ]
+
+    def build_index(self, params: IndexParams) -> None:
+        """Build ANN index over the current vectors. Vectors added later are indexed incrementally."""
+        self.drop_index()
+        if params.method == IndexMethod.IVFFLAT:
+            self._build_ivf(params.lists)
+        elif params.method == IndexMethod.HNSW:
+            self._build_hnsw(params.m, params.ef_construction)
+        else:
+            msg = f"Unknown index method: {params.method}"
+            raise ValueError(msg)
+        self._index_params = params
+
+    def rebuild_index(self) -> None:
+        """Rebuild ANN index with the same parameters."""
+        if self._index_params is not None:
+            self.build_index(self._index_params)
+
+    def drop_index(self) -> None:
+        """Drop ANN index. Search falls back to exact search."""
+        self._index_params = None
+        self._centroids = None
+        self._assignments = np.empty(0, dtype=np.int32)
+        self._hnsw = None
+
+    def save(self, dir_path: str, name: str) -> None:
+        """Save alive vectors as `.npy` files so that `load()` can memory-map them."""
+        path = Path(dir_path)
+        path.mkdir(parents=True, exist_ok=True)
+        rows = np.flatnonzero(self._alive[: self._size])
+        self._save_npy(path / f"{name}.npy", self._vectors[rows])
+        self._save_npy(path / f"{name}_norms.npy", self._norms[rows])
+        self._save_npy(path / f"{name}_ids.npy", self._ids[rows])
+        meta: dict[str, Any] = {"dimensions": self._dimensions, "next_id": self._next_id, "index": None}
+        if self._index_params is not None:
+            meta["index"] = {
+                "method": self._index_params.method.value,
+                "m": self._index_params.m,
+                "ef_construction": self._index_params.ef_construction,
+                "lists": self._index_params.lists,
+            }
+        (path / f"{name}_meta.json").write_text(json.dumps(meta))
+
+    @classmethod
+    def load(cls, dir_path: str, name: str) -> "InMemoryVectorIndex":
+        """Load vectors saved by `save()`. The vector matrix is memory-mapped until it grows."""
+        path = Path(dir_path)
+        meta = json.loads((path / f"{name}_meta.json").read_text())
+        index = cls(int(meta["dimensions"]))
+        index._vectors = np.load(path / f"{name}.npy", mmap_mode="r")
+        index._norms = np.load(path / f"{name}_norms.npy")
+        index._ids = np.load(path / f"{name}_ids.npy")
+        index._size = len(index._ids)
+        index._alive = np.ones(index._size, dtype=np.bool_)
+        index._row_of = dict(zip(index._ids.tolist(), range(index._size), strict=True))
+        index._next_id = int(meta["next_id"])
+        if meta["index"] is not None:
+            params = meta["index"]
+            index.build_index(
+                IndexParams(
+                    IndexMethod.from_str(params["method"]), params["m"], params["ef_construction"], params["lists"]
+                )
+            )
+        logger.debug(f"loaded in-memory vector index: {name}, rows: {index._size}")
+        return index
+
+    # --------------------------------------------------------------------------
+    # Private methods
+    # --------------------------------------------------------------------------
+
+    @staticmethod
+    def _save_npy(path: Path, array: np.typing.NDArray[Any]) -> None:
+        """Save an array atomically, so that the file memory-mapped by `load()` stays valid."""
+        tmp_path = path.with_name(f"{path.stem}.tmp.npy")
+        np.save(tmp_path, array)
+        tmp_path.replace(path)
+
+    def _reserve(self, capacity: int) -> None:
+        """Grow arrays geometrically. A memory-mapped matrix is copied into memory here."""
+        if capacity <= len(self._ids):
+            return
+        new_capacity = max(capacity, 2 * len(self._ids), INITIAL_CAPACITY)
+        vectors = np.empty((new_capacity, self._dimensions), dtype=np.float32)
+        vectors[: self._size] = self._vectors[: self._size]
+        self._vectors = vectors
+        self._norms = np.resize(self._norms, new_capacity)
+        self._ids = np.resize(self._ids, new_capacity)
+        self._alive = np.resize(self._alive, new_capacity)
+        self._alive[self._size :] = False
+        if self._centroids is not None:
+            self._assignments = np.resize(self._assignments, new_capacity)
+        if self._hnsw is not None:
+            self._hnsw.resize_index(new_capacity)
+
+    @staticmethod
+    def _top_k(
+        similarities: np.typing.NDArray[np.float32], top_k: int
+    ) -> tuple[np.typing.NDArray[np.intp], np.typing.NDArray[np.float32]]:
+        """Select top-k positions and similarities ordered by similarity."""
+        k = min(top_k, len(similarities))
+        if k <= 0:
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.float32)
+        # O(n) selection of k candidates, then sort only them
+        candidates = np.argpartition(-similarities, k - 1)[:k]
+        order = candidates[np.argsort(-similarities[candidates], kind="stable")]
+        return order, similarities[order]
+
+    # IVF
+    def _build_ivf(self, lists: int) -> None:
+        """Build IVF index by spherical k-means on a sample of vectors."""
+        rows = np.flatnonzero(self._alive[: self._size])
+        if len(rows) == 0:
+            msg = "IVF index needs vectors to train centroids"
+            raise ValueError(msg)
+        lists = min(lists, len(rows))
+        rng = np.random.default_rng(0)
+        samples = self._vectors[rng.choice(rows, min(len(rows), KMEANS_MAX_SAMPLES), replace=False)]
+        centroids = samples[rng.choice(len(samples), lists, replace=False)].copy()
+        for _ in range(KMEANS_ITERATIONS):
+            labels = np.argmax(samples @ centroids.T, axis=1)
+            for list_id in range(lists):
+                members = samples[labels == list_id]
+                if len(members) > 0:
+                    centroid = members.sum(axis=0)
+                    centroids[list_id] = centroid / max(
+                        float(np.linalg.norm(centroid)), float(np.finfo(np.float32).tiny)
+                    )
+        self._centroids = centroids
+        self._assignments = np.full(len(self._ids), -1, dtype=np.int32)
+        self._assignments[: self._size] = self._nearest_centroids(self._vectors[: self._size])
+        logger.debug(f"built IVF index: lists: {lists}, samples: {len(samples)}")
+
+    def _nearest_centroids(self, vectors: np.typing.NDArray[np.float32]) -> np.typing.NDArray[np.int32]:
+        """Assign vectors to the nearest centroids."""
+        if self._centroids is None:
+            msg = "IVF index isn't built"
+            raise ValueError(msg)
+        assignments: np.typing.NDArray[np.int32] = np.argmax(vectors @ self._centroids.T, axis=1).astype(np.int32)
+        return assignments
+
+    def _search_ivf(
+        self, query_vector: np.typing.NDArray[np.float32], top_k: int, search_params: SearchParams | None
+    ) -> tuple[np.typing.NDArray[np.intp], np.typing.NDArray[np.float32]]:
+        """Search vectors in the `probes` nearest lists."""
+        if self._centroids is None:
+            msg = "IVF index isn't built"
+            raise ValueError(msg)
+        probes = (search_params.probes if search_params is not None else None) or DEFAULT_PROBES
+        probes = min(probes, len(self._centroids))
+        nearest_lists = np.argpartition(-(self._centroids @ query_vector), probes - 1)[:probes]
+        rows = np.flatnonzero(np.isin(self._assignments[: self._size], nearest_lists) & self._alive[: self._size])
+        positions, similarities = self._top_k(self._vectors[rows] @ query_vector, top_k)
+        return rows[positions], similarities
+
+    # HNSW
+    def _build_hnsw(self, m: int, ef_construction: int) -> None:
+        """Build HNSW index by `hnswlib`, which is an optional dependency."""
+        try:
+            import hnswlib  # noqa: PLC0415
+        except ImportError as e:
+            msg = "HNSW mode of in-memory index requires `hnswlib`: `uv sync --extra hnsw`"
+            raise ValueError(msg) from e
+
+        self._hnsw = hnswlib.Index(space="ip", dim=self._dimensions)
+        self._hnsw.init_index(max_elements=max(len(self._ids), 1), M=m, ef_construction=ef_construction)
+        self._hnsw_add(0, self._size)
+        for row in np.flatnonzero(~self._alive[: self._size]):
+            self._hnsw.mark_deleted(int(row))
+        logger.debug(f"built HNSW index: m: {m}, ef_construction: {ef_construction}")
+
+    def _hnsw_add(self, start: int, end: int) -> None:
+        """Add rows to HNSW index. Labels are row numbers."""
+        if end > start:
+            self._hnsw.add_items(self._vectors[start:end], np.arange(start, end))
+
+    def _search_hnsw(
+        self, query_vectors: np.typing.NDArray[np.float32], top_k: int, search_params: SearchParams | None
+    ) -> list[tuple[np.typing.NDArray[np.intp], np.typing.NDArray[np.float32]]]:
+        """Search vectors by HNSW graph. Queries are searched in parallel by `hnswlib`."""
+        ef_search = (search_params.ef_search if search_params is not None else None) or DEFAULT_EF_SEARCH
+        self._hnsw.set_ef(max(ef_search, top_k))
+        labels, distances = self._hnsw.knn_query(query_vectors, k=top_k)
+        # distance of `ip` space is `1 - inner product`
+        return [
+            (row_labels.astype(np.intp), (1.0 - row_distances).astype(np.float32))
+            for row_labels, row_distances in zip(labels, distances, strict=True)
+        ]
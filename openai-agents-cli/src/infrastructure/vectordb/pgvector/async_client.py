@@ -0,0 +1,67 @@
+"""Async pgvector client module class."""
+
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+from pgvector.psycopg import register_vector_async
+from psycopg import AsyncConnection, AsyncCursor
+from psycopg.conninfo import make_conninfo
+from psycopg_pool import AsyncConnectionPool
+
+
+class AsyncPgVectorClient:
+    """Async pgvector client class using psycopg 3 connection pool.
+
+    `open()` must be awaited in a running event loop before use.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        host: str,
+        port: int,
+        db_name: str,
+        user: str,
+        password: str,
+        *,
+        min_conn: int = 1,
+        max_conn: int = 10,
+    ) -> None:
+        """Initialize AsyncPgVectorClient."""
+        conninfo = make_conninfo(host=host, port=port, dbname=db_name, user=user, password=password)
+        self._pool = AsyncConnectionPool(
+            conninfo,
+            min_size=min_conn,
+            max_size=max_conn,
+            open=False,
+            # register `vector` type only once per connection
+            configure=self._configure,
+            # health check on checkout
+            check=AsyncConnectionPool.check_connection,
+        )
+
+    async def open(self) -> None:
+        """Open the pool and wait for the minimum connections."""
+        await self._pool.open(wait=True)
+
+    @asynccontextmanager
+    async def connection(self) -> AsyncIterator[AsyncConnection]:
+        """Check out a connection. The transaction is committed on success, otherwise rolled back."""
+        async with self._pool.connection() as conn:
+            yield conn
+
+    @asynccontextmanager
+    async def cursor(self) -> AsyncIterator[AsyncCursor]:
+        """Check out a cursor. The transaction is committed on success, otherwise rolled back."""
+        async with self._pool.connection() as conn, conn.cursor() as cur:
+            yield cur
+
+    async def close(self) -> None:
+        """Close all connections in the pool."""
+        await self._pool.close()
+
+    @staticmethod
+    async def _configure(conn: AsyncConnection) -> None:
+        """Configure new connection."""
+        await register_vector_async(conn)
+        # `configure` must leave the connection idle
+        await conn.commit()
@@ -1,23 +1,152 @@
 """OpenAI module class."""
 
+import threading
+import time
+import weakref
+from collections.abc import Iterator
+from contextlib import contextmanager
+
 import psycopg2
+from loguru import logger
+from pgvector.psycopg2 import register_vector
+from psycopg2.pool import ThreadedConnectionPool
 
 
 class PgVectorClient:
-    """pgvector client class."""
+    """pgvector client class.
+
+    Connections are pooled and checked out per operation, so that several threads can run
+    similarity searches and inserts concurrently. Each thread must use its own cursor.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        host: str,
+        port: int,
+        db_name: str,
+        user: str,
+        password: str,
+        *,
+        min_conn: int | None = None,
+        max_conn: int = 10,
+        health_check_interval: float = 30.0,
+    ) -> None:
+        """Initialize PgVectorClient.
+
+        `putconn()` closes a returned connection when the pool already keeps `min_conn` idle ones,
+        so `min_conn` defaults to `max_conn` and connections are reused under concurrency.
+        """
+        if min_conn is None:
+            min_conn = max_conn
+        if min_conn < 0 or max_conn < 1 or min_conn > max_conn:
+            msg = "`min_conn` and `max_conn` must satisfy 0 <= min_conn <= max_conn and max_conn >= 1"
+            raise ValueError(msg)
+
+        self._pool = ThreadedConnectionPool(
+            min_conn, max_conn, host=host, port=port, database=db_name, user=user, password=password
+        )
+        # `ThreadedConnectionPool.getconn()` raises PoolError when exhausted, so block until available
+        self._available = threading.BoundedSemaphore(max_conn)
+        self._lock = threading.Lock()
+        self._health_check_interval = health_check_interval
+        # key: connection with `vector` type registered, value: last time it was returned to the pool
+        # Note: keyed by the object (not `id()`), so a new connection never reuses the entry of a closed one
+        self._last_used: weakref.WeakKeyDictionary[psycopg2.extensions.connection, float | None] = (
+            weakref.WeakKeyDictionary()
+        )
+
+    @contextmanager
+    def connection(self) -> Iterator[psycopg2.extensions.connection]:
+        """Check out a connection from the pool.
 
-    def __init__(self, host: str, port: int, db_name: str, user: str, password: str) -> None:
-        """Initialize PgVectorClient."""
-        self._conn = psycopg2.connect(host=host, port=port, database=db_name, user=user, password=password)
+        Transaction must be finished (commit or rollback) by the caller.
+        """
+        self._available.acquire()
+        conn = None
+        try:
+            conn = self._checkout()
+            yield conn
+        finally:
+            if conn is not None:
+                self._checkin(conn)
+            self._available.release()
 
-    def get_conn(self) -> psycopg2.extensions.connection:
-        """Get conn."""
-        return self._conn
+    @contextmanager
+    def cursor(self, commit: bool = False) -> Iterator[psycopg2.extensions.cursor]:
+        """Check out a cursor and finish the transaction when leaving the context.
 
-    def get_cursor(self) -> psycopg2.extensions.cursor:
-        """Get cursor."""
-        return self._conn.cursor()
+        The transaction is committed if `commit` is True, otherwise rolled back.
+        """
+        with self.connection() as conn:
+            try:
+                with conn.cursor() as cur:
+                    yield cur
+                if commit:
+                    conn.commit()
+                else:
+                    conn.rollback()
+            except Exception:
+                conn.rollback()
+                raise
 
     def close(self) -> None:
-        """Close connection."""
-        self._conn.close()
+        """Close all connections in the pool."""
+        with self._lock:
+            if not self._pool.closed:
+                self._pool.closeall()
+            self._last_used.clear()
+
+    # --------------------------------------------------------------------------
+    # Private methods
+    # --------------------------------------------------------------------------
+
+    def _checkout(self) -> psycopg2.extensions.connection:
+        """Get a healthy connection with `vector` type registered."""
+        with self._lock:
+            conn = self._pool.getconn()
+        if not self._is_healthy(conn):
+            logger.warning("discard unhealthy connection")
+            self._discard(conn)
+            with self._lock:
+                conn = self._pool.getconn()
+
+        if conn not in self._last_used:
+            # register `vector` type only once per connection
+            register_vector(conn)
+            conn.commit()
+            with self._lock:
+                self._last_used[conn] = None
+        return conn
+
+    def _checkin(self, conn: psycopg2.extensions.connection) -> None:
+        """Return a connection to the pool."""
+        if conn.closed:
+            self._discard(conn)
+            return
+        if conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+            # unfinished transaction must not leak to the next user
+            conn.rollback()
+        with self._lock:
+            self._last_used[conn] = time.monotonic()
+            self._pool.putconn(conn)
+
+    def _discard(self, conn: psycopg2.extensions.connection) -> None:
+        """Close a connection and remove it from the pool."""
+        with self._lock:
+            self._last_used.pop(conn, None)
+            self._pool.putconn(conn, close=True)
+
+    def _is_healthy(self, conn: psycopg2.extensions.connection) -> bool:
+        """Check the connection. `SELECT 1` is issued only when it has been idle for a while."""
+        if conn.closed:
+            return False
+        last_used = self._last_used.get(conn)
+        if last_used is None or time.monotonic() - last_used < self._health_check_interval:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+        except psycopg2.Error:
+            return False
+        return True
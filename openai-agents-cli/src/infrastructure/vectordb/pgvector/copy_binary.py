@@ -0,0 +1,71 @@
+"""Encoder for PostgreSQL binary COPY format with pgvector columns.
+
+Refer to:
+- https://www.postgresql.org/docs/current/sql-copy.html#SQL-COPY-BINARY-FORMAT
+- pgvector `vector_recv()`: int16 dim, int16 unused, float4[dim] (network byte order)
+- `jsonb_recv()`: version byte `1` followed by JSON text
+"""
+
+import json
+import struct
+from collections.abc import Iterable, Sequence
+from enum import Enum
+from typing import Any
+
+import numpy as np
+
+PGCOPY_SIGNATURE = b"PGCOPY\n\xff\r\n\x00"
+PGCOPY_HEADER = PGCOPY_SIGNATURE + struct.pack("!ii", 0, 0)
+PGCOPY_TRAILER = struct.pack("!h", -1)
+JSONB_VERSION = b"\x01"
+
+CopyValue = int | str | list[float] | np.typing.NDArray[np.float32] | dict[str, Any] | None
+
+
+class CopyColumnType(Enum):
+    """Column type for binary COPY."""
+
+    INT4 = "int4"
+    INT8 = "int8"
+    TEXT = "text"
+    VECTOR = "vector"
+    JSONB = "jsonb"
+
+
+def encode_vector(vector: list[float] | np.typing.NDArray[np.float32]) -> bytes:
+    """Encode vector into pgvector binary representation."""
+    values = np.asarray(vector, dtype=">f4")
+    return struct.pack("!HH", values.shape[0], 0) + values.tobytes()
+
+
+def _encode_field(column_type: CopyColumnType, value: CopyValue) -> bytes:
+    """Encode one field with length prefix."""
+    if value is None:
+        return struct.pack("!i", -1)
+
+    payload: bytes
+    if column_type == CopyColumnType.INT4:
+        payload = struct.pack("!i", value)
+    elif column_type == CopyColumnType.INT8:
+        payload = struct.pack("!q", value)
+    elif column_type == CopyColumnType.TEXT:
+        payload = str(value).encode("utf-8")
+    elif column_type == CopyColumnType.VECTOR:
+        payload = encode_vector(value)  # type: ignore[arg-type]
+    elif column_type == CopyColumnType.JSONB:
+        payload = JSONB_VERSION + json.dumps(value, ensure_ascii=False).encode("utf-8")
+    else:
+        msg = f"Unknown column type: {column_type}"
+        raise ValueError(msg)
+    return struct.pack("!i", len(payload)) + payload
+
+
+def encode_copy_binary(column_types: Sequence[CopyColumnType], rows: Iterable[Sequence[CopyValue]]) -> bytes:
+    """Encode rows into a binary COPY payload."""
+    field_count = struct.pack("!h", len(column_types))
+    chunks = [PGCOPY_HEADER]
+    for row in rows:
+        chunks.append(field_count)
+        chunks.extend(_encode_field(column_type, value) for column_type, value in zip(column_types, row, strict=True))
+    chunks.append(PGCOPY_TRAILER)
+    return b"".join(chunks)
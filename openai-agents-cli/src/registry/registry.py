@@ -3,35 +3,103 @@
 from loguru import logger
 
 from env.env import EnvSettings
+from infrastructure.cache.embedding_cache import EmbeddingCache
+from infrastructure.cache.response_cache import (
+    MemoryResponseCache,
+    ResponseCacheBackend,
+    ResponseCacheInterface,
+    SQLiteResponseCache,
+)
+from infrastructure.cache.semantic_cache import SemanticCache
 from infrastructure.openai_api.client import APIMode, OpenAIClient
 from infrastructure.openai_api.dymmy import OpenAIDummyClient
+from infrastructure.openai_api.embedding_pipeline import EmbeddingPipeline
+from infrastructure.openai_api.history import HistoryStrategy
 from infrastructure.openai_api.interface import OpenAIClientInterface
+from infrastructure.openai_api.stub_server import StubServer, StubServerConfig
+from infrastructure.repository.async_embedding import AsyncPgVectorEmbeddingRepository
 from infrastructure.repository.embedding import PgVectorEmbeddingRepository
-from infrastructure.repository.interface import EmbeddingRepositoryInterface
+from infrastructure.repository.interface import AsyncEmbeddingRepositoryInterface, EmbeddingRepositoryInterface
+from infrastructure.repository.memory_embedding import InMemoryEmbeddingRepository
+from infrastructure.vectordb.pgvector.async_client import AsyncPgVectorClient
 from infrastructure.vectordb.pgvector.client import PgVectorClient
 from infrastructure.web_browser.interface import WebClientInterface
 from infrastructure.web_browser.tavily_client import TavilyWebClient
+from use_cases.benchmark_db import BenchmarkVectorDBAgent
+from use_cases.benchmark_prompt import BenchmarkPromptingAgent
 from use_cases.debug import DebugAgent
+from use_cases.embed_texts import EmbedTextsAgent
 from use_cases.prompting import PromptingPatternAgent
 from use_cases.query_agent import QueryAgent
 from use_cases.search_db_agent import SearchVectorDBAgent
+from use_cases.vector_index import VectorIndexAgent
 from use_cases.web_search_agent import WebSearchAgent
 
+# connection pool size of pgvector
+# Note: the sync pool keeps `PG_POOL_MAX_CONN` connections, since psycopg2 closes returned ones above its minimum
+PG_POOL_MIN_CONN = 1
+PG_POOL_MAX_CONN = 10
+EMBEDDING_CACHE_PATH = "storage/cache/embeddings.sqlite3"
+EMBEDDING_CACHE_MAX_ENTRIES = 100_000
+RESPONSE_CACHE_PATH = "storage/cache/responses.sqlite3"
+RESPONSE_CACHE_MAX_ENTRIES = 10_000
+MEMORY_DB_DIR = "storage/memory_db"
+# OpenAI compatible stub server of `stub-server` command
+STUB_SERVER_HOST = "127.0.0.1"
+STUB_SERVER_PORT = 8089
+
 
 class DependencyRegistry:
     """Dependency Registry."""
 
-    def __init__(self, tool: str, model: str, embedding_model: str | None = None) -> None:
-        """Initialize the DependencyRegistry with the environment."""
+    def __init__(  # noqa: PLR0913
+        self,
+        tool: str,
+        model: str,
+        embedding_model: str | None = None,
+        db: str = "pgvector",
+        *,
+        history_max_tokens: int = 0,
+        history_strategy: str = "truncate",
+        response_cache: str | None = None,
+    ) -> None:
+        """Initialize the DependencyRegistry with the environment.
+
+        `db` is `pgvector` or `memory`. `memory` works without PostgreSQL, persisting into `MEMORY_DB_DIR`.
+        `history_max_tokens` and `history_strategy` (`truncate` or `summarize`) bound the conversation history.
+        `response_cache` (`disk` or `memory`) reuses LLM responses of identical requests. None disables it.
+        """
         self._settings = EnvSettings()  # type: ignore[call-arg]
         self._tool = tool
         self._model = model
         self._embedding_model = embedding_model
+        self._db = db
+        self._history_max_tokens = history_max_tokens
+        self._history_strategy = HistoryStrategy.from_str(history_strategy)
+        self._pg_client: PgVectorClient | None = None
+        self._embedding_repository: EmbeddingRepositoryInterface | None = None
+        self._embedding_cache: EmbeddingCache | None = None
+        self._response_cache_backend = ResponseCacheBackend.from_str(response_cache) if response_cache else None
+        self._response_cache: ResponseCacheInterface | None = None
 
     # --------------------------------------------------------------------------
     # OpenAI Client
     # --------------------------------------------------------------------------
 
+    def _build_embedding_cache(self) -> EmbeddingCache:
+        """Build the persistent embedding cache shared by all OpenAI clients built by this registry."""
+        if self._embedding_cache is None:
+            self._embedding_cache = EmbeddingCache(EMBEDDING_CACHE_PATH, max_entries=EMBEDDING_CACHE_MAX_ENTRIES)
+        return self._embedding_cache
+
+    def _build_response_cache(self) -> ResponseCacheInterface | None:
+        """Build the LLM response cache shared by all OpenAI clients built by this registry."""
+        if self._response_cache is None and self._response_cache_backend == ResponseCacheBackend.DISK:
+            self._response_cache = SQLiteResponseCache(RESPONSE_CACHE_PATH, max_entries=RESPONSE_CACHE_MAX_ENTRIES)
+        elif self._response_cache is None and self._response_cache_backend == ResponseCacheBackend.MEMORY:
+            self._response_cache = MemoryResponseCache(max_entries=RESPONSE_CACHE_MAX_ENTRIES)
+        return self._response_cache
+
     def _build_openai_client(self, model: str, embedding_model: str | None) -> OpenAIClientInterface:
         """Build the OpenAI client based on the environment."""
         # Note: it's ok that only variable declaration with type hint [Pending]
@@ -43,6 +111,10 @@ class DependencyRegistry:
                 model=model,
                 api_key=self._settings.OPENAI_API_KEY,
                 is_local_llm=False,
+                embedding_cache=self._build_embedding_cache(),
+                history_max_tokens=self._history_max_tokens,
+                history_strategy=self._history_strategy,
+                response_cache=self._build_response_cache(),
             )
         elif self._tool == "lmstudio":
             if not embedding_model:
@@ -57,6 +129,10 @@ class DependencyRegistry:
                 api_key="lm-studio",
                 base_url="http://localhost:1234/v1",
                 is_local_llm=True,
+                embedding_cache=self._build_embedding_cache(),
+                history_max_tokens=self._history_max_tokens,
+                history_strategy=self._history_strategy,
+                response_cache=self._build_response_cache(),
             )
         elif self._tool == "ollama":
             if not embedding_model:
@@ -71,6 +147,28 @@ class DependencyRegistry:
                 api_key="ollama",
                 base_url="http://localhost:11434/v1",
                 is_local_llm=True,
+                embedding_cache=self._build_embedding_cache(),
+                history_max_tokens=self._history_max_tokens,
+                history_strategy=self._history_strategy,
+                response_cache=self._build_response_cache(),
+            )
+        elif self._tool == "stub":
+            if not embedding_model:
+                msg = "embedding_model must be provided"
+                raise ValueError(msg)
+
+            # use the stub server for benchmarks
+            logger.debug(f"use stub server: tool: {self._tool}, model:{model}, embedding_model:{embedding_model}")
+            openai_client = OpenAIClient(
+                model=model,
+                embedding_model=embedding_model,
+                api_key="stub",
+                base_url=f"http://{STUB_SERVER_HOST}:{STUB_SERVER_PORT}/v1",
+                is_local_llm=True,
+                embedding_cache=self._build_embedding_cache(),
+                history_max_tokens=self._history_max_tokens,
+                history_strategy=self._history_strategy,
+                response_cache=self._build_response_cache(),
             )
         else:
             msg = f"Unknown LLM toolkit: {self._tool}"
@@ -96,6 +194,11 @@ class DependencyRegistry:
             openai_client = OpenAIDummyClient()
         return openai_client
 
+    def _build_embedding_pipeline(self, max_batch_tokens: int, concurrency: int) -> EmbeddingPipeline:
+        """Build the batched, concurrent embedding pipeline."""
+        openai_client = self._build_openai_client(self._model, self._embedding_model)
+        return EmbeddingPipeline(openai_client, max_batch_tokens=max_batch_tokens, concurrency=concurrency)
+
     # --------------------------------------------------------------------------
     # Web Client
     # --------------------------------------------------------------------------
@@ -123,36 +226,103 @@ class DependencyRegistry:
     # --------------------------------------------------------------------------
 
     def _build_pg_client(self) -> PgVectorClient:
-        """Build the PostgreSQL client."""
-        return PgVectorClient(
+        """Build the PostgreSQL client.
+
+        The connection pool is shared by all repositories built by this registry.
+        """
+        if self._pg_client is None:
+            self._pg_client = PgVectorClient(
+                host=self._settings.PG_HOST,
+                port=self._settings.PG_PORT,
+                db_name=self._settings.PG_DB_NAME,
+                user=self._settings.PG_USER,
+                password=self._settings.PG_PASSWORD,
+                max_conn=PG_POOL_MAX_CONN,
+            )
+        return self._pg_client
+
+    def _is_large_embedding(self) -> bool:
+        """Whether `*_large` tables (1536 dimensions) are used."""
+        # is_large_embedding = True if self._tool == "openai" else False
+        return bool(self._tool == "openai")
+
+    def _dimensions(self) -> int:
+        """Dimensions of embeddings stored in the tables."""
+        return 1536 if self._is_large_embedding() else 768
+
+    def _build_embedding_repository(self) -> EmbeddingRepositoryInterface:
+        """Build the EmbeddingRepository.
+
+        The repository is shared by all use cases built by this registry, and flushed by `close()`.
+        """
+        if self._embedding_repository is not None:
+            return self._embedding_repository
+        if self._db == "memory":
+            self._embedding_repository = InMemoryEmbeddingRepository(
+                self._dimensions(), self._is_large_embedding(), MEMORY_DB_DIR
+            )
+        elif self._db == "pgvector":
+            self._embedding_repository = PgVectorEmbeddingRepository(
+                self._build_pg_client(), self._is_large_embedding()
+            )
+        else:
+            msg = f"Unknown db: {self._db}"
+            raise ValueError(msg)
+        return self._embedding_repository
+
+    def _build_async_embedding_repository(self) -> AsyncEmbeddingRepositoryInterface:
+        """Build the async EmbeddingRepository.
+
+        The pool is bound to an event loop, so it isn't shared and must be opened by the caller.
+        """
+        async_pg_client = AsyncPgVectorClient(
             host=self._settings.PG_HOST,
             port=self._settings.PG_PORT,
             db_name=self._settings.PG_DB_NAME,
             user=self._settings.PG_USER,
             password=self._settings.PG_PASSWORD,
+            min_conn=PG_POOL_MIN_CONN,
+            max_conn=PG_POOL_MAX_CONN,
         )
-
-    def _build_embedding_repository(self) -> EmbeddingRepositoryInterface:
-        """Build the EmbeddingRepository."""
-        pg_client = self._build_pg_client()
-        # is_large_embedding = True if self._tool == "openai" else False
-        is_large_embedding = bool(self._tool == "openai")
-        return PgVectorEmbeddingRepository(pg_client, is_large_embedding)
+        return AsyncPgVectorEmbeddingRepository(async_pg_client, self._is_large_embedding())
 
     # --------------------------------------------------------------------------
     # Use cases
     # --------------------------------------------------------------------------
-    def _build_prompt_agent_usecase(self, chat: bool) -> PromptingPatternAgent:
+    def _build_prompt_agent_usecase(
+        self, chat: bool, stream: bool, parallel: bool, samples: int
+    ) -> PromptingPatternAgent:
         self._openai_client = self._build_openai_client(self._model, self._embedding_model)
         embedding_repository = self._build_embedding_repository()
         api_mode = APIMode.CHAT_COMPLETION_API if chat else APIMode.RESPONSE_API
-        return PromptingPatternAgent(self._openai_client, embedding_repository, self._tool, api_mode)
+        return PromptingPatternAgent(
+            self._openai_client, embedding_repository, self._tool, api_mode, stream, parallel=parallel, samples=samples
+        )
+
+    def _build_benchmark_prompt_usecase(self, chat: bool, stream: bool, parallel: bool) -> BenchmarkPromptingAgent:
+        prompting_agent = self._build_prompt_agent_usecase(chat, stream, parallel, 1)
+        settings: dict[str, str | int | bool] = {
+            "tool": self._tool,
+            "model": self._model,
+            "api": "chat" if chat else "response",
+            "stream": stream,
+            "parallel": parallel,
+            "history_max_tokens": self._history_max_tokens,
+        }
+        return BenchmarkPromptingAgent(prompting_agent, self._openai_client, settings)
 
-    def _build_query_agent_usecase(self, chat: bool) -> QueryAgent:
+    def _build_query_agent_usecase(
+        self, chat: bool, stream: bool, semantic_cache_distance: float, semantic_cache_ttl: int
+    ) -> QueryAgent:
         self._openai_client = self._build_openai_client(self._model, self._embedding_model)
         embedding_repository = self._build_embedding_repository()
         api_mode = APIMode.CHAT_COMPLETION_API if chat else APIMode.RESPONSE_API
-        return QueryAgent(self._openai_client, embedding_repository, self._tool, api_mode)
+        semantic_cache = (
+            SemanticCache(embedding_repository, max_distance=semantic_cache_distance, ttl_seconds=semantic_cache_ttl)
+            if semantic_cache_distance > 0
+            else None
+        )
+        return QueryAgent(self._openai_client, embedding_repository, self._tool, api_mode, stream, semantic_cache)
 
     def _build_web_search_agent_usecase(self) -> WebSearchAgent:
         # self._web_client = self._build_openai_specific_client(self._model, self._embedding_model)
@@ -163,21 +333,46 @@ class DependencyRegistry:
         embedding_repository = self._build_embedding_repository()
         return DebugAgent(embedding_repository)
 
+    def _build_embed_texts_usecase(self, max_batch_tokens: int, concurrency: int) -> EmbedTextsAgent:
+        embedding_pipeline = self._build_embedding_pipeline(max_batch_tokens, concurrency)
+        embedding_repository = self._build_embedding_repository()
+        return EmbedTextsAgent(embedding_pipeline, embedding_repository)
+
     def _build_search_vector_db_usecase(self) -> SearchVectorDBAgent:
         embedding_repository = self._build_embedding_repository()
         return SearchVectorDBAgent(embedding_repository)
 
+    def _build_vector_index_usecase(self) -> VectorIndexAgent:
+        embedding_repository = self._build_embedding_repository()
+        return VectorIndexAgent(embedding_repository)
+
+    def _build_benchmark_db_usecase(self) -> BenchmarkVectorDBAgent:
+        embedding_repository = self._build_embedding_repository()
+        async_embedding_repository = self._build_async_embedding_repository()
+        # not persisted
+        memory_embedding_repository = InMemoryEmbeddingRepository(self._dimensions(), self._is_large_embedding())
+        return BenchmarkVectorDBAgent(
+            embedding_repository, self._dimensions(), async_embedding_repository, memory_embedding_repository
+        )
+
     # --------------------------------------------------------------------------
     # Getter for use cases
     # --------------------------------------------------------------------------
 
-    def get_prompt_agent(self, chat: bool) -> PromptingPatternAgent:
+    def get_prompt_agent(
+        self, chat: bool, stream: bool = False, parallel: bool = False, samples: int = 1
+    ) -> PromptingPatternAgent:
         """Get the PromptingPattern Agent."""
-        return self._build_prompt_agent_usecase(chat)
+        return self._build_prompt_agent_usecase(chat, stream, parallel, samples)
+
+    def get_query_agent(
+        self, chat: bool, stream: bool = False, semantic_cache_distance: float = 0.0, semantic_cache_ttl: int = 0
+    ) -> QueryAgent:
+        """Get the Query Agent.
 
-    def get_query_agent(self, chat: bool) -> QueryAgent:
-        """Get the Query Agent."""
-        return self._build_query_agent_usecase(chat)
+        The semantic response cache is enabled when `semantic_cache_distance` is positive.
+        """
+        return self._build_query_agent_usecase(chat, stream, semantic_cache_distance, semantic_cache_ttl)
 
     def get_web_search_agent(self) -> WebSearchAgent:
         """Get the Web Search Agent."""
@@ -187,6 +382,47 @@ class DependencyRegistry:
         """Get the Debug Agent."""
         return self._build_debug_agent_usecase()
 
+    def get_embed_texts_usecase(self, max_batch_tokens: int, concurrency: int) -> EmbedTextsAgent:
+        """Get the Embed Texts Agent."""
+        return self._build_embed_texts_usecase(max_batch_tokens, concurrency)
+
     def get_search_vector_db_usecase(self) -> SearchVectorDBAgent:
         """Get the Search Vector DB Agent."""
         return self._build_search_vector_db_usecase()
+
+    def get_vector_index_usecase(self) -> VectorIndexAgent:
+        """Get the Vector Index Agent."""
+        return self._build_vector_index_usecase()
+
+    def get_benchmark_db_usecase(self) -> BenchmarkVectorDBAgent:
+        """Get the Benchmark Vector DB Agent."""
+        return self._build_benchmark_db_usecase()
+
+    def get_benchmark_prompt_usecase(
+        self, chat: bool, stream: bool = False, parallel: bool = False
+    ) -> BenchmarkPromptingAgent:
+        """Get the Benchmark Prompting Agent."""
+        return self._build_benchmark_prompt_usecase(chat, stream, parallel)
+
+    def get_stub_server(self, latency: float, tokens_per_sec: float, output_tokens: int) -> StubServer:
+        """Get the OpenAI compatible stub server, which returns embeddings of the dimensions of the tables."""
+        config = StubServerConfig(latency, tokens_per_sec, output_tokens, self._dimensions())
+        return StubServer(STUB_SERVER_HOST, STUB_SERVER_PORT, config)
+
+    # --------------------------------------------------------------------------
+    # Lifecycle
+    # --------------------------------------------------------------------------
+
+    def close(self) -> None:
+        """Release the resources shared by the use cases: the repository is flushed, the pool and caches are closed.
+
+        It's called once when the command exits, so use cases never close them.
+        """
+        if self._embedding_repository is not None:
+            self._embedding_repository.flush()
+        if self._pg_client is not None:
+            self._pg_client.close()
+        if self._embedding_cache is not None:
+            self._embedding_cache.close()
+        if self._response_cache is not None:
+            self._response_cache.close()
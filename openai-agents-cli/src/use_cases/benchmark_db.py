@@ -0,0 +1,299 @@
+"""Benchmark VectorDB Use Case."""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from typing import TYPE_CHECKING
+
+import numpy as np
+from loguru import logger
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+from entities.embedding.types import Embedding, EmbeddingBatch
+from entities.vector_index.types import IndexMethod, IndexParams, IndexTarget, Quantization, SearchParams
+from infrastructure.repository.interface import (
+    AsyncEmbeddingRepositoryInterface,
+    BulkInsertMethod,
+    EmbeddingRepositoryInterface,
+)
+
+
+class BenchmarkVectorDBAgent:
+    """Benchmark Vector DB Agent Use Case.
+
+    Synthetic random vectors are used, and all inserted rows are deleted after each run.
+    """
+
+    def __init__(
+        self,
+        embedding_repo: EmbeddingRepositoryInterface,
+        dimensions: int,
+        async_embedding_repo: AsyncEmbeddingRepositoryInterface | None = None,
+        memory_embedding_repo: EmbeddingRepositoryInterface | None = None,
+    ) -> None:
+        """Initialize the Benchmark Vector DB Agent with an embedding repository."""
+        self._embedding_repo = embedding_repo
+        self._async_embedding_repo = async_embedding_repo
+        self._memory_embedding_repo = memory_embedding_repo
+        self._dimensions = dimensions
+        self._rng = np.random.default_rng(42)
+
+    def bulk_insert(self, rows: int, batch_size: int) -> None:
+        """Compare rows/sec of row-by-row insert against bulk insert."""
+        logger.info(f"benchmark bulk insert: rows: {rows}, batch_size: {batch_size}, dimensions: {self._dimensions}")
+        embeddings = self._random_embeddings(rows)
+        contents = [f"benchmark content {i}" for i in range(rows)]
+
+        targets: list[tuple[str, Callable[[], list[int]]]] = [
+            ("loop", lambda: self._embedding_repo.insert_item_contents(contents, embeddings)),
+            (
+                "execute_values",
+                lambda: self._embedding_repo.insert_item_contents_bulk(
+                    contents, embeddings, batch_size, BulkInsertMethod.EXECUTE_VALUES
+                ),
+            ),
+            (
+                "copy",
+                lambda: self._embedding_repo.insert_item_contents_bulk(
+                    contents, embeddings, batch_size, BulkInsertMethod.COPY
+                ),
+            ),
+        ]
+
+        baseline: float | None = None
+        print(f"{'method':<16}{'rows':>8}{'seconds':>10}{'rows/sec':>12}{'speedup':>9}")
+        for name, insert in targets:
+            start = time.perf_counter()
+            ids = insert()
+            elapsed = time.perf_counter() - start
+            self._embedding_repo.delete_item_contents(ids)
+
+            rows_per_sec = len(ids) / elapsed if elapsed > 0 else 0.0
+            if baseline is None:
+                baseline = rows_per_sec
+            speedup = rows_per_sec / baseline if baseline else 0.0
+            print(f"{name:<16}{len(ids):>8}{elapsed:>10.3f}{rows_per_sec:>12.1f}{speedup:>8.1f}x")
+
+    def index_recall(
+        self,
+        rows: int,
+        queries: int,
+        top_k: int,
+        index_params: IndexParams,
+        search_values: list[int],
+    ) -> None:
+        """Report recall@k and latency of ANN index against exact search.
+
+        `search_values` are `hnsw.ef_search` values for HNSW, `ivfflat.probes` values for IVFFlat.
+        It runs on scratch tables, so the data and the ANN index in use are kept as is.
+        """
+        logger.info(f"benchmark index recall: rows: {rows}, queries: {queries}, top_k: {top_k}, {index_params}")
+        with self._embedding_repo.scratch() as repo:
+            repo.insert_item_contents_bulk(
+                [f"benchmark content {i}" for i in range(rows)], self._random_embeddings(rows), 1000
+            )
+            query_vectors = [embedding.embedding for embedding in self._random_embeddings(queries)]
+
+            # ground truth by exact search
+            exact_params = SearchParams(exact=True)
+            exact_latencies, exact_results = self._run_queries(repo, query_vectors, top_k, exact_params)
+
+            start = time.perf_counter()
+            repo.create_index(IndexTarget.ITEM_CONTENTS, index_params)
+            build_seconds = time.perf_counter() - start
+            print(f"index: {index_params.method.value}, build: {build_seconds:.3f}s")
+
+            print(f"{'search':<20}{'recall@' + str(top_k):>10}{'avg ms':>10}{'p95 ms':>10}")
+            print(
+                f"{'exact':<20}{1.0:>10.3f}{np.mean(exact_latencies):>10.2f}{np.percentile(exact_latencies, 95):>10.2f}"
+            )
+            for value in search_values:
+                if index_params.method == IndexMethod.HNSW:
+                    label, search_params = f"ef_search={value}", SearchParams(ef_search=value)
+                else:
+                    label, search_params = f"probes={value}", SearchParams(probes=value)
+                latencies, results = self._run_queries(repo, query_vectors, top_k, search_params)
+                recall = np.mean(
+                    [
+                        len(set(result) & set(expected)) / len(expected) if expected else 1.0
+                        for result, expected in zip(results, exact_results, strict=True)
+                    ]
+                )
+                print(f"{label:<20}{recall:>10.3f}{np.mean(latencies):>10.2f}{np.percentile(latencies, 95):>10.2f}")
+
+    async def query_throughput(self, rows: int, queries: int, concurrency: int, top_k: int) -> None:
+        """Compare concurrent similarity search throughput of sync and async repositories."""
+        if self._async_embedding_repo is None:
+            msg = "`async_embedding_repo` must be provided"
+            raise ValueError(msg)
+        async_repo = self._async_embedding_repo
+        await async_repo.open()
+
+        logger.info(f"benchmark query throughput: rows: {rows}, queries: {queries}, concurrency: {concurrency}")
+        ids = self._embedding_repo.insert_item_contents_bulk(
+            [f"benchmark content {i}" for i in range(rows)], self._random_embeddings(rows), 1000
+        )
+        query_vectors = [embedding.embedding for embedding in self._random_embeddings(queries)]
+
+        async def run_async() -> None:
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def search(query_vector: np.typing.NDArray[np.floating]) -> None:
+                async with semaphore:
+                    await async_repo.similarity_search(query_vector, top_k)
+
+            await asyncio.gather(*(search(query_vector) for query_vector in query_vectors))
+
+        def run_sync_threads() -> None:
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                list(
+                    executor.map(
+                        lambda query_vector: self._embedding_repo.similarity_search(query_vector, top_k), query_vectors
+                    )
+                )
+
+        try:
+            print(f"{'repository':<24}{'queries':>8}{'seconds':>10}{'qps':>10}")
+
+            start = time.perf_counter()
+            for query_vector in query_vectors:
+                self._embedding_repo.similarity_search(query_vector, top_k)
+            self._print_throughput("sync (sequential)", queries, time.perf_counter() - start)
+
+            start = time.perf_counter()
+            # blocking calls are offloaded so that the event loop stays responsive
+            await asyncio.to_thread(run_sync_threads)
+            self._print_throughput(f"sync ({concurrency} threads)", queries, time.perf_counter() - start)
+
+            start = time.perf_counter()
+            await run_async()
+            self._print_throughput(f"async ({concurrency} tasks)", queries, time.perf_counter() - start)
+        finally:
+            self._embedding_repo.delete_item_contents(ids)
+            await async_repo.close()
+
+    def compare_backends(self, rows: int, queries: int, top_k: int, index_params: IndexParams) -> None:
+        """Compare latency and recall of pgvector against the in-memory repository on the same data.
+
+        Recall is measured against the exact search of each backend.
+        It runs on scratch tables, so the data and the ANN index in use are kept as is.
+        """
+        if self._memory_embedding_repo is None:
+            msg = "`memory_embedding_repo` must be provided"
+            raise ValueError(msg)
+
+        logger.info(f"benchmark backends: rows: {rows}, queries: {queries}, top_k: {top_k}, {index_params}")
+        embeddings = self._random_embeddings(rows)
+        contents = [f"benchmark content {i}" for i in range(rows)]
+        query_vectors = [embedding.embedding for embedding in self._random_embeddings(queries)]
+        backends = [("pgvector", self._embedding_repo), ("memory", self._memory_embedding_repo)]
+
+        print(f"{'backend':<10}{'search':<10}{'insert s':>10}{'build s':>10}{'recall@' + str(top_k):>10}", end="")
+        print(f"{'avg ms':>10}{'p95 ms':>10}")
+        for name, backend in backends:
+            with backend.scratch() as repo:
+                start = time.perf_counter()
+                repo.insert_item_contents_bulk(contents, embeddings, 1000)
+                insert_seconds = time.perf_counter() - start
+                exact_latencies, exact_results = self._run_queries(repo, query_vectors, top_k, SearchParams(exact=True))
+                start = time.perf_counter()
+                repo.create_index(IndexTarget.ITEM_CONTENTS, index_params)
+                build_seconds = time.perf_counter() - start
+                latencies, results = self._run_queries(repo, query_vectors, top_k, SearchParams())
+                recall = np.mean(
+                    [
+                        len(set(result) & set(expected)) / len(expected) if expected else 1.0
+                        for result, expected in zip(results, exact_results, strict=True)
+                    ]
+                )
+                print(
+                    f"{name:<10}{'exact':<10}{insert_seconds:>10.3f}{'-':>10}{1.0:>10.3f}"
+                    f"{np.mean(exact_latencies):>10.2f}{np.percentile(exact_latencies, 95):>10.2f}"
+                )
+                print(
+                    f"{name:<10}{index_params.method.value:<10}{'-':>10}{build_seconds:>10.3f}{recall:>10.3f}"
+                    f"{np.mean(latencies):>10.2f}{np.percentile(latencies, 95):>10.2f}"
+                )
+
+    def quantization_recall(
+        self,
+        rows: int,
+        queries: int,
+        top_k: int,
+        index_params: IndexParams,
+        rerank_factors: list[int],
+    ) -> None:
+        """Compare index size, recall@k and latency of full precision, `halfvec` and `bit` indexes.
+
+        Quantized search re-ranks `top_k * factor` candidates by full precision distance.
+        It runs on scratch tables, so the data and the ANN index in use are kept as is.
+        """
+        logger.info(f"benchmark quantization: rows: {rows}, queries: {queries}, top_k: {top_k}, {index_params}")
+        with self._embedding_repo.scratch() as repo:
+            repo.insert_item_contents_bulk(
+                [f"benchmark content {i}" for i in range(rows)], self._random_embeddings(rows), 1000
+            )
+            query_vectors = [embedding.embedding for embedding in self._random_embeddings(queries)]
+
+            # ground truth by exact search
+            _, exact_results = self._run_queries(repo, query_vectors, top_k, SearchParams(exact=True))
+
+            print(f"{'index':<10}{'rerank':>8}{'build s':>10}{'size MB':>10}", end="")
+            print(f"{'recall@' + str(top_k):>10}{'avg ms':>10}{'p95 ms':>10}")
+            for quantization in Quantization:
+                start = time.perf_counter()
+                repo.create_index(IndexTarget.ITEM_CONTENTS, replace(index_params, quantization=quantization))
+                build_seconds = time.perf_counter() - start
+                size_mb = repo.get_index_size(IndexTarget.ITEM_CONTENTS) / (1 << 20)
+
+                # full precision index has nothing to re-rank
+                factors = [1] if quantization == Quantization.NONE else rerank_factors
+                for factor in factors:
+                    search_params = SearchParams(quantization=quantization, rerank_candidates=top_k * factor)
+                    latencies, results = self._run_queries(repo, query_vectors, top_k, search_params)
+                    recall = np.mean(
+                        [
+                            len(set(result) & set(expected)) / len(expected) if expected else 1.0
+                            for result, expected in zip(results, exact_results, strict=True)
+                        ]
+                    )
+                    rerank = "-" if quantization == Quantization.NONE else f"x{factor}"
+                    print(
+                        f"{quantization.value:<10}{rerank:>8}{build_seconds:>10.3f}{size_mb:>10.2f}"
+                        f"{recall:>10.3f}{np.mean(latencies):>10.2f}{np.percentile(latencies, 95):>10.2f}"
+                    )
+
+    # --------------------------------------------------------------------------
+    # Private methods
+    # --------------------------------------------------------------------------
+
+    def _random_embeddings(self, rows: int) -> list[Embedding]:
+        """Generate normalized random embeddings."""
+        vectors = self._rng.standard_normal((rows, self._dimensions), dtype=np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        return EmbeddingBatch(vectors).to_embeddings()
+
+    @staticmethod
+    def _run_queries(
+        embedding_repo: EmbeddingRepositoryInterface,
+        query_vectors: list[np.typing.NDArray[np.floating]],
+        top_k: int,
+        search_params: SearchParams,
+    ) -> tuple[list[float], list[list[int]]]:
+        """Run similarity search for each query and return latencies (ms) and result ids."""
+        latencies: list[float] = []
+        results: list[list[int]] = []
+        for query_vector in query_vectors:
+            start = time.perf_counter()
+            results.append(embedding_repo.similarity_search_ids(query_vector, top_k, search_params))
+            latencies.append((time.perf_counter() - start) * 1000)
+        return latencies, results
+
+    @staticmethod
+    def _print_throughput(label: str, queries: int, elapsed: float) -> None:
+        """Print throughput row."""
+        qps = queries / elapsed if elapsed > 0 else 0.0
+        print(f"{label:<24}{queries:>8}{elapsed:>10.3f}{qps:>10.1f}")
@@ -0,0 +1,169 @@
+"""Benchmark Prompting Pattern Use Case."""
+
+import csv
+import json
+import time
+from dataclasses import asdict, dataclass, fields
+from datetime import UTC, datetime
+from pathlib import Path
+
+from loguru import logger
+
+from infrastructure.openai_api.interface import OpenAIClientInterface
+from use_cases.prompting import PATTERNS, PromptingPatternAgent
+
+JSON_FILE_PREFIX = "prompt_patterns"
+CSV_FILE_NAME = "prompt_patterns.csv"
+
+
+@dataclass(frozen=True)
+class PatternCallRecord:
+    """Latency and token usage of a call in a pattern."""
+
+    run_id: str
+    settings: str
+    pattern: str
+    call: int
+    elapsed: float
+    time_to_first_token: float
+    prompt_tokens: int
+    cached_tokens: int
+    output_tokens: int
+
+
+@dataclass(frozen=True)
+class PatternResult:
+    """Wall time and totals of a pattern."""
+
+    pattern: str
+    wall_seconds: float
+    calls: int
+    call_seconds: float
+    prompt_tokens: int
+    cached_tokens: int
+    output_tokens: int
+
+
+class BenchmarkPromptingAgent:
+    """Benchmark Prompting Pattern Agent Use Case.
+
+    Patterns run against the backend of the OpenAI client, which is a provider or the stub server.
+    Each run is written into a JSON file, and its calls are appended to a CSV file to track regressions.
+    Calls served by the response cache have no usage, so the cache should be disabled.
+    """
+
+    def __init__(
+        self,
+        prompting_agent: PromptingPatternAgent,
+        openai_client: OpenAIClientInterface,
+        settings: dict[str, str | int | bool],
+    ) -> None:
+        """Initialize the Benchmark Prompting Agent.
+
+        `settings` describes the backend and the mode, which is recorded with the results.
+        """
+        self._prompting_agent = prompting_agent
+        self._openai_client = openai_client
+        self._settings = settings
+
+    def run(self, patterns: list[str], output_dir: str) -> None:
+        """Run the patterns (all patterns if empty), print the results and write them into `output_dir`."""
+        for pattern in patterns:
+            if pattern not in PATTERNS:
+                msg = f"Unknown pattern: {pattern}"
+                raise ValueError(msg)
+
+        run_id = datetime.now(UTC).strftime("%Y%m%dT%H%M%SZ")
+        settings = ",".join(f"{key}={value}" for key, value in self._settings.items())
+        logger.info(f"benchmark prompt patterns: run: {run_id}, settings: {settings}")
+        records: list[PatternCallRecord] = []
+        results: list[PatternResult] = []
+        start = time.perf_counter()
+        for pattern in patterns or PATTERNS:
+            # patterns are measured in their own conversations
+            self._openai_client.clear()
+            offset = len(self._openai_client.get_usages())
+            pattern_start = time.perf_counter()
+            self._prompting_agent.call(pattern)
+            wall_seconds = time.perf_counter() - pattern_start
+
+            usages = self._openai_client.get_usages()[offset:]
+            records.extend(
+                PatternCallRecord(
+                    run_id=run_id,
+                    settings=settings,
+                    pattern=pattern,
+                    call=i,
+                    elapsed=round(usage.elapsed, 4),
+                    time_to_first_token=round(usage.time_to_first_token, 4),
+                    prompt_tokens=usage.prompt_tokens,
+                    cached_tokens=usage.cached_tokens,
+                    output_tokens=usage.output_tokens,
+                )
+                for i, usage in enumerate(usages)
+            )
+            results.append(
+                PatternResult(
+                    pattern=pattern,
+                    wall_seconds=round(wall_seconds, 4),
+                    calls=len(usages),
+                    call_seconds=round(sum(usage.elapsed for usage in usages), 4),
+                    prompt_tokens=sum(usage.prompt_tokens for usage in usages),
+                    cached_tokens=sum(usage.cached_tokens for usage in usages),
+                    output_tokens=sum(usage.output_tokens for usage in usages),
+                )
+            )
+        total_seconds = time.perf_counter() - start
+
+        self._print_results(results, total_seconds)
+        self._write_json(Path(output_dir), run_id, results, records, total_seconds)
+        self._append_csv(Path(output_dir), records)
+
+    # --------------------------------------------------------------------------
+    # Private methods
+    # --------------------------------------------------------------------------
+
+    @staticmethod
+    def _print_results(results: list[PatternResult], total_seconds: float) -> None:
+        """Print result rows."""
+        print(f"{'pattern':<18}{'wall(s)':>10}{'calls':>7}{'call(s)':>10}{'prompt':>9}{'cached':>9}{'output':>9}")
+        for result in results:
+            print(
+                f"{result.pattern:<18}{result.wall_seconds:>10.3f}{result.calls:>7}{result.call_seconds:>10.3f}"
+                f"{result.prompt_tokens:>9}{result.cached_tokens:>9}{result.output_tokens:>9}"
+            )
+        print(f"{'total':<18}{total_seconds:>10.3f}")
+
+    def _write_json(
+        self,
+        output_dir: Path,
+        run_id: str,
+        results: list[PatternResult],
+        records: list[PatternCallRecord],
+        total_seconds: float,
+    ) -> None:
+        """Write the run into a JSON file."""
+        output_dir.mkdir(parents=True, exist_ok=True)
+        path = output_dir / f"{JSON_FILE_PREFIX}_{run_id}.json"
+        payload = {
+            "run_id": run_id,
+            "settings": self._settings,
+            "total_seconds": round(total_seconds, 4),
+            "patterns": [asdict(result) for result in results],
+            "calls": [asdict(record) for record in records],
+        }
+        path.write_text(json.dumps(payload, indent=2))
+        logger.info(f"benchmark result: {path}")
+
+    @staticmethod
+    def _append_csv(output_dir: Path, records: list[PatternCallRecord]) -> None:
+        """Append the calls to the CSV file. The header is written when the file is created."""
+        output_dir.mkdir(parents=True, exist_ok=True)
+        path = output_dir / CSV_FILE_NAME
+        is_new = not path.exists()
+        with path.open("a", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=[field.name for field in fields(PatternCallRecord)])
+            if is_new:
+                writer.writeheader()
+            writer.writerows(asdict(record) for record in records)
+        logger.info(f"benchmark calls: {path}")
@@ -2,7 +2,7 @@
 
 from loguru import logger
 
-from entities.embedding.utils import load_embedding
+from entities.embedding.loader import EmbeddingFileFormat, iter_embedding_batches
 from infrastructure.repository.interface import EmbeddingRepositoryInterface
 
 
@@ -16,12 +16,18 @@ class DebugAgent:
         """Initialize the Debug Agent with an embedding repository."""
         self._embedding_repo = embedding_repo
 
-    def embedding(self, file_path: str) -> None:
-        """Embedding static file."""
-        # load embedding JSON file
-        embedding_list = load_embedding(file_path)
-
-        # Insert into DB
-        logger.debug("insert into db")
-        self._embedding_repo.insert_embeddings(embedding_list)
-        self._embedding_repo.close()
+    def embedding(
+        self,
+        file_path: str,
+        batch_size: int = 1000,
+        file_format: EmbeddingFileFormat | None = None,
+        dimensions: int | None = None,
+    ) -> None:
+        """Import embedding dump file batch by batch, so that memory usage doesn't depend on the file size."""
+        total = 0
+        for batch in iter_embedding_batches(file_path, batch_size, file_format, dimensions):
+            # Insert into DB
+            logger.debug(f"insert into db: {len(batch)} rows")
+            self._embedding_repo.insert_embeddings_bulk(batch, batch_size)
+            total += len(batch)
+        logger.info(f"imported embeddings: {total}")
@@ -0,0 +1,46 @@
+"""Embed Texts Use Case."""
+
+from pathlib import Path
+from typing import Any
+
+from loguru import logger
+
+from infrastructure.openai_api.embedding_pipeline import EmbeddingPipeline
+from infrastructure.repository.interface import EmbeddingRepositoryInterface
+
+
+class EmbedTextsAgent:
+    """Embed Texts Agent Use Case.
+
+    Texts are embedded by the batched, concurrent pipeline and stored into `item_contents` table.
+    """
+
+    def __init__(
+        self,
+        embedding_pipeline: EmbeddingPipeline,
+        embedding_repo: EmbeddingRepositoryInterface,
+    ) -> None:
+        """Initialize the Embed Texts Agent with an embedding pipeline and an embedding repository."""
+        self._embedding_pipeline = embedding_pipeline
+        self._embedding_repo = embedding_repo
+
+    def embed_file(self, file_path: str, batch_size: int) -> None:
+        """Embed every non-empty line of the text file and store them."""
+        with Path(file_path).open(encoding="utf-8") as f:
+            lines = [(line_number, line.strip()) for line_number, line in enumerate(f, start=1) if line.strip()]
+        texts = [text for _, text in lines]
+        # metadata can be used as filter of similarity search
+        metadata: list[dict[str, Any]] = [
+            {"source": Path(file_path).name, "line": line_number} for line_number, _ in lines
+        ]
+        logger.debug(f"loaded texts: {len(texts)}")
+
+        embeddings = self._embedding_pipeline.embed(texts)
+        metrics = self._embedding_pipeline.metrics
+        print(f"texts: {metrics.texts}, estimated tokens: {metrics.tokens}, batches: {metrics.batches}")
+        print(f"retries: {metrics.retries}, elapsed: {metrics.elapsed:.3f}s")
+        print(f"texts/sec: {metrics.texts_per_sec:.1f}, tokens/sec: {metrics.tokens_per_sec:.1f}")
+
+        # Insert into DB
+        ids = self._embedding_repo.insert_item_contents_bulk(texts, embeddings, batch_size, metadata=metadata)
+        logger.info(f"inserted item contents: {len(ids)}")
@@ -1,32 +1,89 @@
 """Prompting Pattern Use Case."""
 
+import re
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from string import Template
 
 from loguru import logger
 
 from infrastructure.openai_api.client import APIMode
-from infrastructure.openai_api.interface import OpenAIClientInterface
+from infrastructure.openai_api.interface import OpenAIClientInterface, StreamMetrics
 from infrastructure.repository.interface import EmbeddingRepositoryInterface
 
+# patterns of `PromptingPatternAgent.call`
+PATTERNS = (
+    "zero-shot",
+    "few-shot",
+    "roll",
+    "emotion",
+    "cot",
+    "cot2",
+    "tot",
+    "generated",
+    "reflection",
+    "meta",
+    "prompt-chaining",
+)
+# upper bound of concurrent calls of fan-out
+FAN_OUT_MAX_WORKERS = 8
+FINAL_ANSWER_INSTRUCTIONS = "End your response with a line `Answer: <final answer>`."
+FINAL_ANSWER_PATTERN = re.compile(r"answer\s*:\s*(.+)", re.IGNORECASE)
+
+
+def extract_final_answer(response: str) -> str:
+    """Extract the final answer from the last `Answer:` line, or the last line, normalized for voting."""
+    matches = FINAL_ANSWER_PATTERN.findall(response)
+    lines = [line for line in response.splitlines() if line.strip()]
+    answer = matches[-1] if matches else (lines[-1] if lines else "")
+    return answer.strip().strip("*`.。 ").lower()
+
+
+def majority_vote(responses: list[str]) -> tuple[str, int]:
+    """Take the most common final answer of responses and its votes. A tie goes to the earliest answer."""
+    votes = Counter(extract_final_answer(response) for response in responses)
+    return votes.most_common(1)[0]
+
 
 class PromptingPatternAgent:
     """Prompting Pattern Agent Use Case."""
 
-    def __init__(
+    def __init__(  # noqa: PLR0913
         self,
         openai_client: OpenAIClientInterface,
         embedding_repo: EmbeddingRepositoryInterface,
         tool: str,
         api_mode: APIMode,
+        stream: bool = False,
+        *,
+        parallel: bool = False,
+        samples: int = 1,
     ) -> None:
-        """Initialize the PromptingPatternAgent with an OpenAI client."""
+        """Initialize the PromptingPatternAgent with an OpenAI client.
+
+        When `stream` is True, answers are printed as tokens arrive.
+        When `parallel` is True, independent steps of a pattern are fanned out concurrently on forked clients,
+        and their answers are printed when all of them complete. Dependent chains stay sequential.
+        `samples` more than 1 replaces the repeated question of self-consistency by majority voting of samples.
+        """
+        if samples < 1:
+            msg = "`samples` must be positive"
+            raise ValueError(msg)
+
         self._openai_client = openai_client
         self._embedding_repo = embedding_repo
         self._tool = tool
         self._api_mode = api_mode
+        self._stream = stream
+        self._parallel = parallel
+        self._samples = samples
+        self._saved_seconds = 0.0
 
     def call(self, pattern: str) -> None:
         """Endpoint with pattern."""
+        start = time.perf_counter()
+        self._saved_seconds = 0.0
         if pattern == "zero-shot":
             self.zero_shot()
         elif pattern == "few-shot":
@@ -52,6 +109,11 @@ class PromptingPatternAgent:
         else:
             msg = f"Unknown pattern: {pattern}"
             raise ValueError(msg)
+        logger.info(
+            f"pattern: {pattern}, elapsed: {time.perf_counter() - start:.3f}s, "
+            f"saved by fan-out: {self._saved_seconds:.3f}s"
+        )
+        self._log_usages()
 
     def zero_shot(self) -> None:
         """1. ZeroShot Prompting."""
@@ -59,38 +121,36 @@ class PromptingPatternAgent:
         question = "What are the top 10 Python libraries for AI?"
         # execute without instructions
         logger.info(f"query question: instructions: None, question: {question}")
-        response = self._query("", question)
-        print(response)
 
         # execute with instructions
         instructions = "You are an experienced software engineer."
         logger.info(f"query question: instructions: {instructions}, question: {question}")
-        response = self._query(instructions, question)
-        print(response)
+        self._query_independent([("", question), (instructions, question)])
 
     def few_shot(self) -> None:
-        """2. FewShot Prompting."""
+        """2. FewShot Prompting.
+
+        Examples are static, so they lead the instructions to be shared by both calls as a cached prompt prefix.
+        """
         logger.info("FewShot Prompting")
-        question = """
+        examples = """
         Answer Positive or Negative to the following question. I give a few examples.
         Q: "I love this product! It's amazing."
         A: Positive
 
         Q: "This is the worst experience I've ever had."
         A: Negative.
-
+        """
+        question = """
         Q: "I finally achieve my goal!"
         """
-        # 1. execute without instructions
-        logger.info(f"query question: instructions: None, question: {question}")
-        response = self._query("", question)
-        print(response)
+        # 1. execute with examples only
+        logger.info(f"query question: instructions: {examples}, question: {question}")
 
-        # 2. execute with instructions
-        instructions = "You are a helpful assistant."
+        # 2. execute with examples and role
+        instructions = f"{examples}\nYou are a helpful assistant."
         logger.info(f"query question: instructions: {instructions}, question: {question}")
-        response = self._query(instructions, question)
-        print(response)
+        self._query_independent([(examples, question), (instructions, question)])
 
     def roll_prompting(self) -> None:
         """3. Roll Prompting."""
@@ -103,8 +163,7 @@ class PromptingPatternAgent:
         Q: "商品が届かないのですが、どうなっていますか?"
         """
         logger.info(f"query question: instructions: {instructions}, question: {question}")
-        response = self._query(instructions, question)
-        print(response)
+        self._query(instructions, question)
 
     def emotion_prompting(self) -> None:
         """4. Emotion Prompting."""
@@ -114,33 +173,31 @@ class PromptingPatternAgent:
         AIによって社会が大きく変わろうとしています。この状況でもソフトウェアエンジニアとして働き続けることができるのでしょうか?。
         """
         logger.info(f"query question: instructions: {instructions}, question: {question}")
-        response = self._query(instructions, question)
-        print(response)
+        self._query(instructions, question)
 
     def chain_of_thought(self) -> None:
         """5. Chain Of Thought Prompting. + Self-Consistency."""
         logger.info("Chain Of Thought Prompting")
         instructions = "You are a helpful assistant."
         # 1. execute normal question
-        question = """
+        normal_question = """
         Please count the number of characters in the word `Hallucinations`.
         """
-        logger.info(f"query question: instructions: {instructions}, question: {question}")
-        response = self._query(instructions, question)
-        print(response)
+        logger.info(f"query question: instructions: {instructions}, question: {normal_question}")
 
         # 2. execute with step-by-step
         question = """
         Please count the number of characters in the word `Hallucinations`. Think it step-by-step.
         """
         logger.info(f"query question: instructions: {instructions}, question: {question}")
-        response = self._query(instructions, question)
-        print(response)
+        self._query_independent([(instructions, normal_question), (instructions, question)])
 
         # 3. Self-Consistency
-        logger.info("ask again for self-consistency")
-        response = self._query(instructions, question)
-        print(response)
+        if self._samples > 1:
+            self._self_consistency(instructions, question)
+        else:
+            logger.info("ask again for self-consistency")
+            self._query(instructions, question)
 
     def chain_of_thought2(self) -> None:
         """5-2. Chain Of Thought Prompting."""
@@ -159,8 +216,7 @@ class PromptingPatternAgent:
         4. 修正コード例を提示」
         """
         logger.info(f"query question: instructions: {instructions}, question: {question}")
-        response = self._query(instructions, question)
-        print(response)
+        self._query(instructions, question)
 
     def tree_of_thoughts(self) -> None:
         """6. Tree of Thoughts Prompting."""
@@ -171,68 +227,62 @@ class PromptingPatternAgent:
         新しいエコフレンドリーなカフェを立ち上げるためのアイデアをいくつか提案してください。
         """
         logger.info(f"query question: instructions: {instructions}, question: {question}")
-        response = self._query(instructions, question)
-        print(response)
+        self._query(instructions, question)
 
         # 2. 取得した提案を掘り下げる
         question = """
         頂いたアイデアのうちの１つを掘り下げてみましょう。3つの異なるアプローチとアイデアを挙げてください。
         """
         logger.info(f"query question: instructions: {instructions}, question: {question}")
-        response = self._query(instructions, question)
-        print(response)
+        self._query(instructions, question)
 
         # 3. アイデアの評価を行う
         question = """
         それぞれのアイデアについて、実現可能性・効果・独自性の観点から評価してください。
         """
         logger.info(f"query question: instructions: {instructions}, question: {question}")
-        response = self._query(instructions, question)
-        print(response)
+        self._query(instructions, question)
 
         # 4. 更なるアイデアのブラッシュアップ
         question = """
         最も有望なアイデアについて、具体的な実施計画や必要なリソース、リスクとその対策を詳しく説明してください。
         """
         logger.info(f"query question: instructions: {instructions}, question: {question}")
-        response = self._query(instructions, question)
-        print(response)
+        self._query(instructions, question)
 
         # 5. 最終決定
         question = """
         すべての評価を踏まえ、最も適切と思われるアイデアを1つ選び、その理由を述べてください。
         """
         logger.info(f"query question: instructions: {instructions}, question: {question}")
-        response = self._query(instructions, question)
-        print(response)
+        self._query(instructions, question)
 
     def generated_knowledge(self) -> None:
         """7. Generated Knowledge Prompting."""
         logger.info("Generated Knowledge Prompting")
         instructions = "You are good at geography."
         # 1. execute question 1 for knowledge
-        question = """
+        question1 = """
         東京都の面積を教えて。
         """
-        logger.info(f"query question: instructions: {instructions}, question: {question}")
-        response = self._query(instructions, question)
-        print(response)
+        logger.info(f"query question: instructions: {instructions}, question: {question1}")
 
         # 2. execute question 2 for knowledge
-        question = """
+        question2 = """
         大阪府の面積を教えて。
         """
-        logger.info(f"query question: instructions: {instructions}, question: {question}")
-        response = self._query(instructions, question)
-        print(response)
+        logger.info(f"query question: instructions: {instructions}, question: {question2}")
+        knowledge = self._query_independent([(instructions, question1), (instructions, question2)])
 
         # 3. execute final question from generated knowledge
         question = """
         以上のことから、東京都と大阪府ではどちらが広いですか?
         """
+        if self._parallel:
+            # fanned out answers are out of the conversation, so they are given in the question
+            question = "\n".join([*knowledge, question])
         logger.info(f"query question: instructions: {instructions}, question: {question}")
-        response = self._query(instructions, question)
-        print(response)
+        self._query(instructions, question)
 
     def reflection_prompting(self) -> None:
         """8. Reflection."""
@@ -247,8 +297,7 @@ class PromptingPatternAgent:
         4. 最終推奨案を選択し、その理由を説明 (反対意見への反論を含むこと)
         """
         logger.info(f"query question: instructions: {instructions}, question: {question}")
-        response = self._query(instructions, question)
-        print(response)
+        self._query(instructions, question)
 
     def meta_prompting(self) -> None:
         """9. Meta Prompting."""
@@ -274,8 +323,7 @@ class PromptingPatternAgent:
         # Generate the question dynamically
         question = template.substitute(params)
         logger.info(f"query question: instructions: {instructions}, question: {question}")
-        response = self._query(instructions, question)
-        print(response)
+        self._query(instructions, question)
 
     def prompt_chaining(self) -> None:
         """10. Prompt Chaining."""
@@ -286,27 +334,113 @@ class PromptingPatternAgent:
         1日1億リクエストを処理するECサイトのデータベースボトルネック解決策を3案提示してください。
         """
         logger.info(f"query question: instructions: {instructions}, question: {question}")
-        response = self._query(instructions, question)
-        print(response)
+        self._query(instructions, question)
         # 2. 詳細評価
         question = """
         1番効果的と思われる案を選び、想定されるコスト増加とパフォーマンス向上効果を定量化してください。
         """
         logger.info(f"query question: instructions: {instructions}, question: {question}")
-        response = self._query(instructions, question)
-        print(response)
+        self._query(instructions, question)
         # 3. 実装計画
         question = """
         追加で、具体的な設計パターンを比較してください。
         """
         logger.info(f"query question: instructions: {instructions}, question: {question}")
-        response = self._query(instructions, question)
-        print(response)
+        self._query(instructions, question)
+
+    def _log_usages(self) -> None:
+        """Log total token usage to verify provider-side prompt caching."""
+        usages = self._openai_client.get_usages()
+        prompt_tokens = sum(usage.prompt_tokens for usage in usages)
+        cached_tokens = sum(usage.cached_tokens for usage in usages)
+        logger.info(
+            f"total usage: calls: {len(usages)}, prompt tokens: {prompt_tokens}, cached tokens: {cached_tokens} "
+            f"({cached_tokens / prompt_tokens if prompt_tokens else 0.0:.0%}), "
+            f"output tokens: {sum(usage.output_tokens for usage in usages)}"
+        )
+
+    def _query_independent(self, queries: list[tuple[str, str]]) -> list[str]:
+        """Query independent pairs of instructions and prompt, and print the answers in order.
+
+        They are fanned out in parallel mode, otherwise they are asked one by one in the conversation.
+        """
+        if not self._parallel:
+            return [self._query(instructions, prompt) for instructions, prompt in queries]
+        responses = self._fan_out(queries)
+        for response in responses:
+            print(response)
+        return responses
+
+    def _self_consistency(self, instructions: str, prompt: str) -> str:
+        """Sample the prompt `samples` times independently, and print the majority of the final answers."""
+        logger.info(f"sample {self._samples} answers for self-consistency")
+        responses = self._fan_out([(instructions, f"{prompt}\n{FINAL_ANSWER_INSTRUCTIONS}")] * self._samples)
+        for i, response in enumerate(responses):
+            logger.debug(f"sample {i}: {response}")
+        answer, votes = majority_vote(responses)
+        logger.info(f"answers: {[extract_final_answer(response) for response in responses]}")
+        print(f"majority answer: {answer} ({votes}/{len(responses)} votes)")
+        return answer
+
+    def _fan_out(self, queries: list[tuple[str, str]]) -> list[str]:
+        """Call the API for each query on forked clients, concurrently in parallel mode.
+
+        The i-th query is the i-th sample, so cached responses of repeated samples differ.
+        The wall-clock time saved against calling one by one is logged and added to the pattern total.
+        """
+
+        def call(sample: int, query: tuple[str, str]) -> tuple[str, float]:
+            call_start = time.perf_counter()
+            response = self._call(self._openai_client.fork(sample), *query)
+            return response, time.perf_counter() - call_start
+
+        start = time.perf_counter()
+        max_workers = min(len(queries), FAN_OUT_MAX_WORKERS) if self._parallel else 1
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(call, range(len(queries)), queries))
+        elapsed = time.perf_counter() - start
+        sequential = sum(seconds for _, seconds in results)
+        self._saved_seconds += sequential - elapsed
+        logger.info(
+            f"fan-out: calls: {len(queries)}, workers: {max_workers}, elapsed: {elapsed:.3f}s, "
+            f"sequential: {sequential:.3f}s, saved: {sequential - elapsed:.3f}s"
+        )
+        return [response for response, _ in results]
 
     def _query(self, instructions: str, prompt: str) -> str:
+        """Call the API of `api_mode` and print the answer."""
+        if self._stream:
+            return self._query_stream(instructions, prompt)
+        response = self._call(self._openai_client, instructions, prompt)
+        print(response)
+        return response
+
+    def _call(self, openai_client: OpenAIClientInterface, instructions: str, prompt: str) -> str:
+        """Call the API of `api_mode` by the client."""
         if self._api_mode == APIMode.RESPONSE_API:
-            return self._openai_client.call_response(instructions, prompt)
+            return openai_client.call_response(instructions, prompt)
         if self._api_mode == APIMode.CHAT_COMPLETION_API:
-            return self._openai_client.call_chat_completion(instructions, prompt)
+            return openai_client.call_chat_completion(instructions, prompt)
         msg = "Unknown API mode"
         raise ValueError(msg)
+
+    def _query_stream(self, instructions: str, prompt: str) -> str:
+        """Call the streaming API of `api_mode` and print text deltas as they arrive."""
+        metrics = StreamMetrics()
+        if self._api_mode == APIMode.RESPONSE_API:
+            stream = self._openai_client.stream_response(instructions, prompt, metrics)
+        elif self._api_mode == APIMode.CHAT_COMPLETION_API:
+            stream = self._openai_client.stream_chat_completion(instructions, prompt, metrics)
+        else:
+            msg = "Unknown API mode"
+            raise ValueError(msg)
+        deltas: list[str] = []
+        for delta in stream:
+            print(delta, end="", flush=True)
+            deltas.append(delta)
+        print()
+        logger.info(
+            f"time to first token: {metrics.time_to_first_token:.3f}s, total: {metrics.elapsed:.3f}s, "
+            f"output tokens: {metrics.output_tokens}, tokens/sec: {metrics.tokens_per_sec:.1f}"
+        )
+        return "".join(deltas)
@@ -1,9 +1,16 @@
 """Query Agent Use Case."""
 
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
 from loguru import logger
 
+from entities.embedding.types import Embedding
+from infrastructure.cache.semantic_cache import SemanticCache
 from infrastructure.openai_api.client import APIMode
-from infrastructure.openai_api.interface import OpenAIClientInterface
+from infrastructure.openai_api.interface import OpenAIClientInterface, StreamMetrics
 from infrastructure.repository.interface import EmbeddingRepositoryInterface
 
 
@@ -16,12 +23,20 @@ class QueryAgent:
         embedding_repo: EmbeddingRepositoryInterface,
         tool: str,
         api_mode: APIMode,
+        stream: bool = False,
+        semantic_cache: SemanticCache | None = None,
     ) -> None:
-        """Initialize the QueryAgent with an OpenAI client."""
+        """Initialize the QueryAgent with an OpenAI client.
+
+        When `stream` is True, the answer is printed as tokens arrive.
+        When `semantic_cache` is set, common questions are answered by cached answers of similar questions.
+        """
         self._openai_client = openai_client
         self._embedding_repo = embedding_repo
         self._tool = tool
         self._api_mode = api_mode
+        self._stream = stream
+        self._semantic_cache = semantic_cache
 
     def query_tech_guide(self, user_query: str) -> None:
         """Query the agent with a user tech question.
@@ -31,43 +46,15 @@ class QueryAgent:
         """
         # execute
         logger.debug(f"query question: question: {user_query}")
-        response = self._query_tech_guide(user_query)
-        print(response)
-
-        # call embeddings if tool is OpenAI
-        # if self._tool != "openai":
-        #     logger.info("not implemented yet")
-        #     return
-
-        # call embeddings API
-        logger.debug("call embedding()")
-        embedding_list = self._openai_client.call_embeddings(user_query)
-        print(embedding_list)
-
-        # Insert into DB
-        logger.debug("insert into db `embeddings` table")
-        self._embedding_repo.insert_embeddings(embedding_list)
-        self._embedding_repo.close()
+        self._query_with_embedding(user_query, self._query_tech_guide, self._insert_embeddings)
 
     def query_common(self, user_query: str) -> None:
         """Query the agent with a user common question."""
         # execute
-        response = self._query(user_query)
-        print(response)
-
-        # call embeddings
-        # if self._tool != "openai":
-        #     logger.info("not implemented yet")
-        #     return
-
-        # call embeddings API
-        logger.debug("call agent.embedding()")
-        embedding_list = self._openai_client.call_embeddings(user_query)
-        print(embedding_list)
-        # Insert into DB
-        logger.debug("insert into db `item_contents` table")
-        self._embedding_repo.insert_item_contents([user_query], embedding_list)
-        self._embedding_repo.close()
+        if self._semantic_cache is not None:
+            self._query_with_semantic_cache(user_query, self._semantic_cache)
+            return
+        self._query_with_embedding(user_query, self._query, self._insert_item_contents)
 
     def query_news(self) -> str:
         """Query about news using Web Search."""
@@ -80,8 +67,74 @@ class QueryAgent:
     # Private methods
     # --------------------------------------------------------------------------
 
+    def _query_with_embedding(
+        self,
+        user_query: str,
+        query: Callable[[str], str],
+        insert: Callable[[str, list[Embedding]], None],
+    ) -> None:
+        """Query the agent while the user query is embedded and inserted into DB.
+
+        The embedding depends only on the user query, not on the answer,
+        so it runs in a worker thread during the completion and only the longer one is waited for.
+        """
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            future = executor.submit(self._embed_and_insert, user_query, insert)
+            query(user_query)
+            completion_seconds = time.perf_counter() - start
+            embedding_list, embedding_seconds = future.result()
+        elapsed = time.perf_counter() - start
+        print(embedding_list)
+
+        logger.info(
+            f"latency: total: {elapsed:.3f}s, completion: {completion_seconds:.3f}s, "
+            f"embedding and insert: {embedding_seconds:.3f}s, "
+            f"saved: {completion_seconds + embedding_seconds - elapsed:.3f}s"
+        )
+
+    def _query_with_semantic_cache(self, user_query: str, semantic_cache: SemanticCache) -> None:
+        """Answer by the cached answer of a similar question, or query the agent and cache the answer.
+
+        The embedding is needed to look up the cache, so it's called before the completion.
+        """
+        start = time.perf_counter()
+        logger.debug("call embedding()")
+        embedding_list = self._openai_client.call_embeddings(user_query)
+        embedding_seconds = time.perf_counter() - start
+        cached = semantic_cache.lookup(np.asarray(embedding_list[0].embedding, dtype=np.float32), embedding_seconds)
+        if cached is not None:
+            print(cached.answer)
+        else:
+            answer_start = time.perf_counter()
+            answer = self._query(user_query)
+            logger.debug("insert into db `item_contents` table with the answer")
+            semantic_cache.store(user_query, embedding_list[0], answer, time.perf_counter() - answer_start)
+        print(embedding_list)
+
+    def _embed_and_insert(
+        self, user_query: str, insert: Callable[[str, list[Embedding]], None]
+    ) -> tuple[list[Embedding], float]:
+        """Embed the user query and insert it into DB. Elapsed seconds are returned with the embeddings."""
+        start = time.perf_counter()
+        # call embeddings API
+        logger.debug("call embedding()")
+        embedding_list = self._openai_client.call_embeddings(user_query)
+        insert(user_query, embedding_list)
+        return embedding_list, time.perf_counter() - start
+
+    def _insert_embeddings(self, _user_query: str, embedding_list: list[Embedding]) -> None:
+        """Insert into `embeddings` table."""
+        logger.debug("insert into db `embeddings` table")
+        self._embedding_repo.insert_embeddings(embedding_list)
+
+    def _insert_item_contents(self, user_query: str, embedding_list: list[Embedding]) -> None:
+        """Insert into `item_contents` table."""
+        logger.debug("insert into db `item_contents` table")
+        self._embedding_repo.insert_item_contents([user_query], embedding_list)
+
     def _query_tech_guide(self, user_query: str) -> str:
-        """Query the agent with a user tech question."""
+        """Query the agent with a user tech question and print the answer."""
         # Initial prompt
         instructions = "You are an experienced software engineer."
         prompt = f"""
@@ -91,21 +144,46 @@ class QueryAgent:
         User's question about the technology: {user_query}
         """
 
-        if self._api_mode == APIMode.RESPONSE_API:
-            return self._openai_client.call_response(instructions, prompt)
-        if self._api_mode == APIMode.CHAT_COMPLETION_API:
-            return self._openai_client.call_chat_completion(instructions, prompt)
-        msg = "Unknown API mode"
-        raise ValueError(msg)
+        return self._call(instructions, prompt)
 
     def _query(self, user_query: str) -> str:
-        """Query the agent with a user common question."""
+        """Query the agent with a user common question and print the answer."""
         # Initial prompt
         instructions = "You are a helpful assistant."
 
+        return self._call(instructions, user_query)
+
+    def _call(self, instructions: str, prompt: str) -> str:
+        """Call the API of `api_mode` and print the answer."""
+        if self._stream:
+            return self._call_stream(instructions, prompt)
+        if self._api_mode == APIMode.RESPONSE_API:
+            response = self._openai_client.call_response(instructions, prompt)
+        elif self._api_mode == APIMode.CHAT_COMPLETION_API:
+            response = self._openai_client.call_chat_completion(instructions, prompt)
+        else:
+            msg = "Unknown API mode"
+            raise ValueError(msg)
+        print(response)
+        return response
+
+    def _call_stream(self, instructions: str, prompt: str) -> str:
+        """Call the streaming API of `api_mode` and print text deltas as they arrive."""
+        metrics = StreamMetrics()
         if self._api_mode == APIMode.RESPONSE_API:
-            return self._openai_client.call_response(instructions, user_query)
-        if self._api_mode == APIMode.CHAT_COMPLETION_API:
-            return self._openai_client.call_chat_completion(instructions, user_query)
-        msg = "Unknown API mode"
-        raise ValueError(msg)
+            stream = self._openai_client.stream_response(instructions, prompt, metrics)
+        elif self._api_mode == APIMode.CHAT_COMPLETION_API:
+            stream = self._openai_client.stream_chat_completion(instructions, prompt, metrics)
+        else:
+            msg = "Unknown API mode"
+            raise ValueError(msg)
+        deltas: list[str] = []
+        for delta in stream:
+            print(delta, end="", flush=True)
+            deltas.append(delta)
+        print()
+        logger.info(
+            f"time to first token: {metrics.time_to_first_token:.3f}s, total: {metrics.elapsed:.3f}s, "
+            f"output tokens: {metrics.output_tokens}, tokens/sec: {metrics.tokens_per_sec:.1f}"
+        )
+        return "".join(deltas)
@@ -1,7 +1,10 @@
 """Search VectorDB Use Case."""
 
+import json
+
 from loguru import logger
 
+from entities.vector_index.types import SearchFilter, SearchParams
 from infrastructure.repository.interface import EmbeddingRepositoryInterface
 
 
@@ -15,8 +18,14 @@ class SearchVectorDBAgent:
         """Initialize the Search Vector DB Agent with an embedding repository."""
         self._embedding_repo = embedding_repo
 
-    def search_similarity(self, content_id: int) -> None:
-        """Embedding static file."""
+    def search_similarity(
+        self,
+        content_id: int,
+        top_k: int = 3,
+        search_params: SearchParams | None = None,
+        search_filter: SearchFilter | None = None,
+    ) -> None:
+        """Search items similar to the item of `content_id`, excluding the item itself."""
         # Search target item_content from DB `item_contents`
         embedding_item = self._embedding_repo.get_item_by_id(content_id)
         if embedding_item is None:
@@ -24,5 +33,49 @@ class SearchVectorDBAgent:
 
         # Search similarity
         logger.debug("search similarity")
-        similarities = self._embedding_repo.similarity_search(embedding_item.embedding, 3)
-        print(similarities)
+        search_filter = search_filter or SearchFilter()
+        search_filter.exclude_ids = [*search_filter.exclude_ids, content_id]
+        similarities = self._embedding_repo.similarity_search(
+            embedding_item.embedding, top_k, search_params, search_filter
+        )
+        for similarity in similarities:
+            print(f"[{similarity.id}] distance: {similarity.distance:.4f}, content: {similarity.content}")
+
+    def search_similarity_many(
+        self,
+        content_ids: list[int],
+        top_k: int,
+        batch_size: int = 100,
+        search_params: SearchParams | None = None,
+        search_filter: SearchFilter | None = None,
+    ) -> None:
+        """Search neighbors of many `item_contents` and print one JSON line per id.
+
+        e.g. `{"id": 1, "neighbors": [{"id": 5, "distance": 0.12}, ...]}`
+        Each batch costs two round-trips: fetching the embeddings and searching all of them.
+        The item itself is excluded from its neighbors, which suits dedup and neighbor-graph jobs.
+        """
+        if batch_size <= 0:
+            msg = "`batch_size` must be positive"
+            raise ValueError(msg)
+
+        for start in range(0, len(content_ids), batch_size):
+            batch_ids = content_ids[start : start + batch_size]
+            items = self._embedding_repo.get_items_by_ids(batch_ids)
+            missing_ids = [content_id for content_id in batch_ids if content_id not in items]
+            if missing_ids:
+                logger.warning(f"item_contents not found: {missing_ids}")
+
+            found_ids = [content_id for content_id in batch_ids if content_id in items]
+            logger.debug(f"search similarity: {len(found_ids)} queries")
+            # one more row because the item itself is the nearest one
+            results = self._embedding_repo.similarity_search_many(
+                [items[content_id].embedding for content_id in found_ids], top_k + 1, search_params, search_filter
+            )
+            for content_id, result in zip(found_ids, results, strict=True):
+                neighbors = [
+                    {"id": similarity.id, "distance": round(similarity.distance, 6)}
+                    for similarity in result
+                    if similarity.id != content_id
+                ]
+                print(json.dumps({"id": content_id, "neighbors": neighbors[:top_k]}))
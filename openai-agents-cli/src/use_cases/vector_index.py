@@ -0,0 +1,32 @@
+"""Vector Index Use Case."""
+
+from loguru import logger
+
+from entities.vector_index.types import IndexParams, IndexTarget
+from infrastructure.repository.interface import EmbeddingRepositoryInterface
+
+
+class VectorIndexAgent:
+    """Vector Index Agent Use Case for ANN index management."""
+
+    def __init__(
+        self,
+        embedding_repo: EmbeddingRepositoryInterface,
+    ) -> None:
+        """Initialize the Vector Index Agent with an embedding repository."""
+        self._embedding_repo = embedding_repo
+
+    def manage(self, action: str, target: IndexTarget, params: IndexParams) -> None:
+        """Create, rebuild or drop ANN index."""
+        if action == "create":
+            index_name = self._embedding_repo.create_index(target, params)
+            logger.info(f"index created: {index_name}")
+        elif action == "rebuild":
+            self._embedding_repo.rebuild_index(target)
+            logger.info(f"index rebuilt: target: {target.value}")
+        elif action == "drop":
+            self._embedding_repo.drop_index(target)
+            logger.info(f"index dropped: target: {target.value}")
+        else:
+            msg = f"Unknown action: {action}"
+            raise ValueError(msg)